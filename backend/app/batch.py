@@ -0,0 +1,149 @@
+"""Batch validation: parse many sentences with bounded concurrency, streaming NDJSON."""
+
+import asyncio
+import json
+import tempfile
+import time
+from typing import IO, AsyncIterator, Optional, Tuple
+
+from .models import BatchItemResult, BatchSummary
+from .parser_client import parse_sentence_async
+
+# (index, sentence, error) for each input line; error is set for unusable input
+BatchInput = Tuple[int, str, Optional[str]]
+
+# NDJSON request bodies larger than this are spooled to disk
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+async def iter_list_items(sentences) -> AsyncIterator[BatchInput]:
+    for i, sentence in enumerate(sentences):
+        yield i, sentence, None if sentence.strip() else "Sentence is empty"
+
+
+async def spool_body(chunks: AsyncIterator[bytes]) -> IO[bytes]:
+    """Copy a request body to a temp file that spills to disk once it grows large.
+
+    The body has to be fully received before the streaming response starts,
+    because the response listens on the same ASGI channel for disconnects.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    try:
+        async for chunk in chunks:
+            spool.write(chunk)
+    except BaseException:
+        # Client went away mid-upload
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def _decode_line(raw: bytes) -> Tuple[str, Optional[str]]:
+    try:
+        value = json.loads(raw)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return raw.decode("utf-8", "replace").strip(), f"Invalid JSON line: {e}"
+    if isinstance(value, dict):
+        value = value.get("sentence")
+    if not isinstance(value, str):
+        return "", 'Line must be a JSON string or an object with a "sentence" field'
+    if not value.strip():
+        return value, "Sentence is empty"
+    return value, None
+
+
+async def iter_ndjson_items(spool: IO[bytes]) -> AsyncIterator[BatchInput]:
+    """Read sentences from a spooled NDJSON body one line at a time.
+
+    Each line is either a JSON string or an object with a "sentence" field.
+    Blank lines are skipped; malformed lines become per-item errors.
+    """
+    index = 0
+    try:
+        for line in spool:
+            if line.strip():
+                sentence, error = _decode_line(line)
+                yield index, sentence, error
+                index += 1
+    finally:
+        spool.close()
+
+
+async def _parse_item(index: int, sentence: str, error: Optional[str],
+                      language: str, engine: Optional[str]) -> BatchItemResult:
+    started = time.perf_counter()
+    if error is not None:
+        return BatchItemResult(index=index, sentence=sentence, error=error)
+    try:
+        result = await parse_sentence_async(sentence=sentence, language=language, engine=engine)
+    except Exception as e:  # one bad sentence must not fail the batch
+        return BatchItemResult(
+            index=index, sentence=sentence, error=str(e),
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+    return BatchItemResult(
+        index=index, sentence=sentence, result=result, error=result.error,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
+
+
+async def stream_batch(items: AsyncIterator[BatchInput], language: str,
+                       engine: Optional[str], concurrency: int) -> AsyncIterator[str]:
+    """Yield one NDJSON line per sentence as it finishes, then a summary line.
+
+    At most ``concurrency`` sentences are in flight, and input is only read as
+    slots free up, so memory stays bounded regardless of batch size.
+    """
+    started = time.perf_counter()
+    total = valid = invalid = errors = 0
+    item_ms_total = item_ms_max = 0.0
+
+    pending: set = set()
+    source = items.__aiter__()
+    exhausted = False
+
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    index, sentence, error = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(
+                    _parse_item(index, sentence, error, language, engine)
+                ))
+            if not pending:
+                break
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                item: BatchItemResult = task.result()
+                total += 1
+                if item.error is not None:
+                    errors += 1
+                elif item.result is not None and item.result.valid:
+                    valid += 1
+                else:
+                    invalid += 1
+                item_ms_total += item.elapsed_ms
+                item_ms_max = max(item_ms_max, item.elapsed_ms)
+                yield item.model_dump_json() + "\n"
+    finally:
+        # Client went away: drop sentences that have not started yet
+        for task in pending:
+            task.cancel()
+
+    elapsed = time.perf_counter() - started
+    summary = BatchSummary(
+        total=total,
+        valid=valid,
+        invalid=invalid,
+        errors=errors,
+        elapsed_ms=round(elapsed * 1000, 2),
+        sentences_per_second=round(total / elapsed, 1) if elapsed > 0 else 0.0,
+        mean_item_ms=round(item_ms_total / total, 2) if total else 0.0,
+        max_item_ms=round(item_ms_max, 2),
+    )
+    yield summary.model_dump_json() + "\n"
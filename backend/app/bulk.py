@@ -0,0 +1,518 @@
+"""Offline bulk validation of large corpora: ``python -m app.bulk``.
+
+    python -m app.bulk corpus.txt.gz -o results.jsonl
+    python -m app.bulk outputs.jsonl --field text -o summary.parquet --workers 8
+
+Input is read as a stream. It can be plain text, or JSONL with one string or
+object per line, and either may be gzipped (detected from the first bytes).
+Text is split into sentences exactly as X-ray splits a paragraph. Each JSONL
+record is split on its own.
+
+Sentences are validated in chunks across a process pool, one worker per
+available core, and written in input order:
+
+- ``.jsonl`` (or stdout): one SentenceAnalysis per line, with its index
+- ``.csv`` / ``.parquet``: one summary row per sentence. Parquet needs the
+  optional ``pyarrow`` package and is written as a directory of part files.
+
+Progress is checkpointed next to the output every few seconds. Running the
+same command again after a crash or Ctrl-C resumes after the last checkpoint.
+The final aggregate, shaped like XRayStats, goes to stdout (or ``--stats``).
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import IO, Deque, Iterator, List, Optional, Tuple
+
+import orjson
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet output is optional
+    pyarrow = None
+
+from .grammar_registry import UnknownLanguage, get_snapshot, resolve_language
+from .models import ParseResult, SentenceAnalysis, XRayStats
+from .parser_client import ENGINES, parse_sentence
+from .xray import CoverageCounter, SentenceSplitter, _analyze, split_sentences
+
+CHUNK_SIZE = 256
+# Chunks queued per worker, so reading stays ahead of parsing without buffering the corpus
+CHUNKS_PER_WORKER = 4
+CHECKPOINT_INTERVAL = 10.0
+_READ_SIZE = 1 << 20
+_GZIP_MAGIC = b"\x1f\x8b"
+_CHECKPOINT_VERSION = 1
+
+# (index, record, part): the sentence's position in the corpus, the JSONL
+# record it came from (None for text input) and its split_sentences part
+Sentence = Tuple[int, Optional[int], dict]
+
+SUMMARY_FIELDS = (
+    "index", "record", "original", "sentence", "valid", "words", "known_words", "parses",
+    "failure_index", "failure_token", "expected", "error", "parse_ms",
+)
+
+
+def open_input(path: str) -> IO[bytes]:
+    """A file (or ``-`` for stdin) as bytes, gunzipped if it starts with the gzip magic."""
+    raw = sys.stdin.buffer if path == "-" else open(path, "rb")
+    if raw.peek(2)[:2] == _GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=raw)
+    return raw
+
+
+def input_format(path: str, requested: str = "auto") -> str:
+    if requested != "auto":
+        return requested
+    name = path.lower().removesuffix(".gz")
+    return "jsonl" if name.endswith((".jsonl", ".ndjson")) else "text"
+
+
+class CorpusReader:
+    """Sentences from every input in order, read a chunk or a line at a time."""
+
+    def __init__(self, paths: List[str], fmt: str = "auto", field: str = "text"):
+        self.paths = paths
+        self.fmt = fmt
+        self.field = field
+        self.records = 0
+        # JSONL lines that weren't JSON, or had no text in ``field``
+        self.skipped = 0
+
+    def __iter__(self) -> Iterator[Tuple[Optional[int], dict]]:
+        for path in self.paths:
+            with open_input(path) as raw:
+                text = io.TextIOWrapper(raw, encoding="utf-8", errors="replace", newline="")
+                if input_format(path, self.fmt) == "jsonl":
+                    yield from self._records(text)
+                else:
+                    # Each text file is one document, split like an X-ray paragraph
+                    splitter = SentenceSplitter()
+                    while chunk := text.read(_READ_SIZE):
+                        for part in splitter.feed(chunk):
+                            yield None, part
+                    for part in splitter.flush():
+                        yield None, part
+
+    def _records(self, lines: IO[str]) -> Iterator[Tuple[Optional[int], dict]]:
+        for line in lines:
+            if not line.strip():
+                continue
+            record = self.records
+            self.records += 1
+            text = self._record_text(line)
+            if text is None:
+                self.skipped += 1
+                continue
+            for part in split_sentences(text):
+                yield record, part
+
+    def _record_text(self, line: str) -> Optional[str]:
+        try:
+            value = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            return None
+        if isinstance(value, dict):
+            value = value.get(self.field)
+        return value if isinstance(value, str) else None
+
+
+# Set in each worker process by _init_worker
+_worker: dict = {}
+
+
+def _init_worker(language: str, engine: Optional[str], summary: bool) -> None:
+    # Ctrl-C is handled by the parent, which checkpoints and shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker.update(language=language, engine=engine, summary=summary)
+    threading.Thread(target=_exit_with_parent, args=(os.getppid(),), daemon=True).start()
+    get_snapshot(language)
+
+
+def _exit_with_parent(parent: int) -> None:
+    """Exit once the parent is gone (killed with SIGKILL, say) instead of lingering."""
+    while os.getppid() == parent:
+        time.sleep(1)
+    os._exit(1)
+
+
+def _validate_chunk(chunk: List[Sentence]) -> Tuple[int, object, CoverageCounter]:
+    """Validate a chunk in a worker: (sentences, JSONL bytes or summary rows, totals)."""
+    language, engine, summary = _worker["language"], _worker["engine"], _worker["summary"]
+    counter = CoverageCounter()
+    lines: List[bytes] = []
+    rows: List[dict] = []
+    for index, record, part in chunk:
+        try:
+            result = parse_sentence(part["cleaned"], language, engine=engine)
+        except Exception as e:  # one bad sentence must not fail the run
+            result = ParseResult(valid=False, sentence=part["cleaned"], error=str(e))
+        analysis = _analyze(part, result, language)
+        counter.add(analysis)
+        if summary:
+            rows.append(summary_row(index, record, analysis))
+        else:
+            row = {"index": index, "record": record, **analysis.model_dump(mode="json", exclude={"translation"})}
+            lines.append(orjson.dumps(row))
+    payload = rows if summary else b"".join(line + b"\n" for line in lines)
+    return len(chunk), payload, counter
+
+
+def summary_row(index: int, record: Optional[int], analysis: SentenceAnalysis) -> dict:
+    result = analysis.result
+    failure = result.failure
+    return {
+        "index": index,
+        "record": record,
+        "original": analysis.original,
+        "sentence": analysis.sentence,
+        "valid": result.valid,
+        "words": len(result.tokens),
+        "known_words": sum(1 for token in result.tokens if token.tag != "UNKNOWN"),
+        "parses": result.parses,
+        "failure_index": failure.index if failure else None,
+        "failure_token": failure.token if failure else None,
+        "expected": " ".join(failure.expectedCategories) if failure else None,
+        "error": result.error,
+        "parse_ms": result.metrics.parseTimeMs if result.metrics else None,
+    }
+
+
+class JsonlWriter:
+    """Appends output; its checkpoint state is the byte offset of the last commit."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._file: Optional[IO[bytes]] = None
+
+    def open(self, state: Optional[int]) -> None:
+        """Start fresh (state None), or truncate back to a checkpointed offset."""
+        if self.path is None:
+            self._file = sys.stdout.buffer
+        elif state is None:
+            self._file = open(self.path, "wb")
+            self._start()
+        else:
+            self._file = open(self.path, "r+b")
+            # Drop anything written after the checkpoint
+            self._file.truncate(state)
+            self._file.seek(state)
+
+    def _start(self) -> None:
+        pass
+
+    def write(self, payload) -> None:
+        self._file.write(payload)
+
+    def commit(self):
+        self._file.flush()
+        if self.path is not None:
+            os.fsync(self._file.fileno())
+            return self._file.tell()
+        return None
+
+    def close(self) -> None:
+        if self._file is not None and self.path is not None:
+            self._file.close()
+
+
+class CsvWriter(JsonlWriter):
+    def _start(self) -> None:
+        self.write([dict(zip(SUMMARY_FIELDS, SUMMARY_FIELDS))])
+
+    def write(self, payload) -> None:
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, SUMMARY_FIELDS).writerows(payload)
+        self._file.write(buffer.getvalue().encode("utf-8"))
+
+
+class ParquetWriter:
+    """A directory of Parquet part files, one per commit; the state is the part count."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._rows: List[dict] = []
+        self._parts = 0
+        self._schema = pyarrow.schema([
+            ("index", pyarrow.int64()), ("record", pyarrow.int64()),
+            ("original", pyarrow.string()), ("sentence", pyarrow.string()),
+            ("valid", pyarrow.bool_()), ("words", pyarrow.int32()), ("known_words", pyarrow.int32()),
+            ("parses", pyarrow.int32()), ("failure_index", pyarrow.int32()),
+            ("failure_token", pyarrow.string()), ("expected", pyarrow.string()),
+            ("error", pyarrow.string()), ("parse_ms", pyarrow.float64()),
+        ])
+
+    def open(self, state: Optional[int]) -> None:
+        self._parts = state or 0
+        self.path.mkdir(parents=True, exist_ok=True)
+        for part in self.path.glob("part-*.parquet"):
+            if int(part.stem.split("-")[1]) >= self._parts:
+                part.unlink()
+
+    def write(self, payload) -> None:
+        self._rows.extend(payload)
+
+    def commit(self) -> int:
+        if self._rows:
+            table = pyarrow.Table.from_pylist(self._rows, schema=self._schema)
+            pyarrow.parquet.write_table(table, self.path / f"part-{self._parts:05d}.parquet")
+            self._parts += 1
+            self._rows = []
+        return self._parts
+
+    def close(self) -> None:
+        pass
+
+
+class Checkpoint:
+    """Progress saved next to the output, valid only for the same inputs and options."""
+
+    def __init__(self, path: Path, key: dict):
+        self.path = path
+        self.key = key
+
+    def load(self) -> Optional[dict]:
+        try:
+            state = orjson.loads(self.path.read_bytes())
+        except FileNotFoundError:
+            return None
+        if state.get("version") != _CHECKPOINT_VERSION or state.get("key") != self.key:
+            raise ValueError(
+                f"{self.path} was written for other inputs or options; "
+                f"rerun with --restart to start over"
+            )
+        return state
+
+    def save(self, sentences: int, output, counter: CoverageCounter, elapsed: float) -> None:
+        state = {
+            "version": _CHECKPOINT_VERSION,
+            "key": self.key,
+            "sentences": sentences,
+            "output": output,
+            "counter": counter.state(),
+            "elapsed": elapsed,
+        }
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_bytes(orjson.dumps(state))
+        os.replace(tmp, self.path)
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class Progress:
+    """Running throughput on stderr: redrawn in place on a terminal, a line every 10s otherwise."""
+
+    def __init__(self, enabled: bool, resumed: int = 0):
+        self.enabled = enabled
+        self.interactive = sys.stderr.isatty()
+        self.resumed = resumed
+        self.started = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, done: int, counter: CoverageCounter, final: bool = False) -> None:
+        now = time.perf_counter()
+        if not self.enabled or (not final and now - self._last < (0.5 if self.interactive else 10.0)):
+            return
+        self._last = now
+        elapsed = now - self.started
+        rate = (done - self.resumed) / elapsed if elapsed > 0 else 0.0
+        stats = counter.stats()
+        line = (
+            f"{done:,} sentences  {rate:,.0f}/s  {stats.coverage_percentage:.1f}% valid  "
+            f"{stats.word_coverage_percentage:.1f}% known words  {elapsed:,.0f}s"
+        )
+        if self.interactive:
+            sys.stderr.write("\r" + line + ("\n" if final else ""))
+        else:
+            sys.stderr.write(line + "\n")
+        sys.stderr.flush()
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def output_kind(path: Optional[str]) -> str:
+    if path is None:
+        return "jsonl"
+    suffix = Path(path).suffix.lower()
+    return {".csv": "csv", ".parquet": "parquet"}.get(suffix, "jsonl")
+
+
+def _fingerprint(paths: List[str]) -> List[list]:
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def _chunks(sentences: Iterator[Sentence], size: int) -> Iterator[List[Sentence]]:
+    while chunk := list(islice(sentences, size)):
+        yield chunk
+
+
+def run(
+    paths: List[str],
+    language: str = "spanish",
+    engine: Optional[str] = None,
+    output: Optional[str] = None,
+    fmt: str = "auto",
+    field: str = "text",
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: float = CHECKPOINT_INTERVAL,
+    restart: bool = False,
+    progress: bool = True,
+) -> XRayStats:
+    """Validate every sentence in ``paths`` and return the aggregate stats.
+
+    Checkpointing needs a real output file and input files (not stdin); it's
+    skipped otherwise. Raises ValueError for a checkpoint from another run.
+    """
+    kind = output_kind(output)
+    if kind == "parquet" and pyarrow is None:
+        raise ValueError("Parquet output needs the optional pyarrow package")
+    writer = ParquetWriter(output) if kind == "parquet" else (CsvWriter if kind == "csv" else JsonlWriter)(output)
+
+    checkpoint = None
+    if output is not None and "-" not in paths:
+        key = {
+            "inputs": _fingerprint(paths), "language": language, "engine": engine,
+            "format": fmt, "field": field, "output": os.path.abspath(output),
+        }
+        checkpoint = Checkpoint(Path(checkpoint_path or f"{output}.checkpoint"), key)
+    state = None
+    if checkpoint is not None:
+        if restart:
+            checkpoint.remove()
+        state = checkpoint.load()
+
+    done = state["sentences"] if state else 0
+    counter = CoverageCounter.from_state(state["counter"]) if state else CoverageCounter()
+    elapsed_before = state["elapsed"] if state else 0.0
+    writer.open(state["output"] if state else None)
+    meter = Progress(progress, resumed=done)
+    if state and progress:
+        sys.stderr.write(f"Resuming after {done:,} sentences\n")
+
+    workers = workers or available_cores()
+    reader = CorpusReader(paths, fmt, field)
+    # Sentences before the checkpoint are re-read and re-split, but not re-parsed
+    sentences = ((index, record, part) for index, (record, part) in enumerate(reader))
+    last_checkpoint = time.perf_counter()
+
+    def save() -> None:
+        nonlocal last_checkpoint
+        committed = writer.commit()
+        if checkpoint is not None:
+            checkpoint.save(done, committed, counter, elapsed_before + time.perf_counter() - meter.started)
+        last_checkpoint = time.perf_counter()
+
+    def collect(future: Future) -> None:
+        nonlocal done
+        count, payload, chunk_counter = future.result()
+        writer.write(payload)
+        counter.merge(chunk_counter)
+        done += count
+        meter.update(done, counter)
+        if time.perf_counter() - last_checkpoint >= checkpoint_interval:
+            save()
+
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(language, engine, kind != "jsonl"))
+    pending: Deque[Future] = deque()
+    try:
+        for chunk in _chunks(islice(sentences, done, None), chunk_size):
+            pending.append(pool.submit(_validate_chunk, chunk))
+            # Write finished chunks as soon as they're next in order
+            while len(pending) >= workers * CHUNKS_PER_WORKER or (pending and pending[0].done()):
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+    except KeyboardInterrupt:
+        # Keep everything already written in order; the rest is redone on resume
+        pool.shutdown(wait=True, cancel_futures=True)
+        save()
+        writer.close()
+        raise
+    pool.shutdown()
+
+    writer.commit()
+    writer.close()
+    if checkpoint is not None:
+        checkpoint.remove()
+    meter.update(done, counter, final=True)
+    if reader.skipped and progress:
+        sys.stderr.write(f"Skipped {reader.skipped:,} of {reader.records:,} JSONL records without text\n")
+    return counter.stats()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.bulk",
+        description="Validate every sentence of a large corpus against a grammar.",
+    )
+    parser.add_argument("inputs", nargs="+", help="Text or JSONL files, optionally gzipped; - for stdin")
+    parser.add_argument("-o", "--output", help=".jsonl, .csv or .parquet (a directory); default: JSONL on stdout")
+    parser.add_argument("-l", "--language", default="spanish")
+    parser.add_argument("--engine", choices=ENGINES, help="Parser engine (default: PARSER_ENGINE)")
+    parser.add_argument("--input-format", choices=("auto", "text", "jsonl"), default="auto",
+                        help="auto: JSONL for .jsonl/.ndjson files, text otherwise")
+    parser.add_argument("--field", default="text", help="Text field of JSONL objects")
+    parser.add_argument("-j", "--workers", type=int, help="Worker processes (default: available cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Sentences per worker task")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--checkpoint-interval", type=float, default=CHECKPOINT_INTERVAL,
+                        help="Seconds between checkpoints")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--stats", help="Write the aggregate stats here instead of stdout")
+    parser.add_argument("-q", "--quiet", action="store_true", help="No progress on stderr")
+    args = parser.parse_args(argv)
+
+    try:
+        language = resolve_language(args.language)
+    except UnknownLanguage as e:
+        parser.error(str(e))
+    try:
+        stats = run(
+            args.inputs, language=language, engine=args.engine, output=args.output,
+            fmt=args.input_format, field=args.field, workers=args.workers,
+            chunk_size=max(1, args.chunk_size), checkpoint_path=args.checkpoint,
+            checkpoint_interval=args.checkpoint_interval, restart=args.restart,
+            progress=not args.quiet,
+        )
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        sys.stderr.write("\nInterrupted; run the same command again to resume\n")
+        return 130
+
+    body = orjson.dumps(stats.model_dump(mode="json"), option=orjson.OPT_INDENT_2) + b"\n"
+    if args.stats:
+        Path(args.stats).write_bytes(body)
+    else:
+        # Results already on stdout: keep the stats out of them
+        (sys.stderr.buffer if args.output is None else sys.stdout.buffer).write(body)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Compact wire format for responses carrying parse results (opt-in, ``?format=compact``).
+
+The verbose format nests every parse tree as objects, spells out every rule
+and repeats each word's translation per token and the system prompt per
+attempt. The compact format interns those once per response:
+
+  {"format": "compact-1",
+   "symbols": ["SENTENCE", "S", "el", "DET", ...],  grammar symbols, tags and words
+   "translations": {"2": "the", ...},                by word symbol id
+   "rules": {"1": "SENTENCE -> S", ...},             by rule number, only rules used
+   "prompts": ["You are ...", ...],                  distinct system prompts
+   "data": {...}}                                    the response itself
+
+Inside ``data`` every ParseResult has
+  "tokens":       [[word id, tag id], ...], with a third element for a
+                  translation that differs from the word's entry above
+  "parseTree":    {"symbol": [...], "parent": [...], "word": [0|1, ...]} in
+                  preorder, parent -1 for the root; or null
+  "rulesApplied": [rule number, ...]
+and every ``system_prompt`` is an index into ``prompts``. All other fields
+are as in the verbose format.
+"""
+
+from typing import Any, Dict, List
+
+from pydantic import BaseModel
+
+from .models import ParseResult, ParseTreeNode
+
+FORMAT = "compact-1"
+
+
+class CompactEncoder:
+    """Builds one compact response; the tables are shared by everything encoded."""
+
+    def __init__(self):
+        self.symbols: List[str] = []
+        self._symbol_ids: Dict[str, int] = {}
+        self.translations: Dict[str, str] = {}
+        self.rules: Dict[str, str] = {}
+        self.prompts: List[str] = []
+        self._prompt_ids: Dict[str, int] = {}
+
+    def symbol(self, name: str) -> int:
+        i = self._symbol_ids.get(name)
+        if i is None:
+            i = self._symbol_ids[name] = len(self.symbols)
+            self.symbols.append(name)
+        return i
+
+    def prompt(self, text: str) -> int:
+        i = self._prompt_ids.get(text)
+        if i is None:
+            i = self._prompt_ids[text] = len(self.prompts)
+            self.prompts.append(text)
+        return i
+
+    def value(self, value: Any) -> Any:
+        if isinstance(value, ParseResult):
+            return self.parse_result(value)
+        if isinstance(value, BaseModel):
+            return {
+                name: self.prompt(field) if name == "system_prompt" else self.value(field)
+                for name, field in value
+            }
+        if isinstance(value, list):
+            return [self.value(v) for v in value]
+        if isinstance(value, dict):
+            return {k: self.value(v) for k, v in value.items()}
+        return value
+
+    def parse_result(self, result: ParseResult) -> dict:
+        out = {}
+        for name, field in result:
+            if name == "tokens":
+                out[name] = [self._token(t.word, t.tag, t.translation) for t in field]
+            elif name == "parseTree":
+                out[name] = self._tree(field) if field is not None else None
+            elif name == "rulesApplied":
+                for rule in field:
+                    self.rules.setdefault(str(rule.number), rule.rule)
+                out[name] = [rule.number for rule in field]
+            else:
+                out[name] = self.value(field)
+        return out
+
+    def _token(self, word: str, tag: str, translation: str) -> list:
+        word_id = self.symbol(word)
+        known = self.translations.setdefault(str(word_id), translation)
+        token = [word_id, self.symbol(tag)]
+        if known != translation:
+            token.append(translation)
+        return token
+
+    def _tree(self, root: ParseTreeNode) -> dict:
+        symbols: List[int] = []
+        parents: List[int] = []
+        words: List[int] = []
+        stack = [(root, -1)]
+        while stack:
+            node, parent = stack.pop()
+            index = len(symbols)
+            symbols.append(self.symbol(node.symbol))
+            parents.append(parent)
+            words.append(1 if node.word else 0)
+            stack.extend((child, index) for child in reversed(node.children))
+        return {"symbol": symbols, "parent": parents, "word": words}
+
+
+def compact(response: BaseModel) -> dict:
+    """Encode a response model (ParseResult, VerifyLoopResponse, XRayResponse, ...) compactly."""
+    encoder = CompactEncoder()
+    data = encoder.value(response)
+    return {
+        "format": FORMAT,
+        "symbols": encoder.symbols,
+        "translations": encoder.translations,
+        "rules": encoder.rules,
+        "prompts": encoder.prompts,
+        "data": data,
+    }
@@ -0,0 +1,116 @@
+"""Response compression negotiated from Accept-Encoding: brotli if available, else gzip.
+
+Only buffered responses are compressed: a body sent in one piece, at least
+``COMPRESSION_MIN_BYTES`` long. Streamed bodies (SSE, NDJSON batches) pass
+through untouched so each event still reaches the client as soon as it is
+written. Brotli needs the optional ``brotli`` package; without it only gzip
+is offered.
+
+A compressed body is a different representation, so a strong ``ETag`` gets
+the encoding appended (``"<hash>-gzip"``); ``etag_variants`` lists every
+form a client may send back.
+"""
+
+import gzip
+import os
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ENCODINGS = ("br", "gzip")
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick ``br`` or ``gzip`` from an Accept-Encoding header, honouring q-values."""
+    offered = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    wildcard = offered.get("*", 0.0)
+    choices = [("br", brotli is not None), ("gzip", True)]
+    best, best_q = None, 0.0
+    for name, available in choices:
+        q = offered.get(name, wildcard)
+        if available and q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The validator of the ``encoding`` representation; weak ETags are left as they are."""
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_variants(etag: str) -> List[str]:
+    """``etag`` and the validators of its compressed representations."""
+    return [etag] + [encoded_etag(etag, encoding) for encoding in ENCODINGS]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether the response streams
+                start = message
+                return
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            if (message.get("more_body", False) or len(body) < self.minimum_size
+                    or "content-encoding" in headers):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], encoding)
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,106 @@
+"""Server-wide caps on requests doing real work.
+
+Requests beyond a cap wait in line for a slot; if none frees up in time they
+get 503 with Retry-After instead of piling up. Cheap endpoints such as
+``/health`` are exempt so they stay responsive while the server is saturated,
+and LLM-bound endpoints get their own lower cap so requests stuck waiting on
+the model can't take every slot from parser-only endpoints like ``/validate``.
+"""
+
+import asyncio
+import json
+import os
+from typing import Iterable, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import metrics
+
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("MAX_CONCURRENT_REQUESTS", "64"))
+MAX_CONCURRENT_LLM_REQUESTS = int(os.environ.get("MAX_CONCURRENT_LLM_REQUESTS", "32"))
+QUEUE_TIMEOUT = float(os.environ.get("CONCURRENCY_QUEUE_TIMEOUT", "10"))
+
+# Read-only endpoints answered from memory or cached tables; analytics reads run in a thread
+EXEMPT_PATHS = (
+    "/health", "/languages", "/stats", "/grammar-detail", "/grammar-analysis",
+    "/cache-stats", "/llm-cache-stats", "/llm-stats", "/metrics",
+    "/analytics/summary", "/analytics/rules", "/analytics/tags", "/analytics/attempts",
+)
+LLM_PATHS = ("/verify-loop", "/xray")
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware holding a slot for the full lifetime of each HTTP request,
+    including a streamed response body.
+
+    With ``paths`` set, only requests under those path prefixes are limited;
+    otherwise every path outside ``exempt_paths`` is. ``limit=0`` disables it.
+    """
+
+    def __init__(self, app: ASGIApp, limit: int = MAX_CONCURRENT_REQUESTS,
+                 queue_timeout: float = QUEUE_TIMEOUT,
+                 paths: Optional[Iterable[str]] = None,
+                 exempt_paths: Iterable[str] = EXEMPT_PATHS):
+        self.app = app
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.paths = tuple(paths) if paths is not None else None
+        self.exempt_paths = frozenset(exempt_paths)
+        self.in_flight = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+        _instances.append(self)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            await _reject(send, self.queue_timeout)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def _applies(self, scope: Scope) -> bool:
+        if self._semaphore is None or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return False
+        path = scope["path"]
+        if self.paths is not None:
+            return path.startswith(self.paths)
+        return path not in self.exempt_paths
+
+
+_instances: List[ConcurrencyLimitMiddleware] = []
+
+
+@metrics.collector
+def _collect_metrics():
+    rows = [
+        ({"scope": "llm" if m.paths is not None else "all"},
+         {"limit": m.limit, "in_flight": m.in_flight, "rejected": m.rejected})
+        for m in _instances
+    ]
+    return metrics.stats_samples("grammar_oracle_concurrency", "Request concurrency limit", rows)
+
+
+async def _reject(send: Send, retry_after: float) -> None:
+    body = json.dumps({"detail": "Server is at its concurrency limit, retry shortly."}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, round(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -1,6 +1,7 @@
 """Convert parse failure diagnostics into natural language feedback for LLM retry."""
 
 from typing import Optional, List
+from .grammar_analysis import END, GrammarAnalysis
 from .models import ParseResult, Token
 
 
@@ -19,30 +20,59 @@ TAG_NAMES = {
 }
 
 
-def format_constraint_feedback(result: ParseResult) -> str:
-    """Convert a failed ParseResult into natural language feedback for Claude."""
+def format_constraint_feedback(result: ParseResult, analysis: Optional[GrammarAnalysis] = None) -> str:
+    """Convert a failed ParseResult into natural language feedback for Claude.
+
+    With the grammar's ``analysis``, the feedback also names words that fit.
+    A failure reported without expected categories at the first word gets
+    them from FIRST of the start symbol; later in the sentence it only says
+    what the previous word may be followed by, from the FOLLOW sets of all
+    its tags. FOLLOW ignores the rest of the sentence, so it is not what the
+    parser expected there.
+    """
     parts: List[str] = []
     parts.append(f'Your sentence "{result.sentence}" was invalid.')
 
     if result.failure:
         failure = result.failure
         token_tag = _find_token_tag(failure.token, result.tokens)
+        expected = failure.expectedCategories or _grammar_expected(failure.index, analysis)
+        actual_desc = TAG_NAMES.get(token_tag, "unknown category") if token_tag else "an unknown word"
 
-        if failure.expectedCategories:
-            expected_desc = _describe_categories(failure.expectedCategories)
-            actual_desc = TAG_NAMES.get(token_tag, "unknown category") if token_tag else "an unknown word"
+        if expected:
+            expected_desc = _describe_categories(expected)
             parts.append(
                 f"At position {failure.index}, the parser found '{failure.token}' "
                 f"({actual_desc}), but expected {expected_desc}."
             )
+        elif analysis is not None and 0 < failure.index <= len(result.tokens):
+            previous = result.tokens[failure.index - 1]
+            followers = [tag for tag in analysis.can_follow_word(previous.word) if tag != END]
+            if followers:
+                parts.append(
+                    f"At position {failure.index}, the parser found '{failure.token}' ({actual_desc}). "
+                    f"In this grammar, '{previous.word}' may be followed by {_describe_categories(followers)}."
+                )
 
-        if failure.index == 0 and failure.expectedCategories:
-            if "DET" in failure.expectedCategories:
+        if failure.index == 0 and expected:
+            if analysis is not None:
+                starts = analysis.first_of([analysis.start])
+                parts.append(f"Sentences in this grammar must begin with {_describe_categories(starts)}.")
+            elif "DET" in expected:
                 parts.append(
                     "Spanish sentences in this grammar must begin with a determiner "
                     "(el/la/los/las/un/una) or an existential verb (hay)."
                 )
 
+        if analysis is not None and expected:
+            examples = [
+                f"{', '.join(words)} ({TAG_NAMES.get(tag, tag.lower()).split(' (')[0]})"
+                for tag in expected
+                if (words := analysis.examples(tag))
+            ]
+            if examples:
+                parts.append(f"Words that fit there include {'; '.join(examples)}.")
+
         if failure.message:
             parts.append(f"Parser message: {failure.message}")
 
@@ -53,6 +83,13 @@ def format_constraint_feedback(result: ParseResult) -> str:
     return " ".join(parts)
 
 
+def _grammar_expected(index: int, analysis: Optional[GrammarAnalysis]) -> List[str]:
+    """Tags the grammar expects at ``index`` regardless of context: only known for the first word."""
+    if analysis is None or index > 0:
+        return []
+    return analysis.first_of([analysis.start])
+
+
 def _describe_categories(categories: List[str]) -> str:
     descs = [TAG_NAMES.get(c, c.lower()) for c in categories]
     if len(descs) == 1:
@@ -0,0 +1,448 @@
+"""In-process Earley chart parser over the grammar and lexicon XML.
+
+Produces the same ParseResult as the Java JAR without a subprocess hop. The
+Java parser runs a breadth-first search over cloned parse states, which grows
+exponentially with ambiguity; the chart here is polynomial in sentence length.
+
+To match the JAR exactly, the reported parse is the one its BFS would find
+first: the derivation with the fewest rule applications, ties broken by rule
+order in the grammar file (leftmost derivation order).
+"""
+
+from __future__ import annotations
+import functools
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .grammar_analysis import TERMINAL_TAGS, first_sets, nullable_symbols, sequence_first
+from .grammar_registry import MAX_LOADED_PACKS, registry
+from .grammar_snapshot import GrammarSnapshot
+from .lexicon_index import LexiconIndex, get_lexicon_index, tokenize
+from .models import (
+    FailureInfo, ParseMetrics, ParseResult, ParseTreeNode, RuleApplied, Token,
+)
+
+# Same cap as Parser.java (TERMINAL_TAGS is its terminal set)
+MAX_PARSES = 10
+
+
+class Rule(NamedTuple):
+    number: int
+    lhs: str
+    rhs: Tuple[str, ...]
+
+    def __str__(self) -> str:
+        return f"{self.lhs} -> {' '.join(self.rhs)}"
+
+
+class Grammar:
+    """Production rules in file order, indexed by left-hand side."""
+
+    def __init__(self, start: str, rules: List[Rule]):
+        self.start = start
+        self.rules = rules
+        self.by_lhs: Dict[str, List[int]] = {}
+        for i, rule in enumerate(rules):
+            self.by_lhs.setdefault(rule.lhs, []).append(i)
+        productions = [(rule.lhs, rule.rhs) for rule in rules]
+        self.nullable = nullable_symbols(productions)
+        # Per rule: the tags its right-hand side can start with, and whether it can be empty
+        first = first_sets(productions, self.nullable)
+        self.rule_first: List[Tuple[str, ...]] = []
+        self.rule_nullable: List[bool] = []
+        for rule in rules:
+            tags, nullable = sequence_first(rule.rhs, first, self.nullable)
+            self.rule_first.append(tuple(tags))
+            self.rule_nullable.append(nullable)
+
+
+def grammar_from_snapshot(snapshot: GrammarSnapshot) -> Grammar:
+    rules = [Rule(number, lhs, rhs) for number, lhs, rhs, _ in snapshot.rules]
+    return Grammar(snapshot.start, rules)
+
+
+def _load(language: str) -> Tuple[Grammar, LexiconIndex]:
+    # Raises UnknownLanguage (a ValueError). Keyed on the content hash so an
+    # edited grammar is picked up on the next parse.
+    snapshot = registry.snapshot(language)
+    return _load_version(snapshot.language, snapshot.source_hash, snapshot)
+
+
+@functools.lru_cache(maxsize=MAX_LOADED_PACKS)
+def _load_version(language: str, source_hash: str,
+                  snapshot: GrammarSnapshot) -> Tuple[Grammar, LexiconIndex]:
+    return grammar_from_snapshot(snapshot), get_lexicon_index(language)
+
+
+# An Earley item: (rule index, dot position, origin set)
+Item = Tuple[int, int, int]
+
+
+class Chart:
+    """Earley chart for one sentence, built one word at a time.
+
+    With ``lookahead`` (the whole sentence, when it's known up front) a rule
+    is only predicted if its FIRST set has a tag of the next word, or it can
+    derive nothing. Skipped rules still record their FIRST tags as predicted,
+    so expected categories and failure points are unchanged.
+    """
+
+    def __init__(self, grammar: Grammar, lexicon: LexiconIndex,
+                 lookahead: Optional[List[str]] = None):
+        self.grammar = grammar
+        self.lexicon = lexicon
+        self.lookahead = lookahead
+        self.words: List[str] = []
+        self.sets: List[List[Item]] = []
+        self._seen: List[Set[Item]] = []
+        # Terminals predicted at each set, in first-seen order
+        self.predicted: List[Dict[str, None]] = []
+        # (symbol, start) -> ends, for every completed non-terminal span
+        self.spans: Dict[Tuple[str, int], Set[int]] = {}
+        # Span keys that gained each set's end, so pop() can take them back out
+        self._span_log: List[List[Tuple[str, int]]] = []
+        self.metrics = ParseMetrics()
+        self._new_set()
+        self._predict(0, grammar.start, self._next_tags(0))
+        self._close(0)
+
+    def _new_set(self) -> None:
+        self.sets.append([])
+        self._seen.append(set())
+        self.predicted.append({})
+        self._span_log.append([])
+
+    def _add(self, k: int, item: Item) -> None:
+        if item not in self._seen[k]:
+            self._seen[k].add(item)
+            self.sets[k].append(item)
+            self.metrics.statesGenerated += 1
+
+    def _next_tags(self, k: int) -> Optional[frozenset]:
+        """Tags of word k when the sentence is known up front (none past its end), else None."""
+        if self.lookahead is None:
+            return None
+        if k >= len(self.lookahead):
+            return frozenset()
+        entry = self.lexicon.get(self.lookahead[k])
+        return frozenset(entry.tags) if entry else frozenset()
+
+    def _predict(self, k: int, symbol: str, next_tags: Optional[frozenset]) -> None:
+        grammar = self.grammar
+        for r in grammar.by_lhs.get(symbol, []):
+            if (r, 0, k) in self._seen[k]:
+                continue
+            if (next_tags is not None and not grammar.rule_nullable[r]
+                    and next_tags.isdisjoint(grammar.rule_first[r])):
+                # Can't start with the next word: keep only what it would have predicted
+                self._seen[k].add((r, 0, k))
+                for tag in grammar.rule_first[r]:
+                    self.predicted[k].setdefault(tag, None)
+                continue
+            self.metrics.ruleExpansions += 1
+            self._add(k, (r, 0, k))
+
+    def _close(self, k: int) -> None:
+        """Run prediction and completion over set k until it stops growing."""
+        rules = self.grammar.rules
+        next_tags = self._next_tags(k)
+        items = self.sets[k]
+        j = 0
+        while j < len(items):
+            rule_i, dot, origin = items[j]
+            j += 1
+            self.metrics.statesExplored += 1
+            rhs = rules[rule_i].rhs
+            if dot < len(rhs):
+                symbol = rhs[dot]
+                if symbol in TERMINAL_TAGS:
+                    self.predicted[k].setdefault(symbol, None)
+                    continue
+                self._predict(k, symbol, next_tags)
+                if symbol in self.grammar.nullable:
+                    self._add(k, (rule_i, dot + 1, origin))
+            else:
+                lhs = rules[rule_i].lhs
+                ends = self.spans.setdefault((lhs, origin), set())
+                if k not in ends:
+                    ends.add(k)
+                    self._span_log[k].append((lhs, origin))
+                for p_rule, p_dot, p_origin in list(self.sets[origin]):
+                    p_rhs = rules[p_rule].rhs
+                    if p_dot < len(p_rhs) and p_rhs[p_dot] == lhs:
+                        self._add(k, (p_rule, p_dot + 1, p_origin))
+        self.metrics.maxQueueSize = max(self.metrics.maxQueueSize, len(items))
+
+    def push(self, word: str) -> None:
+        """Scan the next word into a new chart set."""
+        k = len(self.words)
+        self.words.append(word)
+        self._new_set()
+        entry = self.lexicon.get(word)
+        tags = entry.tags if entry else ()
+        rules = self.grammar.rules
+        for rule_i, dot, origin in self.sets[k]:
+            rhs = rules[rule_i].rhs
+            if dot < len(rhs) and rhs[dot] in TERMINAL_TAGS:
+                self.metrics.terminalAttempts += 1
+                if rhs[dot] in tags:
+                    self.metrics.terminalSuccesses += 1
+                    self._add(k + 1, (rule_i, dot + 1, origin))
+        self._close(k + 1)
+
+    def pop(self) -> str:
+        """Drop the last word and its chart set, undoing the last push.
+
+        Metrics are not rewound; callers that report them keep their own copy.
+        """
+        k = len(self.words)
+        for key in self._span_log.pop():
+            ends = self.spans[key]
+            ends.discard(k)
+            if not ends:
+                del self.spans[key]
+        self.sets.pop()
+        self._seen.pop()
+        self.predicted.pop()
+        return self.words.pop()
+
+    def expected(self, k: Optional[int] = None) -> List[str]:
+        """Terminal categories that can come next after the first k words."""
+        return list(self.predicted[len(self.words) if k is None else k])
+
+    def accepts(self) -> bool:
+        n = len(self.words)
+        return n in self.spans.get((self.grammar.start, 0), ())
+
+    def failure_point(self) -> Tuple[int, List[str]]:
+        """Furthest position where a terminal failed to match, as Parser.java tracks it.
+
+        Running out of words is reported against the last word, matching the
+        JAR's ``trackFailure(memory.getPosition(), ...)`` call.
+        """
+        n = len(self.words)
+        furthest = -1
+        expected: Dict[str, None] = {}
+        for k in range(n + 1):
+            if k < n:
+                entry = self.lexicon.get(self.words[k])
+                tags = entry.tags if entry else ()
+                missed = [t for t in self.predicted[k] if t not in tags]
+                position = k
+            else:
+                missed = list(self.predicted[k])
+                position = n - 1
+            if not missed or position < 0:
+                continue
+            if position > furthest:
+                furthest = position
+                expected = {}
+            for t in missed:
+                expected.setdefault(t, None)
+        return furthest, list(expected)
+
+
+class _Derivations:
+    """Best-derivation and parse-count DP over a completed chart."""
+
+    def __init__(self, chart: Chart):
+        self.chart = chart
+        self.rules = chart.grammar.rules
+        self._best: Dict[tuple, Optional[Tuple[int, ...]]] = {}
+        self._count: Dict[tuple, int] = {}
+        self._busy: Set[tuple] = set()
+        # (symbol, end) -> starts of its completed spans, latest first
+        self._starts: Dict[Tuple[str, int], List[int]] = {}
+        for (symbol, start), ends in chart.spans.items():
+            for end in ends:
+                self._starts.setdefault((symbol, end), []).append(start)
+        for starts in self._starts.values():
+            starts.sort(reverse=True)
+
+    def _has_span(self, symbol: str, i: int, j: int) -> bool:
+        if symbol in TERMINAL_TAGS:
+            if j != i + 1:
+                return False
+            entry = self.chart.lexicon.get(self.chart.words[i])
+            return entry is not None and symbol in entry.tags
+        return j in self.chart.spans.get((symbol, i), ())
+
+    def _split_points(self, rhs: Tuple[str, ...], d: int, i: int, j: int) -> List[int]:
+        symbol = rhs[d - 1]
+        if symbol in TERMINAL_TAGS:
+            return [j - 1] if j > i and self._has_span(symbol, j - 1, j) else []
+        return [p for p in self._starts.get((symbol, j), ()) if p >= i]
+
+    @staticmethod
+    def _better(a: Tuple[int, ...], b: Optional[Tuple[int, ...]]) -> bool:
+        return b is None or (len(a), a) < (len(b), b)
+
+    def best(self, symbol: str, i: int, j: int) -> Optional[Tuple[int, ...]]:
+        """Rule indices of the best derivation, in leftmost (preorder) order."""
+        if symbol in TERMINAL_TAGS:
+            return () if self._has_span(symbol, i, j) else None
+        key = ("sym", symbol, i, j)
+        if key in self._best:
+            return self._best[key]
+        if key in self._busy or not self._has_span(symbol, i, j):
+            return None
+        self._busy.add(key)
+        result = None
+        for r in self.chart.grammar.by_lhs.get(symbol, []):
+            seq = self._best_prefix(r, len(self.rules[r].rhs), i, j)
+            if seq is not None:
+                candidate = (r,) + seq
+                if self._better(candidate, result):
+                    result = candidate
+        self._busy.discard(key)
+        self._best[key] = result
+        return result
+
+    def _best_prefix(self, r: int, d: int, i: int, j: int) -> Optional[Tuple[int, ...]]:
+        if d == 0:
+            return () if i == j else None
+        key = ("pre", r, d, i, j)
+        if key in self._best:
+            return self._best[key]
+        rhs = self.rules[r].rhs
+        result = None
+        for p in self._split_points(rhs, d, i, j):
+            head = self._best_prefix(r, d - 1, i, p)
+            if head is None:
+                continue
+            tail = self.best(rhs[d - 1], p, j)
+            if tail is None:
+                continue
+            candidate = head + tail
+            if self._better(candidate, result):
+                result = candidate
+        self._best[key] = result
+        return result
+
+    def count(self, symbol: str, i: int, j: int) -> int:
+        """Number of distinct derivations, capped at MAX_PARSES."""
+        if symbol in TERMINAL_TAGS:
+            return 1 if self._has_span(symbol, i, j) else 0
+        key = ("sym", symbol, i, j)
+        if key in self._count:
+            return self._count[key]
+        if key in self._busy or not self._has_span(symbol, i, j):
+            return 0
+        self._busy.add(key)
+        total = 0
+        for r in self.chart.grammar.by_lhs.get(symbol, []):
+            total += self._count_prefix(r, len(self.rules[r].rhs), i, j)
+        self._busy.discard(key)
+        self._count[key] = min(total, MAX_PARSES)
+        return self._count[key]
+
+    def _count_prefix(self, r: int, d: int, i: int, j: int) -> int:
+        if d == 0:
+            return 1 if i == j else 0
+        key = ("pre", r, d, i, j)
+        if key in self._count:
+            return self._count[key]
+        rhs = self.rules[r].rhs
+        total = 0
+        for p in self._split_points(rhs, d, i, j):
+            head = self._count_prefix(r, d - 1, i, p)
+            if head:
+                total += head * self.count(rhs[d - 1], p, j)
+        self._count[key] = min(total, MAX_PARSES)
+        return self._count[key]
+
+
+def _replay(rules: List[Rule], derivation: Tuple[int, ...]) -> Tuple[ParseTreeNode, List[str]]:
+    """Rebuild the parse tree and matched tags from a leftmost derivation."""
+    steps = iter(derivation)
+    tags: List[str] = []
+
+    def build(symbol: str) -> ParseTreeNode:
+        rule = rules[next(steps)]
+        children = []
+        for rhs_symbol in rule.rhs:
+            if rhs_symbol in TERMINAL_TAGS:
+                tags.append(rhs_symbol)
+                children.append(ParseTreeNode(symbol=rhs_symbol, word=True))
+            else:
+                children.append(build(rhs_symbol))
+        return ParseTreeNode(symbol=symbol, children=children)
+
+    return build(rules[derivation[0]].lhs), tags
+
+
+def _finish_metrics(metrics: ParseMetrics, started: float) -> ParseMetrics:
+    metrics.parseTimeMs = round((time.perf_counter() - started) * 1000, 2)
+    return metrics
+
+
+def parse_with_chart(chart: Chart, started: Optional[float] = None) -> ParseResult:
+    """Turn a chart that has consumed every word into a ParseResult."""
+    started = time.perf_counter() if started is None else started
+    words = chart.words
+    sentence = " ".join(words)
+    lexicon = chart.lexicon
+    grammar = chart.grammar
+    n = len(words)
+
+    if chart.accepts():
+        derivations = _Derivations(chart)
+        best = derivations.best(grammar.start, 0, n)
+        parses = derivations.count(grammar.start, 0, n)
+        tree, tags = _replay(grammar.rules, best)
+        tokens = [
+            Token(
+                word=word,
+                tag=tags[i] if i < len(tags) else "UNKNOWN",
+                translation=lexicon[word].translation if word in lexicon else "",
+            )
+            for i, word in enumerate(words)
+        ]
+        rules_applied = [
+            RuleApplied(number=grammar.rules[r].number, rule=str(grammar.rules[r]))
+            for r in best
+        ]
+        return ParseResult(
+            valid=True,
+            sentence=sentence,
+            tokens=tokens,
+            parseTree=tree,
+            rulesApplied=rules_applied,
+            parses=parses,
+            ambiguous=parses > 1,
+            metrics=_finish_metrics(chart.metrics, started),
+        )
+
+    index, expected = chart.failure_point()
+    token = words[index] if index >= 0 else words[0]
+    index = max(0, index)
+    if expected:
+        message = f"Expected {' or '.join(expected)} at position {index}, found '{token}'"
+    else:
+        message = "Could not parse sentence"
+    return ParseResult(
+        valid=False,
+        sentence=sentence,
+        tokens=lexicon.tokens(words),
+        failure=FailureInfo(index=index, token=token, expectedCategories=expected, message=message),
+        metrics=_finish_metrics(chart.metrics, started),
+    )
+
+
+def parse_sentence_earley(sentence: str, language: str = "spanish") -> ParseResult:
+    """Parse a sentence in-process and return a ParseResult shaped like the JAR's."""
+    try:
+        grammar, lexicon = _load(language)
+    except ValueError as e:
+        return ParseResult(valid=False, sentence=sentence, error=str(e))
+
+    rejected = lexicon.preflight(sentence)
+    if rejected is not None:
+        return rejected
+
+    started = time.perf_counter()
+    words = tokenize(sentence)
+    chart = Chart(grammar, lexicon, lookahead=words)
+    for word in words:
+        chart.push(word)
+    return parse_with_chart(chart, started)
@@ -0,0 +1,240 @@
+"""Static analysis of a grammar pack, computed once per grammar version.
+
+From the rules and lexicon of a snapshot:
+
+- nullable non-terminals (derive the empty sentence)
+- FIRST sets (tags a symbol's derivations can start with) and FOLLOW sets
+  (tags that can come right after it; ``$`` is the end of the sentence)
+- unproductive symbols (derive no sentence, counting tags with no lexicon
+  words) and unreachable rules (left-hand side never reached from the start)
+- left-recursive non-terminals (A =>+ A ..., through nullable prefixes)
+- a tag -> words index over the lexicon
+
+The Earley engine uses each rule's FIRST set to skip predictions that can't
+start with the next word; the verifier loop's constraint feedback uses FIRST,
+FOLLOW and the word index.
+"""
+
+import functools
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .grammar_registry import MAX_LOADED_PACKS, get_snapshot
+from .grammar_snapshot import GrammarSnapshot
+from .models import GrammarAnalysisReport
+
+# Same terminal set as Parser.java
+TERMINAL_TAGS = frozenset({
+    "DET", "N", "V", "V_COP", "V_EX", "A", "ADV", "PREP", "CONJ", "PRON", "NEG",
+})
+END = "$"
+
+# (lhs, rhs) of each rule, in grammar file order
+Productions = Sequence[Tuple[str, Tuple[str, ...]]]
+
+
+def nullable_symbols(rules: Productions) -> Set[str]:
+    nullable: Set[str] = set()
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rhs in rules:
+            if lhs not in nullable and all(s in nullable for s in rhs):
+                nullable.add(lhs)
+                changed = True
+    return nullable
+
+
+def first_sets(rules: Productions, nullable: Set[str]) -> Dict[str, Dict[str, None]]:
+    """FIRST of every non-terminal, as insertion-ordered dicts of tags."""
+    first: Dict[str, Dict[str, None]] = {lhs: {} for lhs, _ in rules}
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rhs in rules:
+            target = first[lhs]
+            size = len(target)
+            target.update(dict.fromkeys(sequence_first(rhs, first, nullable)[0]))
+            changed |= len(target) != size
+    return first
+
+
+def sequence_first(symbols: Iterable[str], first: Dict[str, Dict[str, None]],
+                   nullable: Set[str]) -> Tuple[List[str], bool]:
+    """FIRST of a symbol sequence, and whether the whole sequence is nullable."""
+    tags: Dict[str, None] = {}
+    for symbol in symbols:
+        if symbol in TERMINAL_TAGS:
+            tags.setdefault(symbol, None)
+            return list(tags), False
+        tags.update(first.get(symbol, {}))
+        if symbol not in nullable:
+            return list(tags), False
+    return list(tags), True
+
+
+def follow_sets(start: str, rules: Productions, first: Dict[str, Dict[str, None]],
+                nullable: Set[str]) -> Dict[str, Dict[str, None]]:
+    """FOLLOW of every symbol, tags included (what can come right after a tag)."""
+    follow: Dict[str, Dict[str, None]] = {lhs: {} for lhs, _ in rules}
+    follow.setdefault(start, {})[END] = None
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rhs in rules:
+            for i, symbol in enumerate(rhs):
+                target = follow.setdefault(symbol, {})
+                size = len(target)
+                tags, rest_nullable = sequence_first(rhs[i + 1:], first, nullable)
+                target.update(dict.fromkeys(tags))
+                if rest_nullable:
+                    target.update(follow.get(lhs, {}))
+                changed |= len(target) != size
+    return follow
+
+
+def productive_symbols(rules: Productions, tags_with_words: Set[str]) -> Set[str]:
+    """Symbols deriving at least one sentence; a tag counts only if some word has it."""
+    productive = set(tags_with_words)
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rhs in rules:
+            if lhs not in productive and all(s in productive for s in rhs):
+                productive.add(lhs)
+                changed = True
+    return productive
+
+
+def reachable_symbols(start: str, rules: Productions) -> Set[str]:
+    by_lhs: Dict[str, List[Tuple[str, ...]]] = {}
+    for lhs, rhs in rules:
+        by_lhs.setdefault(lhs, []).append(rhs)
+    reachable = {start}
+    stack = [start]
+    while stack:
+        for rhs in by_lhs.get(stack.pop(), ()):
+            for symbol in rhs:
+                if symbol not in reachable:
+                    reachable.add(symbol)
+                    stack.append(symbol)
+    return reachable
+
+
+def left_recursive_symbols(rules: Productions, nullable: Set[str]) -> List[str]:
+    """Non-terminals A with A =>+ A ..., in grammar file order."""
+    # A -> B whenever B can be the leftmost symbol of one of A's rules
+    left: Dict[str, Set[str]] = {}
+    for lhs, rhs in rules:
+        edges = left.setdefault(lhs, set())
+        for symbol in rhs:
+            if symbol in TERMINAL_TAGS:
+                break
+            edges.add(symbol)
+            if symbol not in nullable:
+                break
+
+    def reaches_itself(symbol: str) -> bool:
+        seen: Set[str] = set()
+        stack = list(left.get(symbol, ()))
+        while stack:
+            current = stack.pop()
+            if current == symbol:
+                return True
+            if current not in seen:
+                seen.add(current)
+                stack.extend(left.get(current, ()))
+        return False
+
+    return [symbol for symbol in left if reaches_itself(symbol)]
+
+
+class GrammarAnalysis:
+    """Every table for one grammar version."""
+
+    def __init__(self, snapshot: GrammarSnapshot):
+        self.language = snapshot.language
+        self.source_hash = snapshot.source_hash
+        self.start = snapshot.start
+        self.rules = [(number, lhs, rhs) for number, lhs, rhs, _ in snapshot.rules]
+        productions = [(lhs, rhs) for _, lhs, rhs in self.rules]
+
+        self.nonterminals: List[str] = list(dict.fromkeys(lhs for lhs, _ in productions))
+        used = dict.fromkeys(s for _, rhs in productions for s in rhs)
+        self.terminals: List[str] = [s for s in used if s in TERMINAL_TAGS]
+        # Used on a right-hand side, but neither a tag nor defined by a rule
+        self.undefined: List[str] = [s for s in used if s not in TERMINAL_TAGS and s not in self.nonterminals]
+
+        self.tag_words: Dict[str, List[str]] = {}
+        self.word_tags: Dict[str, List[str]] = {}
+        for kw, tags, _ in snapshot.lexicon:
+            word = kw.strip().lower()
+            if word:
+                for tag in tags:
+                    self.tag_words.setdefault(tag.strip(), []).append(word)
+                    self.word_tags.setdefault(word, []).append(tag.strip())
+        for tag, words in self.tag_words.items():
+            self.tag_words[tag] = sorted(set(words))
+
+        self.nullable = nullable_symbols(productions)
+        self.first = first_sets(productions, self.nullable)
+        self.follow = follow_sets(self.start, productions, self.first, self.nullable)
+        productive = productive_symbols(productions, set(self.tag_words) & TERMINAL_TAGS)
+        self.unproductive: List[str] = [s for s in self.nonterminals + self.terminals + self.undefined
+                                        if s not in productive]
+        reachable = reachable_symbols(self.start, productions)
+        self.unreachable_rules: List[int] = [number for number, lhs, _ in self.rules if lhs not in reachable]
+        self.left_recursive = left_recursive_symbols(productions, self.nullable)
+        self._report: Optional[GrammarAnalysisReport] = None
+
+    def first_of(self, symbols: Sequence[str]) -> List[str]:
+        return sequence_first(symbols, self.first, self.nullable)[0]
+
+    def can_follow(self, tag: str) -> List[str]:
+        """Tags that can come right after ``tag`` somewhere in the grammar (``$``: end)."""
+        return list(self.follow.get(tag, {}))
+
+    def can_follow_word(self, word: str) -> List[str]:
+        """Tags that can come right after any of ``word``'s lexicon tags (``$``: end)."""
+        follow: Dict[str, None] = {}
+        for tag in self.word_tags.get(word.strip().lower(), ()):
+            follow.update(self.follow.get(tag, {}))
+        return list(follow)
+
+    def examples(self, tag: str, limit: int = 3) -> List[str]:
+        return self.tag_words.get(tag, [])[:limit]
+
+    def report(self) -> GrammarAnalysisReport:
+        if self._report is None:
+            self._report = self._build_report()
+        return self._report
+
+    def _build_report(self) -> GrammarAnalysisReport:
+        ordered = self.nonterminals + self.terminals
+        return GrammarAnalysisReport(
+            language=self.language,
+            source_hash=self.source_hash,
+            start=self.start,
+            nonterminals=self.nonterminals,
+            terminals=self.terminals,
+            undefined=self.undefined,
+            nullable=[s for s in self.nonterminals if s in self.nullable],
+            first={s: list(self.first[s]) for s in self.nonterminals},
+            follow={s: list(self.follow[s]) for s in ordered if s in self.follow},
+            unproductive=self.unproductive,
+            unreachable_rules=self.unreachable_rules,
+            left_recursive=self.left_recursive,
+            tag_words=self.tag_words,
+        )
+
+
+def get_analysis(language: str) -> Optional[GrammarAnalysis]:
+    """The analysis for a language's current grammar, or None if there is no such pack."""
+    snapshot = get_snapshot(language)
+    if snapshot is None:
+        return None
+    return _analysis_version(snapshot.language, snapshot.source_hash, snapshot)
+
+
+@functools.lru_cache(maxsize=MAX_LOADED_PACKS)
+def _analysis_version(language: str, source_hash: str, snapshot: GrammarSnapshot) -> GrammarAnalysis:
+    return GrammarAnalysis(snapshot)
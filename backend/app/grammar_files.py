@@ -0,0 +1,54 @@
+"""Locate grammar and lexicon XML files and fingerprint their contents."""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+RESOURCES = _PROJECT_ROOT / "src" / "src" / "main" / "resources"
+
+# Directory holding the grammar packs: <language>_grammar.xml + <language>_lexicon.xml
+GRAMMAR_DIR = Path(os.environ.get("GRAMMAR_DIR", RESOURCES))
+
+_hash_cache: Dict[str, Tuple[tuple, str]] = {}
+_hash_lock = threading.Lock()
+
+
+def grammar_paths(language: str) -> Tuple[Path, Path]:
+    lang = language.lower()
+    return GRAMMAR_DIR / f"{lang}_grammar.xml", GRAMMAR_DIR / f"{lang}_lexicon.xml"
+
+
+def available_languages() -> List[str]:
+    """Languages with both a grammar and a lexicon file in GRAMMAR_DIR."""
+    languages = []
+    for path in GRAMMAR_DIR.glob("*_grammar.xml"):
+        language = path.name[: -len("_grammar.xml")]
+        if grammar_paths(language)[1].exists():
+            languages.append(language.lower())
+    return sorted(languages)
+
+
+def grammar_hash(language: str) -> str:
+    """SHA-256 over the grammar and lexicon XML, recomputed only when either file changes."""
+    paths = grammar_paths(language)
+    stamp = tuple(
+        (p.stat().st_mtime_ns, p.stat().st_size) if p.exists() else None
+        for p in paths
+    )
+    lang = language.lower()
+    with _hash_lock:
+        cached = _hash_cache.get(lang)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+    digest = hashlib.sha256()
+    for p in paths:
+        digest.update(p.read_bytes() if p.exists() else b"")
+        digest.update(b"\0")
+    value = digest.hexdigest()
+    with _hash_lock:
+        _hash_cache[lang] = (stamp, value)
+    return value
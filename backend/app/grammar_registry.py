@@ -0,0 +1,218 @@
+"""Grammar packs: discovery, lazy loading, a bounded set of loaded packs and hot reload.
+
+A pack is a ``<language>_grammar.xml`` / ``<language>_lexicon.xml`` pair in
+``GRAMMAR_DIR``. Packs are discovered by scanning the directory (again
+whenever an unknown language is asked for, so new packs need no restart)
+and loaded on first use from their snapshot (see grammar_snapshot.py). At
+most ``GRAMMAR_MAX_LOADED`` packs stay in memory; the least recently used
+one is unloaded to make room.
+
+Every use checks the files' content hash (a stat while they're unchanged).
+When a pack's files change it's reloaded and the new snapshot swapped in;
+requests already holding the old snapshot finish with it. A pack whose new
+files fail to load keeps serving its previous version.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from . import metrics
+from .grammar_files import available_languages, grammar_hash, grammar_paths
+from .grammar_snapshot import GrammarSnapshot, load_payload
+
+MAX_LOADED_PACKS = int(os.environ.get("GRAMMAR_MAX_LOADED", "8"))
+
+
+class UnknownLanguage(ValueError):
+    """No grammar pack for this language in GRAMMAR_DIR."""
+
+
+class GrammarPackError(ValueError):
+    """A pack's files couldn't be loaded and there is no earlier version to serve."""
+
+
+class GrammarPack:
+    """One language's files, and its snapshot while loaded."""
+
+    def __init__(self, language: str):
+        self.language = language
+        self.snapshot: Optional[GrammarSnapshot] = None
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.failures = 0
+        self.last_used: Optional[float] = None
+        # Last load failure, and the source hash it happened at
+        self.error: Optional[str] = None
+        self.failed_hash: Optional[str] = None
+        self.lock = threading.Lock()
+
+    def needs_load(self, source_hash: str) -> bool:
+        """No snapshot or an outdated one, and these files haven't already failed."""
+        snapshot = self.snapshot
+        current = snapshot is not None and snapshot.source_hash == source_hash
+        return not current and self.failed_hash != source_hash
+
+    def state(self, source_hash: str) -> str:
+        if self.failed_hash == source_hash:
+            # An earlier snapshot, if any, is still being served
+            return "error"
+        if self.snapshot is None:
+            return "unloaded"
+        if self.snapshot.source_hash != source_hash:
+            # Edited since loading: reloaded on next use
+            return "stale"
+        return "loaded"
+
+
+class GrammarRegistry:
+    def __init__(self, max_loaded: int = MAX_LOADED_PACKS):
+        self.max_loaded = max(1, max_loaded)
+        self._packs: Dict[str, GrammarPack] = {}
+        # Loaded packs, least recently used first
+        self._loaded: "OrderedDict[str, GrammarPack]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def discover(self) -> List[str]:
+        """Rescan GRAMMAR_DIR, adding new packs and forgetting removed ones."""
+        found = available_languages()
+        with self._lock:
+            for language in found:
+                if language not in self._packs:
+                    self._packs[language] = GrammarPack(language)
+            for language in set(self._packs) - set(found):
+                del self._packs[language]
+                self._loaded.pop(language, None)
+        return found
+
+    def languages(self) -> List[str]:
+        with self._lock:
+            return sorted(self._packs)
+
+    def resolve(self, language: str) -> GrammarPack:
+        """The pack for a language name (any case). Raises UnknownLanguage."""
+        lang = language.strip().lower()
+        pack = self._packs.get(lang)
+        if pack is None and lang in self.discover():
+            pack = self._packs.get(lang)
+        if pack is None:
+            available = ", ".join(self.languages()) or "none"
+            raise UnknownLanguage(f"Unknown language: {language!r}. Available: {available}")
+        return pack
+
+    def snapshot(self, language: str) -> GrammarSnapshot:
+        """The current snapshot for a language, loading or reloading it as needed."""
+        pack = self.resolve(language)
+        grammar_path, lexicon_path = grammar_paths(pack.language)
+        if not grammar_path.exists() or not lexicon_path.exists():
+            # Removed since the last scan
+            self.discover()
+            raise UnknownLanguage(f"Unknown language: {language!r}")
+        source_hash = grammar_hash(pack.language)
+
+        if pack.needs_load(source_hash):
+            with pack.lock:
+                if pack.needs_load(source_hash):
+                    self._load(pack, source_hash)
+        snapshot = pack.snapshot
+        if snapshot is None:
+            raise GrammarPackError(f"Grammar pack {pack.language!r} failed to load: {pack.error}")
+        self._touch(pack)
+        return snapshot
+
+    def _load(self, pack: GrammarPack, source_hash: str) -> None:
+        reload = pack.snapshot is not None
+        try:
+            snapshot = GrammarSnapshot(load_payload(pack.language, source_hash))
+        except Exception as e:
+            # Not retried until the files change again
+            pack.error = f"{type(e).__name__}: {e}"
+            pack.failed_hash = source_hash
+            pack.failures += 1
+            return
+        # Swapped in one assignment; callers holding the old snapshot keep using it
+        pack.snapshot = snapshot
+        pack.error = pack.failed_hash = None
+        pack.loads += 1
+        if reload:
+            pack.reloads += 1
+
+    def _touch(self, pack: GrammarPack) -> None:
+        pack.last_used = time.time()
+        with self._lock:
+            self._loaded[pack.language] = pack
+            self._loaded.move_to_end(pack.language)
+            while len(self._loaded) > self.max_loaded:
+                _, evicted = self._loaded.popitem(last=False)
+                evicted.snapshot = None
+                evicted.evictions += 1
+
+    def listing(self) -> List[dict]:
+        """Every discovered pack with its current hash and load state, for /languages."""
+        rows = []
+        for language in self.discover():
+            pack = self._packs.get(language)
+            if pack is None:
+                continue
+            source_hash = grammar_hash(language)
+            snapshot = pack.snapshot
+            rows.append({
+                "language": language,
+                "state": pack.state(source_hash),
+                "source_hash": source_hash,
+                "loaded_hash": snapshot.source_hash if snapshot is not None else None,
+                "loads": pack.loads,
+                "reloads": pack.reloads,
+                "evictions": pack.evictions,
+                "failures": pack.failures,
+                "last_used": pack.last_used,
+                "error": pack.error,
+            })
+        return rows
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            packs = list(self._packs.values())
+        return [
+            {
+                "language": pack.language,
+                "loaded": int(pack.snapshot is not None),
+                "loads": pack.loads,
+                "reloads": pack.reloads,
+                "evictions": pack.evictions,
+                "failures": pack.failures,
+            }
+            for pack in packs
+        ]
+
+    def clear(self) -> None:
+        """Unload every pack (tests and benchmarks)."""
+        with self._lock:
+            for pack in self._loaded.values():
+                pack.snapshot = None
+            self._loaded.clear()
+
+
+registry = GrammarRegistry()
+
+
+def get_snapshot(language: str) -> Optional[GrammarSnapshot]:
+    """The current snapshot for a language, or None if there is no such pack."""
+    try:
+        return registry.snapshot(language)
+    except UnknownLanguage:
+        return None
+
+
+def resolve_language(language: str) -> str:
+    """The canonical (lowercase) name of a known language. Raises UnknownLanguage."""
+    return registry.resolve(language).language
+
+
+@metrics.collector
+def _collect_metrics():
+    rows = [({"language": s.pop("language")}, s) for s in registry.stats()]
+    return metrics.stats_samples("grammar_oracle_grammar_pack", "Grammar pack registry", rows)
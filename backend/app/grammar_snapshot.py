@@ -0,0 +1,175 @@
+"""Precompiled grammar snapshots: one compact binary file per language.
+
+Compiling reads the grammar and lexicon XML once and stores rules grouped by
+LHS, an interned symbol table, raw lexicon entries, tag sets and rule comments,
+stamped with the XML content hash. ``grammar_registry`` loads each snapshot
+on first use and only recompiles when the source hash changes, so stats,
+grammar detail, the lexicon index and the Earley engine never re-parse XML
+per request.
+
+Compile ahead of time with ``python -m app.grammar_snapshot [language ...]``.
+"""
+
+from __future__ import annotations
+import marshal
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from .grammar_files import available_languages, grammar_hash, grammar_paths
+
+SNAPSHOT_DIR = Path(os.environ.get(
+    "GRAMMAR_SNAPSHOT_DIR",
+    Path(__file__).resolve().parent.parent / ".snapshots",
+))
+
+# Bump when the payload layout changes; the marshal version guards Python upgrades
+_MAGIC = b"GOSNAP"
+_FORMAT = 1
+_HEADER = _MAGIC + bytes([_FORMAT, marshal.version])
+
+_COMMENT_RE = re.compile(r"<!--\s*([^>]*?)\s*-->\s*\n\s*<rule\s+number=\"(\d+)\"")
+
+
+class GrammarSnapshot:
+    """Everything the backend needs from one language's XML, decoded from a snapshot."""
+
+    def __init__(self, payload: dict):
+        self.language: str = payload["language"]
+        self.source_hash: str = payload["source_hash"]
+        self.start: str = payload["start"]
+        symbols: List[str] = payload["symbols"]
+        self.symbols = symbols
+
+        # (number, lhs, rhs, comment) in grammar file order
+        self.rules: List[Tuple[int, str, Tuple[str, ...], str]] = [
+            (number, symbols[lhs], tuple(symbols[s] for s in rhs), comment)
+            for number, lhs, rhs, comment in payload["rules"]
+        ]
+        self.rules_by_lhs: Dict[str, List[int]] = {
+            symbols[lhs]: list(indices) for lhs, indices in payload["rules_by_lhs"].items()
+        }
+        # Raw lexicon entries in file order: (kw, tags, translation or None)
+        self.lexicon: List[Tuple[str, Tuple[str, ...], Optional[str]]] = [
+            (kw, tuple(symbols[t] for t in tags), en)
+            for kw, tags, en in payload["lexicon"]
+        ]
+        self.pos_tags: List[str] = [symbols[t] for t in payload["pos_tags"]]
+        self.lexicon_words: int = payload["lexicon_words"]
+
+
+def compile_payload(language: str) -> dict:
+    """Read a language's XML into the plain-data payload stored in a snapshot."""
+    lang = language.lower()
+    grammar_path, lexicon_path = grammar_paths(lang)
+    source_hash = grammar_hash(lang)
+
+    symbols: List[str] = []
+    symbol_ids: Dict[str, int] = {}
+
+    def intern(symbol: str) -> int:
+        if symbol not in symbol_ids:
+            symbol_ids[symbol] = len(symbols)
+            symbols.append(symbol)
+        return symbol_ids[symbol]
+
+    start = "SENTENCE"
+    rules = []
+    rules_by_lhs: Dict[int, List[int]] = {}
+    if grammar_path.exists():
+        raw_xml = grammar_path.read_text(encoding="utf-8")
+        # ElementTree drops comments, so recover the one right before each rule
+        comments: Dict[int, str] = {}
+        for match in _COMMENT_RE.finditer(raw_xml):
+            text = match.group(1).strip()
+            # Skip section header comments (those starting with ===)
+            if not text.startswith("==="):
+                comments[int(match.group(2))] = text
+
+        root = ElementTree.fromstring(raw_xml)
+        start = root.get("start", "SENTENCE")
+        for el in root.findall("rule"):
+            number = int(el.get("number", "0"))
+            lhs = intern(el.findtext("lhs") or "")
+            rhs = tuple(intern(r.text or "") for r in el.findall("rhs"))
+            rules_by_lhs.setdefault(lhs, []).append(len(rules))
+            rules.append((number, lhs, rhs, comments.get(number, "")))
+
+    lexicon = []
+    words = set()
+    tags = set()
+    if lexicon_path.exists():
+        for el in ElementTree.parse(lexicon_path).getroot().findall("entry"):
+            kw = el.findtext("kw") or ""
+            entry_tags = tuple(intern(t.text or "") for t in el.findall("posTag"))
+            lexicon.append((kw, entry_tags, el.findtext("en")))
+            if kw.strip():
+                words.add(kw.strip().lower())
+            tags.update(symbols[t].strip() for t in entry_tags)
+    tags.discard("")
+
+    return {
+        "language": lang,
+        "source_hash": source_hash,
+        "start": start,
+        "symbols": symbols,
+        "rules": rules,
+        "rules_by_lhs": rules_by_lhs,
+        "lexicon": lexicon,
+        "pos_tags": [intern(t) for t in sorted(tags)],
+        "lexicon_words": len(words),
+    }
+
+
+def snapshot_path(language: str) -> Path:
+    return SNAPSHOT_DIR / f"{language.lower()}.snapshot"
+
+
+def write_snapshot(language: str) -> dict:
+    payload = compile_payload(language)
+    path = snapshot_path(language)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(_HEADER + marshal.dumps(payload))
+    os.replace(tmp, path)
+    return payload
+
+
+def read_snapshot(language: str) -> Optional[dict]:
+    """Read a snapshot file, or None if it is missing or from another format."""
+    path = snapshot_path(language)
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    if not data.startswith(_HEADER):
+        return None
+    try:
+        return marshal.loads(data[len(_HEADER):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def load_payload(language: str, source_hash: str) -> dict:
+    """The payload for the current XML: from the snapshot file, recompiled if stale."""
+    payload = read_snapshot(language)
+    if payload is None or payload.get("source_hash") != source_hash:
+        try:
+            payload = write_snapshot(language)
+        except OSError:
+            # Read-only snapshot dir: still serve from memory
+            payload = compile_payload(language)
+    return payload
+
+
+if __name__ == "__main__":
+    for language in sys.argv[1:] or available_languages():
+        payload = write_snapshot(language)
+        print(
+            f"{language}: {len(payload['rules'])} rules, {len(payload['lexicon'])} lexicon entries, "
+            f"{len(payload['symbols'])} symbols -> {snapshot_path(language)} "
+            f"({snapshot_path(language).stat().st_size} bytes, hash {payload['source_hash'][:12]})"
+        )
@@ -1,114 +1,226 @@
-"""Compute grammar and lexicon statistics from XML files."""
+"""Compute grammar and lexicon statistics from the precompiled grammar snapshot."""
 
-from pathlib import Path
-from xml.etree import ElementTree
-import re
+import base64
+import bisect
+import functools
+import json
+from typing import Dict, Iterable, List, Optional, Set
 
+from .grammar_registry import MAX_LOADED_PACKS, get_snapshot
+from .grammar_snapshot import GrammarSnapshot
 from .models import GrammarStats, GrammarDetail, GrammarRule, LexiconEntry
 
-_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
-_RESOURCES = _PROJECT_ROOT / "src" / "src" / "main" / "resources"
-
 
 def get_grammar_stats(language: str = "spanish") -> GrammarStats:
     lang = language.lower()
-    grammar_path = _RESOURCES / f"{lang}_grammar.xml"
-    lexicon_path = _RESOURCES / f"{lang}_lexicon.xml"
+    snapshot = get_snapshot(lang)
+    if snapshot is None:
+        return GrammarStats(language=lang, grammar_rules=0, lexicon_words=0, pos_tags=[])
+    return _stats(snapshot.language, snapshot.source_hash, snapshot)
 
-    # Count grammar rules
-    grammar_rules = 0
-    if grammar_path.exists():
-        tree = ElementTree.parse(grammar_path)
-        grammar_rules = len(tree.findall(".//rule"))
 
-    # Count unique lexicon words and POS tags
-    lexicon_words = 0
-    pos_tags: set[str] = set()
-    if lexicon_path.exists():
-        tree = ElementTree.parse(lexicon_path)
-        entries = tree.findall(".//entry")
-        words_seen: set[str] = set()
-        for entry in entries:
-            kw = entry.findtext("kw", "").strip().lower()
-            if kw:
-                words_seen.add(kw)
-            for tag_el in entry.findall("posTag"):
-                tag = (tag_el.text or "").strip()
-                if tag:
-                    pos_tags.add(tag)
-        lexicon_words = len(words_seen)
+def get_grammar_detail(language: str = "spanish") -> GrammarDetail:
+    lang = language.lower()
+    snapshot = get_snapshot(lang)
+    if snapshot is None:
+        return GrammarDetail(language=lang, grammar_rules=[], lexicon_entries=[], pos_tags=[])
+    return _index(snapshot.language, snapshot.source_hash, snapshot).detail
+
+
+def grammar_detail_etag(language: str = "spanish") -> Optional[str]:
+    """Strong ETag for every /grammar-detail response of a language: the grammar hash."""
+    snapshot = get_snapshot(language)
+    return f'"{snapshot.source_hash}"' if snapshot is not None else None
+
+
+def query_grammar_detail(
+    language: str = "spanish",
+    tag: Optional[str] = None,
+    prefix: Optional[str] = None,
+    translation: Optional[str] = None,
+    lhs: Optional[str] = None,
+    rhs: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> GrammarDetail:
+    """Filter rules and lexicon entries through the indexes and return one page.
+
+    Lexicon filters (tag, prefix, translation) and rule filters (lhs, rhs) are
+    ANDed within each list. ``limit`` caps each list separately; pass the
+    returned ``next_cursor`` back to get the following page. Raises ValueError
+    for a malformed cursor or one issued for a different grammar version.
+    """
+    lang = language.lower()
+    snapshot = get_snapshot(lang)
+    if snapshot is None:
+        return GrammarDetail(language=lang, grammar_rules=[], lexicon_entries=[], pos_tags=[])
+    index = _index(snapshot.language, snapshot.source_hash, snapshot)
+
+    rule_offset, entry_offset = _decode_cursor(cursor, snapshot.source_hash) if cursor else (0, 0)
+    rule_ids = index.find_rules(lhs, rhs)
+    entry_ids = index.find_entries(tag, prefix, translation)
+
+    rule_end = len(rule_ids) if limit is None else rule_offset + limit
+    entry_end = len(entry_ids) if limit is None else entry_offset + limit
+    next_cursor = None
+    if rule_end < len(rule_ids) or entry_end < len(entry_ids):
+        next_cursor = _encode_cursor(
+            snapshot.source_hash, min(rule_end, len(rule_ids)), min(entry_end, len(entry_ids)),
+        )
 
-    return GrammarStats(
-        language=lang,
-        grammar_rules=grammar_rules,
-        lexicon_words=lexicon_words,
-        pos_tags=sorted(pos_tags),
+    return GrammarDetail(
+        language=snapshot.language,
+        grammar_rules=[index.rules[i] for i in rule_ids[rule_offset:rule_end]],
+        lexicon_entries=[index.entries[i] for i in entry_ids[entry_offset:entry_end]],
+        pos_tags=index.detail.pos_tags,
+        total_rules=len(rule_ids),
+        total_lexicon_entries=len(entry_ids),
+        next_cursor=next_cursor,
     )
 
 
-def _extract_comment_before(element: ElementTree.Element, parent_text: str) -> str:
-    """Extract the XML comment immediately preceding a rule element."""
-    # We parse comments from raw XML since ElementTree doesn't preserve them
-    return ""
+def _encode_cursor(source_hash: str, rule_offset: int, entry_offset: int) -> str:
+    raw = json.dumps({"h": source_hash[:16], "r": rule_offset, "l": entry_offset})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, source_hash: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        rule_offset, entry_offset = int(data["r"]), int(data["l"])
+        cursor_hash = data["h"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_hash != source_hash[:16]:
+        raise ValueError("Cursor is from an older grammar version; restart pagination")
+    if rule_offset < 0 or entry_offset < 0:
+        raise ValueError("Invalid cursor")
+    return rule_offset, entry_offset
+
+
+class GrammarDetailIndex:
+    """The full GrammarDetail plus lookup indexes over its rules and entries.
+
+    Every index maps to positions in file order, so filtered results keep the
+    order of the unfiltered response.
+    """
+
+    def __init__(self, detail: GrammarDetail):
+        self.detail = detail
+        self.rules = detail.grammar_rules
+        self.entries = detail.lexicon_entries
+
+        self.rules_by_lhs: Dict[str, List[int]] = {}
+        self.rules_by_rhs: Dict[str, List[int]] = {}
+        for i, rule in enumerate(self.rules):
+            self.rules_by_lhs.setdefault(rule.lhs, []).append(i)
+            for symbol in dict.fromkeys(rule.rhs):
+                self.rules_by_rhs.setdefault(symbol, []).append(i)
+
+        self.entries_by_tag: Dict[str, List[int]] = {}
+        # (lowercase word, position) sorted by word, for prefix range lookups
+        self.words_sorted: List[tuple] = []
+        # Trigrams of each lowercase translation, for substring search
+        self.translation_trigrams: Dict[str, Set[int]] = {}
+        self._translations: List[str] = []
+        for i, entry in enumerate(self.entries):
+            self.entries_by_tag.setdefault(entry.tag, []).append(i)
+            self.words_sorted.append((entry.word.lower(), i))
+            text = entry.translation.lower()
+            self._translations.append(text)
+            for j in range(len(text) - 2):
+                self.translation_trigrams.setdefault(text[j:j + 3], set()).add(i)
+        self.words_sorted.sort()
+
+    def find_rules(self, lhs: Optional[str], rhs: Optional[str]) -> List[int]:
+        candidates = []
+        if lhs:
+            candidates.append(self.rules_by_lhs.get(lhs, []))
+        if rhs:
+            candidates.append(self.rules_by_rhs.get(rhs, []))
+        return _intersect(candidates, len(self.rules))
+
+    def find_entries(self, tag: Optional[str], prefix: Optional[str],
+                     translation: Optional[str]) -> List[int]:
+        candidates = []
+        if tag:
+            candidates.append(self.entries_by_tag.get(tag, []))
+        if prefix:
+            candidates.append(self._by_prefix(prefix.lower()))
+        if translation:
+            candidates.append(self._by_translation(translation.lower()))
+        return _intersect(candidates, len(self.entries))
+
+    def _by_prefix(self, prefix: str) -> List[int]:
+        start = bisect.bisect_left(self.words_sorted, (prefix,))
+        matches = []
+        for word, i in self.words_sorted[start:]:
+            if not word.startswith(prefix):
+                break
+            matches.append(i)
+        return matches
+
+    def _by_translation(self, needle: str) -> Iterable[int]:
+        if len(needle) < 3:
+            return [i for i, text in enumerate(self._translations) if needle in text]
+        trigrams = [needle[j:j + 3] for j in range(len(needle) - 2)]
+        candidates = set.intersection(*(self.translation_trigrams.get(t, set()) for t in trigrams))
+        # Trigrams can all match without the whole needle appearing in order
+        return [i for i in candidates if needle in self._translations[i]]
+
+
+def _intersect(candidates: List[Iterable[int]], size: int) -> List[int]:
+    if not candidates:
+        return list(range(size))
+    matches = set(candidates[0])
+    for other in candidates[1:]:
+        matches.intersection_update(other)
+    return sorted(matches)
+
+
+# Responses and indexes are built once per grammar version and served from memory
+
+@functools.lru_cache(maxsize=MAX_LOADED_PACKS)
+def _stats(language: str, source_hash: str, snapshot: GrammarSnapshot) -> GrammarStats:
+    return GrammarStats(
+        language=language,
+        grammar_rules=len(snapshot.rules),
+        lexicon_words=snapshot.lexicon_words,
+        pos_tags=snapshot.pos_tags,
+    )
 
 
-def get_grammar_detail(language: str = "spanish") -> GrammarDetail:
-    lang = language.lower()
-    grammar_path = _RESOURCES / f"{lang}_grammar.xml"
-    lexicon_path = _RESOURCES / f"{lang}_lexicon.xml"
+@functools.lru_cache(maxsize=MAX_LOADED_PACKS)
+def _index(language: str, source_hash: str, snapshot: GrammarSnapshot) -> GrammarDetailIndex:
+    rules = [
+        GrammarRule(
+            number=number,
+            lhs=lhs.strip(),
+            rhs=[r.strip() for r in rhs],
+            comment=comment,
+        )
+        for number, lhs, rhs, comment in snapshot.rules
+    ]
 
-    rules: list[GrammarRule] = []
+    entries: list[LexiconEntry] = []
     pos_tags: set[str] = set()
-
-    if grammar_path.exists():
-        # Parse comments from raw XML
-        raw_xml = grammar_path.read_text(encoding="utf-8")
-        # Map rule numbers to their immediately preceding comment
-        comment_map: dict[int, str] = {}
-        for match in re.finditer(
-            r"<!--\s*([^>]*?)\s*-->\s*\n\s*<rule\s+number=\"(\d+)\"",
-            raw_xml,
-        ):
-            comment_text = match.group(1).strip()
-            # Skip section header comments (those starting with ===)
-            if comment_text.startswith("==="):
-                continue
-            rule_num = int(match.group(2))
-            comment_map[rule_num] = comment_text
-
-        tree = ElementTree.parse(grammar_path)
-        for rule_el in tree.findall(".//rule"):
-            number = int(rule_el.get("number", "0"))
-            lhs = (rule_el.findtext("lhs") or "").strip()
-            rhs_elements = [
-                (r.text or "").strip() for r in rule_el.findall("rhs")
-            ]
-            comment = comment_map.get(number, "")
-            rules.append(GrammarRule(
-                number=number,
-                lhs=lhs,
-                rhs=rhs_elements,
-                comment=comment,
+    for kw, tags, translation in snapshot.lexicon:
+        word = kw.strip()
+        tag = tags[0].strip() if tags else ""
+        if word and tag:
+            entries.append(LexiconEntry(
+                word=word,
+                tag=tag,
+                translation=(translation or "").strip(),
             ))
+            pos_tags.add(tag)
 
-    entries: list[LexiconEntry] = []
-    if lexicon_path.exists():
-        tree = ElementTree.parse(lexicon_path)
-        for entry_el in tree.findall(".//entry"):
-            word = (entry_el.findtext("kw") or "").strip()
-            tag = (entry_el.findtext("posTag") or "").strip()
-            translation = (entry_el.findtext("en") or "").strip()
-            if word and tag:
-                entries.append(LexiconEntry(
-                    word=word,
-                    tag=tag,
-                    translation=translation,
-                ))
-                pos_tags.add(tag)
-
-    return GrammarDetail(
-        language=lang,
+    return GrammarDetailIndex(GrammarDetail(
+        language=language,
         grammar_rules=rules,
         lexicon_entries=entries,
         pos_tags=sorted(pos_tags),
-    )
+        total_rules=len(rules),
+        total_lexicon_entries=len(entries),
+    ))
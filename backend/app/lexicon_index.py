@@ -0,0 +1,130 @@
+"""In-memory lexicon index: word -> POS tags and translation, built once per language.
+
+Lets the backend tag tokens and reject sentences with out-of-lexicon words
+without calling the parser at all.
+"""
+
+from __future__ import annotations
+import functools
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .grammar_registry import MAX_LOADED_PACKS, get_snapshot
+from .grammar_snapshot import GrammarSnapshot
+from .models import FailureInfo, ParseMetrics, ParseResult, Token
+
+# Sentence.java keeps Spanish letters and Java's \s whitespace class only
+_STRIP_CHARS = re.compile(r"[^a-zA-ZáéíóúñüÁÉÍÓÚÑÜ \t\n\x0b\f\r]")
+_WHITESPACE = re.compile(r"[ \t\n\x0b\f\r]+")
+_JAVA_TRIM = "".join(chr(c) for c in range(0x21))
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase words exactly as Sentence.java does."""
+    cleaned = _STRIP_CHARS.sub("", text).strip(_JAVA_TRIM).lower()
+    return _WHITESPACE.split(cleaned) if cleaned else []
+
+
+class LexiconEntry(NamedTuple):
+    word: str
+    tags: tuple
+    translation: str
+
+
+def merge_entries(raw: Iterable[Tuple[str, tuple, Optional[str]]]) -> Dict[str, LexiconEntry]:
+    """Merge raw (kw, tags, translation) entries the way Lexicon.java does for duplicate words."""
+    entries: Dict[str, LexiconEntry] = {}
+    for kw, tags, translation in raw:
+        word = kw.lower()
+        existing = entries.get(word)
+        if existing is not None:
+            merged = list(existing.tags) + [t for t in tags if t not in existing.tags]
+            entries[word] = LexiconEntry(
+                word, tuple(merged),
+                translation if translation is not None else existing.translation,
+            )
+        else:
+            entries[word] = LexiconEntry(word, tuple(tags), translation or "")
+    return entries
+
+
+class LexiconIndex:
+    """Merged lexicon entries keyed by lowercase word."""
+
+    def __init__(self, entries: Dict[str, LexiconEntry]):
+        self._entries = entries
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._entries
+
+    def __getitem__(self, word: str) -> LexiconEntry:
+        return self._entries[word]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, word: str) -> Optional[LexiconEntry]:
+        return self._entries.get(word)
+
+    def tags(self, word: str) -> tuple:
+        entry = self._entries.get(word)
+        return entry.tags if entry else ()
+
+    def tokens(self, words: List[str]) -> List[Token]:
+        """Tag each word with its first lexicon tag, or UNKNOWN, as the JAR does for failed parses."""
+        tokens = []
+        for word in words:
+            entry = self._entries.get(word)
+            if entry is not None:
+                tokens.append(Token(word=word, tag=entry.tags[0], translation=entry.translation))
+            else:
+                tokens.append(Token(word=word, tag="UNKNOWN", translation=""))
+        return tokens
+
+    def preflight(self, sentence: str) -> Optional[ParseResult]:
+        """Reject empty or out-of-lexicon sentences exactly as Parser.parse would.
+
+        Returns None when every word is known and the sentence needs a real parse.
+        """
+        started = time.perf_counter()
+        words = tokenize(sentence)
+        normalized = " ".join(words)
+
+        for word in words:
+            if word not in self._entries:
+                failure = FailureInfo(
+                    index=words.index(word),
+                    token=word,
+                    expectedCategories=[],
+                    message=f"Unknown word: '{word}'",
+                )
+                break
+        else:
+            if words:
+                return None
+            failure = FailureInfo(index=-1, token="", expectedCategories=[], message="Empty sentence")
+
+        return ParseResult(
+            valid=False,
+            sentence=normalized,
+            tokens=self.tokens(words),
+            failure=failure,
+            metrics=ParseMetrics(parseTimeMs=round((time.perf_counter() - started) * 1000, 2)),
+        )
+
+
+def get_lexicon_index(language: str) -> Optional[LexiconIndex]:
+    """Return the index for a language, or None if it has no grammar pack."""
+    snapshot = get_snapshot(language)
+    if snapshot is None:
+        return None
+    return _build_index(snapshot.language, snapshot.source_hash, snapshot)
+
+
+@functools.lru_cache(maxsize=MAX_LOADED_PACKS)
+def _build_index(language: str, source_hash: str, snapshot: GrammarSnapshot) -> LexiconIndex:
+    return LexiconIndex(merge_entries(snapshot.lexicon))
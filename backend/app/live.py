@@ -0,0 +1,142 @@
+"""Incremental validation as the user types: one Earley chart per session.
+
+``LiveSession`` keeps the chart for the words typed so far. Each edit sends
+the whole text; its words are compared with the chart's, sets past the first
+changed word are popped and only the new words are scanned. Appending or
+deleting a trailing word therefore costs one chart set, not a reparse.
+
+A last word with no space or punctuation after it is still being typed. It is
+scanned like any other word, and if it isn't a word (yet), the text stays
+viable as long as some lexicon word starting with it has a category the
+grammar expects there.
+"""
+
+from __future__ import annotations
+import bisect
+import functools
+import time
+from typing import List, Optional, Tuple
+
+from .earley import Chart, _load, parse_with_chart
+from .grammar_registry import MAX_LOADED_PACKS
+from .lexicon_index import LexiconIndex, tokenize
+from .models import LiveUpdate, ParseMetrics, ParseResult
+from . import metrics
+
+# Seconds between checks for an edited grammar (a check stats the XML files)
+RELOAD_CHECK_SECONDS = 1.0
+
+
+@functools.lru_cache(maxsize=MAX_LOADED_PACKS)
+def _sorted_words(lexicon: LexiconIndex) -> List[str]:
+    return sorted(lexicon)
+
+
+def completions(lexicon: LexiconIndex, prefix: str) -> List[str]:
+    """Lexicon words starting with ``prefix``, in sorted order."""
+    words = _sorted_words(lexicon)
+    i = bisect.bisect_left(words, prefix)
+    j = i
+    while j < len(words) and words[j].startswith(prefix):
+        j += 1
+    return words[i:j]
+
+
+class LiveSession:
+    """Parse state for one input box; not thread-safe, one per connection."""
+
+    def __init__(self, language: str = "spanish"):
+        self.language = language
+        self.grammar, self.lexicon = _load(language)
+        self._checked = time.monotonic()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.chart = Chart(self.grammar, self.lexicon)
+        # Chart metrics before each pushed word, restored when it is popped
+        self._metrics: List[ParseMetrics] = []
+        # The last full result, reused while the words don't change (e.g. typing a space)
+        self._result: Optional[Tuple[List[str], ParseResult]] = None
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < RELOAD_CHECK_SECONDS:
+            return
+        self._checked = now
+        # An edited grammar gets a new Grammar object; start the chart over
+        grammar, lexicon = _load(self.language)
+        if grammar is not self.grammar or lexicon is not self.lexicon:
+            self.grammar, self.lexicon = grammar, lexicon
+            self._reset()
+
+    def _sync(self, words: List[str]) -> int:
+        """Bring the chart to ``words``; returns how many words were kept."""
+        chart = self.chart
+        kept = 0
+        limit = min(len(words), len(chart.words))
+        while kept < limit and chart.words[kept] == words[kept]:
+            kept += 1
+        while len(chart.words) > kept:
+            chart.pop()
+            chart.metrics = self._metrics.pop()
+        for word in words[kept:]:
+            self._metrics.append(chart.metrics.model_copy())
+            chart.push(word)
+        return kept
+
+    def _dead_end(self) -> Tuple[int, List[str]]:
+        """First word the grammar can't take, and what it expected there."""
+        sets = self.chart.sets
+        k = next((k for k in range(1, len(sets)) if not sets[k]), len(sets)) - 1
+        return k, self.chart.expected(k)
+
+    def update(self, text: str, final: bool = False) -> LiveUpdate:
+        started = time.perf_counter()
+        self._refresh()
+        words = tokenize(text)
+        stripped = text.rstrip()
+        partial = None
+        if words and not final and stripped == text and text[-1:].isalpha():
+            partial = words[-1]
+        reused = self._sync(words)
+
+        chart = self.chart
+        n = len(words)
+        complete = chart.accepts()
+        expected = chart.expected()
+        viable = complete or bool(expected)
+        position = n
+        if not viable:
+            position, expected = self._dead_end()
+            if partial is not None and position == n - 1:
+                # The word being typed may still become one the grammar takes here
+                fits = {tag for word in completions(self.lexicon, partial)
+                        for tag in self.lexicon.tags(word)}
+                fitting = [tag for tag in expected if tag in fits]
+                if fitting:
+                    viable, expected = True, fitting
+
+        result = None
+        if complete or final:
+            if self._result is not None and self._result[0] == words:
+                result = self._result[1]
+            else:
+                result = self.lexicon.preflight(text) or parse_with_chart(chart, started)
+                if result.metrics is chart.metrics:
+                    # Later pushes keep counting into the chart's metrics
+                    result.metrics = chart.metrics.model_copy()
+                self._result = (words, result)
+
+        elapsed = time.perf_counter() - started
+        metrics.LIVE_UPDATE_SECONDS.observe(elapsed, self.language.lower())
+        return LiveUpdate(
+            words=words,
+            partial=partial,
+            viable=viable,
+            position=position,
+            expected_categories=expected,
+            complete=complete,
+            result=result,
+            reused_words=reused,
+            elapsed_ms=round(elapsed * 1000, 3),
+        )
@@ -0,0 +1,303 @@
+"""Content-addressed cache of LLM responses, with record/replay cassettes.
+
+Keys hash everything that determines a reply: model, system prompt, messages
+and max_tokens. Entries live in an in-memory LRU bounded by count and bytes,
+with an optional SQLite tier; both expire after a TTL. The SQLite tier is
+pruned periodically: expired rows are deleted, then the oldest rows past
+its row cap. Async callers use ``aget``/``aput``, which move SQLite work to
+a thread.
+
+Modes (``LLM_CACHE_MODE``):
+  on      serve repeats from the cache, call the API on a miss (default)
+  off     always call the API
+  record  like ``on``, and append every reply to the cassette file
+  replay  serve only from the cassette; a request it doesn't contain fails,
+          so the backend runs fully offline
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from . import metrics
+
+MODES = ("on", "off", "record", "replay")
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a request the cassette has no reply for."""
+
+
+def _system_text(system) -> Optional[str]:
+    # Prompt-caching markers don't change the reply, so key on the text alone
+    if isinstance(system, list):
+        return "".join(block.get("text", "") for block in system)
+    return system
+
+
+def request_key(request: dict) -> str:
+    """Hash of the parts of a messages.create request that determine the reply."""
+    material = {
+        "model": request.get("model"),
+        "system": _system_text(request.get("system")),
+        "messages": request.get("messages"),
+        "max_tokens": request.get("max_tokens"),
+    }
+    raw = json.dumps(material, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def translation_key(model: str, sentence: str, language: str = "spanish") -> str:
+    raw = f"translation\0{model}\0{language.lower()}\0{sentence}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 16 * 1024 * 1024,
+                 ttl: float = 86400, db_path: Optional[str] = None,
+                 mode: str = "on", cassette_path: Optional[str] = None,
+                 disk_max_entries: int = 100_000, prune_interval: float = 3600):
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}'. Use one of: {', '.join(MODES)}.")
+        if mode in ("record", "replay") and not cassette_path:
+            raise ValueError(f"LLM cache mode '{mode}' needs a cassette file (LLM_CASSETTE)")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.mode = mode
+        self.disk_max_entries = disk_max_entries
+        self.prune_interval = prune_interval
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._last_prune = 0.0
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if db_path and mode in ("on", "record"):
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_created ON llm_cache (created)")
+            self._db.commit()
+            self.prune()
+
+        self.cassette_path = cassette_path
+        self._cassette: Dict[str, str] = {}
+        if mode in ("record", "replay") and os.path.exists(cassette_path):
+            with open(cassette_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._cassette[record["key"]] = record["text"]
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off" and self.max_entries > 0
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def persistent(self) -> bool:
+        """Whether lookups and writes may touch SQLite (and so belong off the event loop)."""
+        return self._db is not None
+
+    async def aget(self, key: str) -> Optional[str]:
+        if self.persistent:
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def aput(self, key: str, text: str) -> None:
+        if self.persistent:
+            await asyncio.to_thread(self.put, key, text)
+        else:
+            self.put(key, text)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached reply text, or None on a miss.
+
+        In replay mode the cassette is the only source, and a miss raises
+        CassetteMiss rather than letting the caller reach the network.
+        """
+        if self.mode == "replay":
+            text = self._cassette.get(key)
+            with self._lock:
+                if text is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if text is None:
+                raise CassetteMiss(f"No recorded LLM response for request {key[:12]} in {self.cassette_path}")
+            return text
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[1], now):
+                self._drop(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value, created FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None and not self._expired(row[1], now):
+                self._remember(key, row[0], row[1])
+                with self._lock:
+                    self.disk_hits += 1
+                return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, text: str) -> None:
+        if not self.enabled or self.mode == "replay":
+            return
+        created = time.time()
+        self._remember(key, text, created)
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)", (key, text, created),
+                )
+                self._db.commit()
+            if created - self._last_prune >= self.prune_interval:
+                self.prune()
+
+    def prune(self) -> int:
+        """Delete expired rows, then the oldest past ``disk_max_entries``. Returns rows deleted."""
+        if self._db is None:
+            return 0
+        now = time.time()
+        with self._db_lock:
+            with self._db:
+                deleted = 0
+                if self.ttl > 0:
+                    deleted += self._db.execute(
+                        "DELETE FROM llm_cache WHERE created < ?", (now - self.ttl,),
+                    ).rowcount
+                if self.disk_max_entries > 0:
+                    excess = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.disk_max_entries
+                    if excess > 0:
+                        deleted += self._db.execute(
+                            "DELETE FROM llm_cache WHERE key IN"
+                            " (SELECT key FROM llm_cache ORDER BY created LIMIT ?)", (excess,),
+                        ).rowcount
+            self._last_prune = now
+        with self._lock:
+            self.disk_evictions += deleted
+        return deleted
+
+    def record(self, key: str, text: str, request: dict) -> None:
+        """Append a live reply to the cassette (record mode only, first reply per key)."""
+        if self.mode != "record":
+            return
+        with self._lock:
+            if key in self._cassette:
+                return
+            self._cassette[key] = text
+            # The request is kept so cassettes can be read and diffed; replay only needs key and text
+            line = json.dumps({"key": key, "request": request, "text": text}, ensure_ascii=False)
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl > 0 and now - created > self.ttl
+
+    def _remember(self, key: str, text: str, created: float) -> None:
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (text, created)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        # Caller holds self._lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0].encode("utf-8"))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            stats = {
+                "mode": self.mode,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "cassette_entries": len(self._cassette),
+            }
+        stats["disk_enabled"] = self._db is not None
+        if self._db is not None:
+            with self._db_lock:
+                stats["disk_entries"] = self._db.execute(
+                    "SELECT COUNT(*) FROM llm_cache"
+                ).fetchone()[0]
+        return stats
+
+
+cache = LLMCache(
+    max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.environ.get("LLM_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl=float(os.environ.get("LLM_CACHE_TTL", "86400")),
+    db_path=os.environ.get("LLM_CACHE_DB") or None,
+    mode=os.environ.get("LLM_CACHE_MODE", "on").lower(),
+    cassette_path=os.environ.get("LLM_CASSETTE") or None,
+    disk_max_entries=int(os.environ.get("LLM_CACHE_DB_MAX_ENTRIES", "100000")),
+    prune_interval=float(os.environ.get("LLM_CACHE_PRUNE_INTERVAL", "3600")),
+)
+
+
+@metrics.collector
+def _collect_metrics():
+    stats = cache.stats()
+    mode = stats.pop("mode")
+    return metrics.stats_samples("grammar_oracle_llm_cache", "LLM response cache", [({"mode": mode}, stats)])
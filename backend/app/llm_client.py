@@ -1,19 +1,96 @@
-"""Anthropic Claude client for sentence generation."""
+"""Anthropic Claude client for sentence generation.
 
-from typing import Optional, List, Dict
-from anthropic import Anthropic
+``LLM_PROVIDER=sampler`` swaps Claude for app.sampler's grammar-driven
+stand-in, so every LLM endpoint runs offline with sentences drawn from the
+grammar itself.
+"""
 
+import os
+import re
+from typing import AsyncIterator, Optional, List, Dict, Tuple
 
-_client: Optional[Anthropic] = None
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 
+from . import llm_telemetry
+from .llm_cache import CassetteMiss, cache as llm_cache, request_key, translation_key
 
-def _get_client() -> Anthropic:
+# Connections shared by every request through the single async client
+MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "20"))
+
+PROVIDERS = ("anthropic", "sampler")
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "anthropic").lower()
+if LLM_PROVIDER not in PROVIDERS:
+    raise ValueError(f"Unknown LLM provider '{LLM_PROVIDER}'. Use one of: {', '.join(PROVIDERS)}.")
+# Share of sampler sentences that are near-misses, so the verify loop still retries
+SAMPLER_INVALID_RATE = float(os.environ.get("SAMPLER_INVALID_RATE", "0.3"))
+
+# Part of every cache key, so sampler replies never answer for Claude's
+MODEL = "grammar-sampler" if LLM_PROVIDER == "sampler" else "claude-sonnet-4-20250514"
+
+_client: Optional[AsyncAnthropic] = None
+
+
+def _get_client() -> AsyncAnthropic:
     global _client
+    if _client is None and LLM_PROVIDER == "sampler":
+        from .sampler import SamplerClient
+        _client = SamplerClient({
+            SYSTEM_PROMPT: "sentence",
+            XRAY_SYSTEM_PROMPT: "paragraph",
+            TRANSLATE_SYSTEM_PROMPT: "translation",
+        }, invalid_rate=SAMPLER_INVALID_RATE)
     if _client is None:
-        _client = Anthropic()  # reads ANTHROPIC_API_KEY from env
+        _client = AsyncAnthropic(  # reads ANTHROPIC_API_KEY from env
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_CONNECTIONS,
+                ),
+            ),
+        )
     return _client
 
 
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _cached_system(prompt: str) -> List[dict]:
+    """A static system prompt marked for Anthropic prompt caching.
+
+    Prompts under the model's minimum cacheable length (1024 tokens for
+    Sonnet) are processed in full as before; the marker then costs nothing.
+    """
+    return [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}]
+
+
+async def _complete(request: dict, purpose: str, use_cache: bool = True) -> str:
+    """messages.create through the response cache; returns the reply text.
+
+    ``use_cache=False`` skips the lookup and doesn't store the reply. Replay
+    mode ignores it: the cassette is the only source of replies. Every call,
+    cached or live, is recorded in llm_telemetry.
+    """
+    key = request_key(request)
+    if llm_cache.replaying or use_cache:
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            llm_telemetry.record_cached(request["model"], purpose)
+            return cached
+    with llm_telemetry.timed(request["model"], purpose) as timer:
+        response = await _get_client().messages.create(**request)
+        timer.finish(response)
+    text = response.content[0].text
+    if use_cache:
+        await llm_cache.aput(key, text)
+    llm_cache.record(key, text, request)
+    return text
+
+
 SYSTEM_PROMPT = """You are a Spanish sentence generator for a formal grammar validation system.
 
 The grammar you must satisfy is a Context-Free Grammar (CFG) with these structural rules:
@@ -68,14 +145,8 @@ class GenerateResult:
         self.messages = messages
 
 
-def generate_sentence(
-    prompt: str,
-    language: str,
-    previous_attempts: Optional[List[Dict[str, str]]] = None,
-) -> GenerateResult:
-    """Call Claude to generate a sentence. Returns result with messages context."""
-    client = _get_client()
-
+def _sentence_request(prompt: str, language: str,
+                      previous_attempts: Optional[List[Dict[str, str]]]) -> Tuple[List[Dict[str, str]], dict]:
     messages = []
 
     messages.append({
@@ -94,17 +165,22 @@ def generate_sentence(
                 "content": attempt["feedback"],
             })
 
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
+    return messages, dict(
+        model=MODEL,
         max_tokens=150,
-        system=SYSTEM_PROMPT,
+        system=_cached_system(SYSTEM_PROMPT),
         messages=messages,
     )
 
-    raw = response.content[0].text.strip()
+
+def clean_sentence(text: str) -> str:
+    """Strip the quotes and end punctuation Claude sometimes adds, and lowercase."""
+    raw = text.strip()
     raw = raw.strip('"').strip("'").strip(".").strip("!").strip("?")
-    sentence = raw.lower()
+    return raw.lower()
 
+
+def _sentence_result(sentence: str, messages: List[Dict[str, str]]) -> GenerateResult:
     # Include Claude's response in the message log
     full_messages = messages + [{"role": "assistant", "content": sentence}]
 
@@ -115,6 +191,77 @@ def generate_sentence(
     )
 
 
+async def generate_sentence(
+    prompt: str,
+    language: str,
+    previous_attempts: Optional[List[Dict[str, str]]] = None,
+    use_cache: bool = True,
+) -> GenerateResult:
+    """Call Claude to generate a sentence. Returns result with messages context."""
+    messages, request = _sentence_request(prompt, language, previous_attempts)
+    text = await _complete(request, "sentence", use_cache=use_cache)
+    return _sentence_result(clean_sentence(text), messages)
+
+
+class SentenceStream:
+    """The generate_sentence request, streamed as Claude writes it.
+
+    ``async for delta in stream`` yields text as it arrives, and ``aclose()``
+    abandons the generation so the rest of the sentence is never produced.
+    A cached reply arrives as one chunk with ``cached`` set; only streams
+    that ran to the end are cached. ``output_tokens`` is set once the stream
+    completes.
+    """
+
+    def __init__(self, prompt: str, language: str,
+                 previous_attempts: Optional[List[Dict[str, str]]] = None, use_cache: bool = True):
+        self.messages, self.request = _sentence_request(prompt, language, previous_attempts)
+        self.use_cache = use_cache
+        self.cached = False
+        self.completed = False
+        self.output_tokens = 0
+        self._deltas = self._stream()
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._deltas
+
+    async def aclose(self) -> None:
+        await self._deltas.aclose()
+
+    def result(self, sentence: str) -> GenerateResult:
+        return _sentence_result(sentence, self.messages)
+
+    async def _stream(self) -> AsyncIterator[str]:
+        request = self.request
+        key = request_key(request)
+        if llm_cache.replaying or self.use_cache:
+            cached = await llm_cache.aget(key)
+            if cached is not None:
+                llm_telemetry.record_cached(request["model"], "sentence")
+                self.cached = self.completed = True
+                yield cached
+                return
+        chunks = []
+        with llm_telemetry.timed(request["model"], "sentence") as timer:
+            async with _get_client().messages.stream(**request) as stream:
+                try:
+                    async for text in stream.text_stream:
+                        timer.first_token()
+                        chunks.append(text)
+                        yield text
+                except GeneratorExit:
+                    timer.abort(stream.current_message_snapshot)
+                    raise
+                message = await stream.get_final_message()
+                timer.finish(message)
+        self.output_tokens = message.usage.output_tokens or 0
+        self.completed = True
+        text = "".join(chunks)
+        if self.use_cache:
+            await llm_cache.aput(key, text)
+        llm_cache.record(key, text, request)
+
+
 XRAY_SYSTEM_PROMPT = """You are a Spanish language writer. Write natural, fluent Spanish text.
 The user will give you a creative prompt. Respond with a short paragraph of 4-6 sentences in Spanish.
 
@@ -151,48 +298,125 @@ class ParagraphResult:
         self.user_message = user_message
 
 
-def generate_paragraph(prompt: str, language: str) -> ParagraphResult:
-    """Generate a natural paragraph of Spanish text (unconstrained by CFG)."""
-    client = _get_client()
-    user_message = f"Write a short paragraph (3-5 sentences) in {language} about: {prompt}"
-    messages = [{
-        "role": "user",
-        "content": user_message,
-    }]
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
+def paragraph_user_message(prompt: str, language: str) -> str:
+    return f"Write a short paragraph (3-5 sentences) in {language} about: {prompt}"
+
+
+def _paragraph_request(prompt: str, language: str) -> Tuple[str, dict]:
+    user_message = paragraph_user_message(prompt, language)
+    return user_message, dict(
+        model=MODEL,
         max_tokens=500,
-        system=XRAY_SYSTEM_PROMPT,
-        messages=messages,
+        system=_cached_system(XRAY_SYSTEM_PROMPT),
+        messages=[{
+            "role": "user",
+            "content": user_message,
+        }],
     )
+
+
+async def generate_paragraph(prompt: str, language: str, use_cache: bool = True) -> ParagraphResult:
+    """Generate a natural paragraph of Spanish text (unconstrained by CFG)."""
+    user_message, request = _paragraph_request(prompt, language)
+    text = await _complete(request, "paragraph", use_cache=use_cache)
     return ParagraphResult(
-        text=response.content[0].text.strip(),
+        text=text.strip(),
         system_prompt=XRAY_SYSTEM_PROMPT,
         user_message=user_message,
     )
 
 
-def translate_sentences(sentences: List[str]) -> List[str]:
-    """Translate a list of Spanish sentences into natural English using Claude."""
+async def stream_paragraph(prompt: str, language: str, use_cache: bool = True) -> AsyncIterator[str]:
+    """Same request as generate_paragraph, yielding text deltas as Claude writes them.
+
+    A cached reply comes back as a single chunk. It shares cache entries with
+    generate_paragraph, and only a stream that ran to the end is stored.
+    """
+    _, request = _paragraph_request(prompt, language)
+    key = request_key(request)
+    if llm_cache.replaying or use_cache:
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            llm_telemetry.record_cached(request["model"], "paragraph")
+            yield cached
+            return
+    chunks = []
+    with llm_telemetry.timed(request["model"], "paragraph") as timer:
+        async with _get_client().messages.stream(**request) as stream:
+            async for text in stream.text_stream:
+                timer.first_token()
+                chunks.append(text)
+                yield text
+            timer.finish(await stream.get_final_message())
+    text = "".join(chunks)
+    if use_cache:
+        await llm_cache.aput(key, text)
+    llm_cache.record(key, text, request)
+
+
+TRANSLATE_SYSTEM_PROMPT = "You are a translator into English. Translate each sentence naturally and fluently. Output ONLY the numbered translations, one per line, matching the input numbering. Do not add explanations."
+
+TRANSLATE_MODEL = MODEL
+
+
+async def _cached_translation(key: str) -> Optional[str]:
+    try:
+        return await llm_cache.aget(key)
+    except CassetteMiss:
+        # Replay falls through to the batch request, which may be on the cassette
+        return None
+
+
+def translate_user_message(sentences: List[str], language: str) -> str:
+    numbered = "\n".join(f"{i+1}. {s}" for i, s in enumerate(sentences))
+    return f"Translate each {language.capitalize()} sentence:\n{numbered}"
+
+
+async def translate_sentences(sentences: List[str], language: str = "spanish",
+                              use_cache: bool = True) -> List[str]:
+    """Translate a list of sentences in ``language`` into natural English using Claude.
+
+    Translations are cached per language and sentence, so only sentences not
+    seen before are sent, numbered in a single call.
+    """
     if not sentences:
         return []
-    client = _get_client()
-    numbered = "\n".join(f"{i+1}. {s}" for i, s in enumerate(sentences))
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
+    keys = [translation_key(TRANSLATE_MODEL, s, language) for s in sentences]
+    known: Dict[str, str] = {}
+    if llm_cache.replaying or use_cache:
+        for key in dict.fromkeys(keys):
+            cached = await _cached_translation(key)
+            if cached is not None:
+                known[key] = cached
+
+    unseen = [s for s, key in dict.fromkeys(zip(sentences, keys)) if key not in known]
+    if unseen:
+        fresh = await _translate_batch(unseen, language, use_cache)
+        for sentence, translation in zip(unseen, fresh):
+            key = translation_key(TRANSLATE_MODEL, sentence, language)
+            known[key] = translation
+            # Blank lines are Claude dropping a sentence; don't remember those
+            if translation:
+                if use_cache:
+                    await llm_cache.aput(key, translation)
+                llm_cache.record(key, translation, {"translate": sentence, "language": language})
+    return [known.get(key, "") for key in keys]
+
+
+async def _translate_batch(sentences: List[str], language: str, use_cache: bool) -> List[str]:
+    raw = (await _complete(dict(
+        model=TRANSLATE_MODEL,
         max_tokens=500,
-        system="You are a Spanish-to-English translator. Translate each sentence naturally and fluently. Output ONLY the numbered translations, one per line, matching the input numbering. Do not add explanations.",
+        system=TRANSLATE_SYSTEM_PROMPT,
         messages=[{
             "role": "user",
-            "content": f"Translate each sentence:\n{numbered}",
+            "content": translate_user_message(sentences, language),
         }],
-    )
-    raw = response.content[0].text.strip()
+    ), "translation", use_cache=use_cache)).strip()
     lines = [line.strip() for line in raw.split("\n") if line.strip()]
     # Strip the numbering prefix (e.g. "1. ", "1) ")
     translations = []
     for line in lines:
-        import re
         cleaned = re.sub(r"^\d+[\.\)]\s*", "", line)
         translations.append(cleaned)
     # Pad if Claude returned fewer lines than expected
@@ -0,0 +1,200 @@
+"""Timing and token accounting for every Claude call.
+
+Calls are tagged with the endpoint serving them (set with ``track``) and
+folded into a process-wide aggregate per endpoint and model. ``track`` also
+collects the calls made for a single request, so responses can report their
+own LLM time and token spend. Calls made in tasks spawned inside ``track``
+are collected too, since tasks inherit the context they were created in.
+"""
+
+import asyncio
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import metrics
+from .models import LLMCall, LLMEndpointStats, LLMUsage
+
+_endpoint: ContextVar[str] = ContextVar("llm_endpoint", default="other")
+_calls: ContextVar[Optional[List[LLMCall]]] = ContextVar("llm_calls", default=None)
+
+
+class _Aggregate:
+    def __init__(self):
+        self.calls = 0
+        self.response_cache_hits = 0
+        self.errors = 0
+        self.latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.stop_reasons: Counter = Counter()
+
+    def add(self, call: LLMCall) -> None:
+        self.calls += 1
+        self.response_cache_hits += call.response_cached
+        self.errors += call.error is not None
+        self.latency_ms += call.latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, call.latency_ms)
+        self.input_tokens += call.input_tokens
+        self.output_tokens += call.output_tokens
+        self.cache_creation_input_tokens += call.cache_creation_input_tokens
+        self.cache_read_input_tokens += call.cache_read_input_tokens
+        if call.stop_reason:
+            self.stop_reasons[call.stop_reason] += 1
+
+
+_aggregates: Dict[Tuple[str, str], _Aggregate] = {}
+_lock = threading.Lock()
+
+
+class CallLog:
+    """Calls collected by one ``track`` block."""
+
+    def __init__(self):
+        self.calls: List[LLMCall] = []
+
+    def usage(self) -> LLMUsage:
+        return LLMUsage(
+            calls=list(self.calls),
+            latency_ms=round(sum(c.latency_ms for c in self.calls), 2),
+            input_tokens=sum(c.input_tokens for c in self.calls),
+            output_tokens=sum(c.output_tokens for c in self.calls),
+            cache_creation_input_tokens=sum(c.cache_creation_input_tokens for c in self.calls),
+            cache_read_input_tokens=sum(c.cache_read_input_tokens for c in self.calls),
+            response_cache_hits=sum(c.response_cached for c in self.calls),
+        )
+
+
+@contextmanager
+def track(endpoint: str, log: Optional[CallLog] = None) -> Iterator[CallLog]:
+    """Tag Claude calls in this block with ``endpoint`` and collect them into ``log``."""
+    log = log if log is not None else CallLog()
+    endpoint_token = _endpoint.set(endpoint)
+    calls_token = _calls.set(log.calls)
+    try:
+        yield log
+    finally:
+        try:
+            _calls.reset(calls_token)
+            _endpoint.reset(endpoint_token)
+        except ValueError:
+            # An async generator finalized from another context; that context never saw the set
+            pass
+
+
+def record(call: LLMCall) -> None:
+    calls = _calls.get()
+    if calls is not None:
+        calls.append(call)
+    with _lock:
+        aggregate = _aggregates.get((call.endpoint, call.model))
+        if aggregate is None:
+            aggregate = _aggregates[(call.endpoint, call.model)] = _Aggregate()
+        aggregate.add(call)
+
+
+def record_cached(model: str, purpose: str) -> None:
+    """Count a reply served by the LLM response cache."""
+    record(LLMCall(endpoint=_endpoint.get(), model=model, purpose=purpose, response_cached=True))
+
+
+class _Timer:
+    def __init__(self, call: LLMCall):
+        self.call = call
+        self.aborted = False
+        self._started = time.perf_counter()
+
+    def first_token(self) -> None:
+        if self.call.first_token_ms is None:
+            self.call.first_token_ms = round((time.perf_counter() - self._started) * 1000, 2)
+
+    def finish(self, message) -> None:
+        """Copy usage and stop reason from an Anthropic Message."""
+        usage = message.usage
+        self.call.input_tokens = usage.input_tokens or 0
+        self.call.output_tokens = usage.output_tokens or 0
+        self.call.cache_creation_input_tokens = usage.cache_creation_input_tokens or 0
+        self.call.cache_read_input_tokens = usage.cache_read_input_tokens or 0
+        self.call.stop_reason = message.stop_reason
+
+    def abort(self, snapshot) -> None:
+        """Mark a stream the caller abandoned on purpose, with the usage reported so far.
+
+        Streams only report output tokens at the end, so an aborted call's
+        ``output_tokens`` undercounts what was generated.
+        """
+        self.finish(snapshot)
+        self.call.stop_reason = "aborted"
+        self.aborted = True
+
+
+@contextmanager
+def timed(model: str, purpose: str) -> Iterator[_Timer]:
+    """Time a live Claude call and record it, including calls that fail or are cancelled."""
+    timer = _Timer(LLMCall(endpoint=_endpoint.get(), model=model, purpose=purpose))
+    try:
+        yield timer
+    except (asyncio.CancelledError, GeneratorExit):
+        if not timer.aborted:
+            timer.call.error = "cancelled"
+        raise
+    except Exception as e:
+        timer.call.error = type(e).__name__
+        raise
+    finally:
+        timer.call.latency_ms = round((time.perf_counter() - timer._started) * 1000, 2)
+        record(timer.call)
+
+
+def endpoint_stats() -> List[LLMEndpointStats]:
+    with _lock:
+        return [
+            LLMEndpointStats(
+                endpoint=endpoint,
+                model=model,
+                calls=a.calls,
+                response_cache_hits=a.response_cache_hits,
+                errors=a.errors,
+                mean_latency_ms=round(a.latency_ms / live, 2) if (live := a.calls - a.response_cache_hits) else 0.0,
+                max_latency_ms=a.max_latency_ms,
+                input_tokens=a.input_tokens,
+                output_tokens=a.output_tokens,
+                cache_creation_input_tokens=a.cache_creation_input_tokens,
+                cache_read_input_tokens=a.cache_read_input_tokens,
+                stop_reasons=dict(a.stop_reasons),
+            )
+            for (endpoint, model), a in sorted(_aggregates.items())
+        ]
+
+
+def reset() -> None:
+    with _lock:
+        _aggregates.clear()
+
+
+@metrics.collector
+def _collect_metrics():
+    with _lock:
+        items = sorted(_aggregates.items())
+    calls, cached, errors, seconds, tokens = [], [], [], [], []
+    for (endpoint, model), a in items:
+        labels = {"endpoint": endpoint, "model": model}
+        calls.append((labels, a.calls))
+        cached.append((labels, a.response_cache_hits))
+        errors.append((labels, a.errors))
+        seconds.append((labels, a.latency_ms / 1000))
+        for kind in ("input", "output", "cache_creation_input", "cache_read_input"):
+            tokens.append(({**labels, "kind": kind}, getattr(a, f"{kind}_tokens")))
+    return [
+        ("grammar_oracle_llm_calls_total", "counter", "Claude calls, including response-cache hits", calls),
+        ("grammar_oracle_llm_response_cache_hits_total", "counter", "Claude calls served by the response cache", cached),
+        ("grammar_oracle_llm_errors_total", "counter", "Claude calls that failed or were cancelled", errors),
+        ("grammar_oracle_llm_latency_seconds_total", "counter", "Time spent in live Claude calls", seconds),
+        ("grammar_oracle_llm_tokens_total", "counter", "Tokens reported by Claude, by kind", tokens),
+    ]
@@ -1,21 +1,65 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Literal, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.background import BackgroundTask
+
+from .compact import compact
+from .compression import CompressionMiddleware, etag_variants
+from .batch import iter_list_items, iter_ndjson_items, spool_body, stream_batch
+from .models import ValidateRequest, BatchValidateRequest, LiveEdit, LanguagePack, ParseResult, ParseCacheStats, LLMCacheStats, LLMEndpointStats, VerifyLoopRequest, VerifyLoopResponse, XRayRequest, XRayResponse, GrammarStats, GrammarDetail, GrammarAnalysisReport, RuleUsageReport, TagCoverage, AttemptOutcome, RunSummary
+from .parse_cache import cache as parse_cache
+from .concurrency import (
+    LLM_PATHS, MAX_CONCURRENT_LLM_REQUESTS, MAX_CONCURRENT_REQUESTS, ConcurrencyLimitMiddleware,
+)
+from . import metrics
+from .llm_cache import CassetteMiss, cache as llm_cache
+from .llm_client import close_client
+from .llm_telemetry import endpoint_stats as llm_endpoint_stats
+from .live import LiveSession
+from .parser_client import parse_sentence_async
+from .parser_pool import shutdown_async_pools, shutdown_pools
+from .verifier_loop import run_verify_loop, stream_verify_loop
+from .sse import SSE_HEADERS, format_event
+from .xray import run_xray, stream_xray
+from .grammar_analysis import get_analysis
+from .grammar_registry import UnknownLanguage, registry, resolve_language
+from .run_store import attempt_report, rule_report, run_summary, store as run_store, tag_report
+from .grammar_stats import get_grammar_stats, get_grammar_detail, grammar_detail_etag, query_grammar_detail
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Packs are found now but loaded on first use
+    registry.discover()
+    yield
+    await shutdown_async_pools()
+    shutdown_pools()
+    await close_client()
 
-from .models import ValidateRequest, ParseResult, VerifyLoopRequest, VerifyLoopResponse, XRayRequest, XRayResponse, GrammarStats, GrammarDetail
-from .parser_client import parse_sentence
-from .verifier_loop import run_verify_loop
-from .xray import run_xray
-from .grammar_stats import get_grammar_stats, get_grammar_detail
 
 app = FastAPI(
     title="Grammar Oracle API",
     description="CFG validation API for Grammar Oracle",
     version="0.1.0",
+    lifespan=lifespan,
+    # orjson serializes large parse trees about twice as fast as the json module
+    default_response_class=ORJSONResponse,
 )
 
+# Innermost: compresses finished bodies only, streamed ones pass straight through
+app.add_middleware(CompressionMiddleware)
+# Added before CORS so CORS headers still wrap their 503 responses. The LLM cap
+# is outermost: requests queued for it don't hold a server-wide slot.
+app.add_middleware(ConcurrencyLimitMiddleware, limit=MAX_CONCURRENT_REQUESTS)
+app.add_middleware(ConcurrencyLimitMiddleware, limit=MAX_CONCURRENT_LLM_REQUESTS, paths=LLM_PATHS)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -23,58 +67,320 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so request latency includes time queued for a concurrency slot
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok", "service": "grammar-oracle-backend"}
 
 
+WireFormat = Literal["verbose", "compact"]
+
+
+def _respond(response: BaseModel, wire_format: WireFormat):
+    """The response as is, or re-encoded in the compact format (see compact.py)."""
+    if wire_format == "compact":
+        return ORJSONResponse(compact(response))
+    return response
+
+
+def _language(language: str) -> str:
+    """Resolve a request's language through the grammar registry; 404 if unknown."""
+    try:
+        return resolve_language(language)
+    except UnknownLanguage as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/languages", response_model=List[LanguagePack])
+async def languages():
+    """Every grammar pack in GRAMMAR_DIR with its content hash and load state."""
+    # Hashes each pack's files (read in full after an edit)
+    return await asyncio.to_thread(registry.listing)
+
+
 @app.post("/validate", response_model=ParseResult)
-def validate(request: ValidateRequest):
-    return parse_sentence(
+async def validate(request: ValidateRequest, wire_format: WireFormat = Query("verbose", alias="format")):
+    result = await parse_sentence_async(
         sentence=request.sentence,
-        language=request.language,
+        language=_language(request.language),
+        engine=request.engine,
     )
+    return _respond(result, wire_format)
+
+
+@app.post("/validate/batch")
+async def validate_batch(
+    request: Request,
+    language: str = "spanish",
+    engine: Optional[Literal["jar", "python"]] = None,
+    concurrency: int = Query(default=8, ge=1, le=64),
+):
+    """Validate many sentences, streaming one NDJSON line per result and a summary trailer.
+
+    Send a JSON body shaped like BatchValidateRequest, or an NDJSON body
+    (Content-Type: application/x-ndjson) with one sentence per line and the
+    options as query parameters. NDJSON bodies are spooled to disk and read
+    line by line, so large batches are never held in memory.
+    """
+    content_type = request.headers.get("content-type", "")
+    spool = None
+    if "ndjson" in content_type or "jsonl" in content_type:
+        # Checked before the upload is read, so a bad language costs no spooling
+        language = _language(language)
+        spool = await spool_body(request.stream())
+        items = iter_ndjson_items(spool)
+    else:
+        try:
+            body = BatchValidateRequest.model_validate_json(await request.body())
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+        items = iter_list_items(body.sentences)
+        language, engine, concurrency = _language(body.language), body.engine, body.concurrency
+
+    return StreamingResponse(
+        stream_batch(items, language=language, engine=engine, concurrency=concurrency),
+        media_type="application/x-ndjson",
+        # iter_ndjson_items closes the spool, but only once the stream has started
+        background=BackgroundTask(spool.close) if spool is not None else None,
+    )
+
+
+
+@app.websocket("/validate/live")
+async def validate_live(websocket: WebSocket, language: str = "spanish"):
+    """Validate as the user types: send LiveEdit messages, receive a LiveUpdate for each.
+
+    The connection keeps an Earley chart for the words so far, so appending or
+    deleting a trailing word only scans that word. Always uses the in-process
+    engine; an unknown language closes the socket with code 1008.
+    """
+    await websocket.accept()
+    try:
+        session = LiveSession(resolve_language(language))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    try:
+        while True:
+            try:
+                edit = LiveEdit.model_validate_json(await websocket.receive_text())
+            except ValidationError as e:
+                await websocket.send_json({"error": e.errors(include_url=False, include_context=False)})
+                continue
+            await websocket.send_text(session.update(edit.text, edit.final).model_dump_json())
+    except WebSocketDisconnect:
+        pass
+
+
+def _llm_error(e: Exception) -> HTTPException:
+    if isinstance(e, CassetteMiss):
+        return HTTPException(status_code=503, detail=str(e))
+    msg = str(e).lower()
+    if "api key" in msg or "authentication" in msg or "api_key" in msg:
+        return HTTPException(status_code=503, detail="LLM service not configured. Set ANTHROPIC_API_KEY.")
+    return HTTPException(status_code=500, detail=str(e))
+
+
+async def _sse_with_errors(events: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Once a stream has started, report failures as a final error event."""
+    try:
+        async for event in events:
+            yield event
+    except Exception as e:
+        error = _llm_error(e)
+        yield format_event("error", {"status": error.status_code, "detail": error.detail})
 
 
 @app.post("/verify-loop", response_model=VerifyLoopResponse)
-def verify_loop(request: VerifyLoopRequest):
+async def verify_loop(request: VerifyLoopRequest, wire_format: WireFormat = Query("verbose", alias="format")):
+    language = _language(request.language)
     try:
-        return run_verify_loop(
+        response = await run_verify_loop(
             prompt=request.prompt,
-            language=request.language,
+            language=language,
             max_retries=request.max_retries,
+            candidates=request.candidates,
+            use_cache=request.use_cache,
+            early_abort=request.early_abort,
         )
     except Exception as e:
-        msg = str(e).lower()
-        if "api key" in msg or "authentication" in msg or "api_key" in msg:
-            raise HTTPException(status_code=503, detail="LLM service not configured. Set ANTHROPIC_API_KEY.")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _llm_error(e)
+    return _respond(response, wire_format)
+
+
+@app.post("/verify-loop/stream")
+async def verify_loop_stream(request: VerifyLoopRequest):
+    """Stream the verify loop as Server-Sent Events: one event per attempt, then a summary.
+
+    Disconnecting cancels the in-flight LLM or parser call and skips remaining attempts.
+    """
+    return StreamingResponse(
+        _sse_with_errors(stream_verify_loop(
+            prompt=request.prompt,
+            language=_language(request.language),
+            max_retries=request.max_retries,
+            candidates=request.candidates,
+            use_cache=request.use_cache,
+            early_abort=request.early_abort,
+        )),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
 
 
 @app.get("/stats", response_model=GrammarStats)
-def stats(language: str = "spanish"):
+async def stats(language: str = "spanish"):
+    language = _language(language)
     try:
-        return get_grammar_stats(language)
+        return await asyncio.to_thread(get_grammar_stats, language)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/cache-stats", response_model=ParseCacheStats)
+async def cache_stats():
+    return parse_cache.stats()
+
+
+@app.get("/llm-cache-stats", response_model=LLMCacheStats)
+async def llm_cache_stats():
+    return llm_cache.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/llm-stats", response_model=List[LLMEndpointStats])
+async def llm_stats():
+    """Claude call counts, latency and token usage per endpoint and model since startup."""
+    return llm_endpoint_stats()
+
+
 @app.get("/grammar-detail", response_model=GrammarDetail)
-def grammar_detail(language: str = "spanish"):
+async def grammar_detail(
+    request: Request,
+    response: Response,
+    language: str = "spanish",
+    tag: Optional[str] = Query(None, description="Lexicon entries with this POS tag"),
+    prefix: Optional[str] = Query(None, description="Lexicon words starting with this prefix"),
+    translation: Optional[str] = Query(None, description="Lexicon translations containing this text"),
+    lhs: Optional[str] = Query(None, description="Rules with this left-hand side"),
+    rhs: Optional[str] = Query(None, description="Rules using this symbol on the right-hand side"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Page size for each list"),
+):
+    language = _language(language)
     try:
-        return get_grammar_detail(language)
+        # Every response is a pure function of the URL and the grammar version.
+        # The first use of a grammar version loads its snapshot, so this and the
+        # detail below run in a thread.
+        etag = await asyncio.to_thread(grammar_detail_etag, language)
+        if etag is not None:
+            matched = _etag_matches(request.headers.get("if-none-match"), etag)
+            if matched is not None:
+                return Response(status_code=304, headers={"ETag": matched})
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = "no-cache"
+        if not any((tag, prefix, translation, lhs, rhs, cursor, limit)):
+            return await asyncio.to_thread(get_grammar_detail, language)
+        return await asyncio.to_thread(
+            query_grammar_detail, language, tag=tag, prefix=prefix, translation=translation,
+            lhs=lhs, rhs=rhs, cursor=cursor, limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/xray", response_model=XRayResponse)
-def xray(request: XRayRequest):
+@app.get("/grammar-analysis", response_model=GrammarAnalysisReport)
+async def grammar_analysis(request: Request, response: Response, language: str = "spanish"):
+    """Nullable symbols, FIRST/FOLLOW sets, unproductive and unreachable parts, left recursion."""
+    language = _language(language)
     try:
-        return run_xray(prompt=request.prompt, language=request.language)
+        # Built on first use of each grammar version: snapshot load plus FIRST/FOLLOW
+        analysis = await asyncio.to_thread(get_analysis, language)
     except Exception as e:
-        msg = str(e).lower()
-        if "api key" in msg or "authentication" in msg or "api_key" in msg:
-            raise HTTPException(status_code=503, detail="LLM service not configured. Set ANTHROPIC_API_KEY.")
         raise HTTPException(status_code=500, detail=str(e))
+    if analysis is None:
+        raise HTTPException(status_code=404, detail=f"Unknown language: {language!r}")
+    etag = f'"{analysis.source_hash}"'
+    matched = _etag_matches(request.headers.get("if-none-match"), etag)
+    if matched is not None:
+        return Response(status_code=304, headers={"ETag": matched})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return await asyncio.to_thread(analysis.report)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """The validator in If-None-Match that matches ``etag`` or a compressed form of it.
+
+    Matching is weak, as RFC 9110 requires for If-None-Match. The 304 repeats
+    the matched validator, so a client keeps the one for its representation.
+    """
+    if not if_none_match:
+        return None
+    variants = etag_variants(etag)
+    for candidate in (c.strip() for c in if_none_match.split(",")):
+        if candidate == "*":
+            return etag
+        if candidate.removeprefix("W/") in variants:
+            return candidate
+    return None
+
+
+@app.post("/xray", response_model=XRayResponse)
+async def xray(request: XRayRequest, wire_format: WireFormat = Query("verbose", alias="format")):
+    language = _language(request.language)
+    try:
+        response = await run_xray(prompt=request.prompt, language=language, use_cache=request.use_cache)
+    except Exception as e:
+        raise _llm_error(e)
+    return _respond(response, wire_format)
+
+
+@app.post("/xray/stream")
+async def xray_stream(request: XRayRequest):
+    """Stream X-ray as Server-Sent Events: generated text, then each sentence's analysis as it completes."""
+    return StreamingResponse(
+        _sse_with_errors(stream_xray(prompt=request.prompt, language=_language(request.language), use_cache=request.use_cache)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+# The analytics reads share the store's lock with writes and compaction, so they run in a thread
+def _run_store_language(language: str) -> str:
+    if not run_store.enabled:
+        raise HTTPException(status_code=503, detail="Run store not configured. Set RUN_STORE_DB.")
+    return _language(language)
+
+
+@app.get("/analytics/summary", response_model=RunSummary)
+async def analytics_summary(language: str = "spanish", days: int = Query(7, ge=1, le=366)):
+    """Stored /xray and /verify-loop runs: totals and success rates, recent and all-time."""
+    return await asyncio.to_thread(run_summary, _run_store_language(language), days)
+
+
+@app.get("/analytics/rules", response_model=RuleUsageReport)
+async def analytics_rules(language: str = "spanish"):
+    """How often each rule was used in stored runs, and which rules never were."""
+    return await asyncio.to_thread(rule_report, _run_store_language(language))
+
+
+@app.get("/analytics/tags", response_model=List[TagCoverage])
+async def analytics_tags(language: str = "spanish"):
+    """Tokens and distinct lexicon words seen per POS tag in stored runs."""
+    return await asyncio.to_thread(tag_report, _run_store_language(language))
+
+
+@app.get("/analytics/attempts", response_model=List[AttemptOutcome])
+async def analytics_attempts(language: str = "spanish"):
+    """Verify-loop success rate by attempt number."""
+    return await asyncio.to_thread(attempt_report, _run_store_language(language))
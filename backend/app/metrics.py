@@ -0,0 +1,292 @@
+"""Prometheus text-format metrics, kept cheap enough to leave on.
+
+Counters and histograms are updated in place on the request path (a dict
+lookup, a bisect and a lock per observation). Cache, pool and LLM figures
+are read from their own stats at scrape time by registered collectors, so
+they cost nothing between scrapes.
+"""
+
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+WORK_BUCKETS = (10, 30, 100, 300, 1_000, 3_000, 10_000, 30_000, 100_000, 300_000, 1_000_000)
+ATTEMPT_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 40, 80)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, total in items:
+            yield f"{self.name}{_labels(self.label_names, values)} {_number(total)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (not cumulative) + overflow, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((values, (list(s[0]), s[1])) for values, s in self._series.items())
+        for values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, values)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, values)} {cumulative}"
+
+
+class Timer:
+    """``with Timer(histogram, *labels):`` observes the block's duration in seconds."""
+
+    __slots__ = ("histogram", "labels", "_started")
+
+    def __init__(self, histogram: Histogram, *labels: str):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self._started, *self.labels)
+
+
+_registry: List = []
+# Callables returning (name, type, help, [(labels dict, value)]) read at scrape time
+_collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[dict, float]]]]]] = []
+
+
+def collector(fn):
+    """Register a function that reports gauges or counters at scrape time."""
+    _collectors.append(fn)
+    return fn
+
+
+# stats() fields that only ever grow, exported as counters
+_RUNNING_TOTALS = frozenset({
+    "hits", "disk_hits", "misses", "evictions", "restarts", "requests_served", "rejected",
+    "loads", "reloads", "failures",
+    "runs_recorded", "write_errors", "compactions", "runs_deleted",
+})
+
+
+def stats_samples(prefix: str, help: str, rows: Iterable[Tuple[dict, dict]]):
+    """Collector output for stats() dicts: one series per numeric field.
+
+    ``rows`` pairs a label dict with a stats dict. Running totals become
+    ``<prefix>_<field>_total`` counters, everything else a gauge.
+    """
+    series: Dict[str, Tuple[str, str, str, list]] = {}
+    for labels, stats in rows:
+        for field, value in stats.items():
+            if not isinstance(value, (int, float)):
+                continue
+            if field in _RUNNING_TOTALS:
+                name, kind = f"{prefix}_{field}_total", "counter"
+            else:
+                name, kind = f"{prefix}_{field}", "gauge"
+            if name not in series:
+                series[name] = (name, kind, f"{help} ({field})", [])
+            series[name][3].append((labels, float(value)))
+    return list(series.values())
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        for name, kind, help, samples in collect():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Request path ------------------------------------------------------------
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "grammar_oracle_http_request_duration_seconds",
+    "Time to the end of the response body, streams included",
+    ("method", "route", "status"),
+)
+
+PARSE_STAGE_SECONDS = Histogram(
+    "grammar_oracle_parse_stage_seconds",
+    "Time per parse_sentence stage: spawn (JVM start; one-shot JVMs include the parse), "
+    "io (waiting on parser output), decode (JSON), model (ParseResult), earley (in-process parse)",
+    ("engine", "stage"),
+    buckets=STAGE_BUCKETS,
+)
+
+PARSE_OUTCOMES = Counter(
+    "grammar_oracle_parses_total",
+    "parse_sentence calls by how they were answered: cache, preflight, parsed or error",
+    ("engine", "outcome"),
+)
+
+PARSER_STATES_EXPLORED = Histogram(
+    "grammar_oracle_parser_states_explored",
+    "Parser statesExplored per parsed sentence",
+    ("language", "engine"), buckets=WORK_BUCKETS,
+)
+PARSER_STATES_GENERATED = Histogram(
+    "grammar_oracle_parser_states_generated",
+    "Parser statesGenerated per parsed sentence",
+    ("language", "engine"), buckets=WORK_BUCKETS,
+)
+PARSER_MAX_QUEUE = Histogram(
+    "grammar_oracle_parser_max_queue_size",
+    "Parser maxQueueSize per parsed sentence",
+    ("language", "engine"), buckets=WORK_BUCKETS,
+)
+PARSER_RULE_EXPANSIONS = Histogram(
+    "grammar_oracle_parser_rule_expansions",
+    "Parser ruleExpansions per parsed sentence",
+    ("language", "engine"), buckets=WORK_BUCKETS,
+)
+PARSER_PARSE_SECONDS = Histogram(
+    "grammar_oracle_parser_parse_seconds",
+    "Parser-reported parseTimeMs per parsed sentence, in seconds",
+    ("language", "engine"), buckets=STAGE_BUCKETS,
+)
+
+VERIFY_LOOP_RUNS = Counter(
+    "grammar_oracle_verify_loop_runs_total",
+    "Completed verify loops by outcome (success or failure)",
+    ("language", "outcome"),
+)
+VERIFY_LOOP_ATTEMPTS = Histogram(
+    "grammar_oracle_verify_loop_attempts",
+    "Attempts per completed verify loop",
+    ("language", "outcome"), buckets=ATTEMPT_BUCKETS,
+)
+VERIFY_LOOP_ABORTS = Counter(
+    "grammar_oracle_verify_loop_aborted_generations_total",
+    "Sentence generations cancelled at the first word the grammar can't take",
+    ("language",),
+)
+VERIFY_LOOP_TOKENS_SAVED = Counter(
+    "grammar_oracle_verify_loop_tokens_saved_total",
+    "Estimated output tokens not generated thanks to early aborts",
+    ("language",),
+)
+
+LIVE_UPDATE_SECONDS = Histogram(
+    "grammar_oracle_live_update_seconds",
+    "Time to apply one /validate/live edit and build its update",
+    ("language",), buckets=STAGE_BUCKETS,
+)
+
+
+def observe_parser_metrics(result, language: str, engine: str) -> None:
+    """Fold a freshly parsed result's ParseMetrics into the per-language histograms."""
+    m = result.metrics
+    if m is None:
+        return
+    language = language.lower()
+    PARSER_STATES_EXPLORED.observe(m.statesExplored, language, engine)
+    PARSER_STATES_GENERATED.observe(m.statesGenerated, language, engine)
+    PARSER_MAX_QUEUE.observe(m.maxQueueSize, language, engine)
+    PARSER_RULE_EXPANSIONS.observe(m.ruleExpansions, language, engine)
+    PARSER_PARSE_SECONDS.observe(m.parseTimeMs / 1000, language, engine)
+
+
+class MetricsMiddleware:
+    """Observe each HTTP request's latency by method, route template and status.
+
+    Route templates (not raw paths) keep label cardinality bounded; requests
+    that match no route are labelled ``unmatched``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status),
+            )
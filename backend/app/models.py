@@ -1,11 +1,12 @@
 from __future__ import annotations
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional, Union
 from pydantic import BaseModel, Field
 
 
 class ValidateRequest(BaseModel):
     sentence: str = Field(..., min_length=1, description="Sentence to validate")
     language: str = Field(default="spanish", description="Grammar language")
+    engine: Optional[Literal["jar", "python"]] = Field(default=None, description="Parser engine (defaults to PARSER_ENGINE)")
 
 
 class Token(BaseModel):
@@ -55,10 +56,144 @@ class ParseResult(BaseModel):
     metrics: Optional[ParseMetrics] = None
 
 
+class BatchValidateRequest(BaseModel):
+    sentences: List[str] = Field(..., description="Sentences to validate")
+    language: str = Field(default="spanish", description="Grammar language")
+    engine: Optional[Literal["jar", "python"]] = Field(default=None, description="Parser engine (defaults to PARSER_ENGINE)")
+    concurrency: int = Field(default=8, ge=1, le=64, description="Maximum sentences parsed at once")
+
+
+class BatchItemResult(BaseModel):
+    type: Literal["result"] = "result"
+    index: int
+    sentence: str
+    result: Optional[ParseResult] = None
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+
+class BatchSummary(BaseModel):
+    type: Literal["summary"] = "summary"
+    total: int
+    valid: int
+    invalid: int
+    errors: int
+    elapsed_ms: float
+    sentences_per_second: float
+    mean_item_ms: float
+    max_item_ms: float
+
+
+class LiveEdit(BaseModel):
+    """One message on /validate/live: the whole current text of the input."""
+    text: str = Field(..., max_length=2000, description="Current input text")
+    final: bool = Field(default=False, description="Treat the last word as finished and return a full ParseResult")
+
+
+class LiveUpdate(BaseModel):
+    words: List[str]
+    # The word still being typed (text doesn't end in a space or punctuation), if any
+    partial: Optional[str] = None
+    # The text can still be extended to a valid sentence
+    viable: bool
+    # Word index the expected categories are for: the next word, or the first word that doesn't fit
+    position: int
+    expected_categories: List[str] = []
+    # The words so far form a valid sentence
+    complete: bool
+    # Set when complete, or on a final edit
+    result: Optional[ParseResult] = None
+    # Words whose chart sets were kept from the previous edit
+    reused_words: int = 0
+    elapsed_ms: float = 0.0
+
+
+class ParseCacheStats(BaseModel):
+    enabled: bool
+    entries: int
+    bytes: int
+    max_entries: int
+    max_bytes: int
+    hits: int
+    disk_hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+    disk_enabled: bool
+    disk_entries: Optional[int] = None
+
+
+class LLMCacheStats(BaseModel):
+    mode: str
+    entries: int
+    bytes: int
+    max_entries: int
+    max_bytes: int
+    ttl_seconds: float
+    hits: int
+    disk_hits: int
+    misses: int
+    evictions: int
+    disk_evictions: int = 0
+    hit_rate: float
+    cassette_entries: int
+    disk_enabled: bool
+    disk_entries: Optional[int] = None
+
+
+class LLMCall(BaseModel):
+    """One Claude call: timing, token usage and how it ended."""
+    endpoint: str
+    model: str
+    purpose: str = ""
+    latency_ms: float = 0.0
+    # Streams only: time until the first text arrived
+    first_token_ms: Optional[float] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    stop_reason: Optional[str] = None
+    # Served by the LLM response cache, so no tokens were spent
+    response_cached: bool = False
+    error: Optional[str] = None
+
+
+class LLMUsage(BaseModel):
+    """The Claude calls made while serving one request, with totals."""
+    calls: List[LLMCall] = []
+    latency_ms: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    response_cache_hits: int = 0
+
+
+class LLMEndpointStats(BaseModel):
+    """Process-wide aggregate of Claude calls for one endpoint and model."""
+    endpoint: str
+    model: str
+    calls: int
+    response_cache_hits: int
+    errors: int
+    # Over live calls only; response-cache hits take no time
+    mean_latency_ms: float
+    max_latency_ms: float
+    input_tokens: int
+    output_tokens: int
+    cache_creation_input_tokens: int
+    cache_read_input_tokens: int
+    stop_reasons: Dict[str, int]
+
+
 class VerifyLoopRequest(BaseModel):
     prompt: str = Field(..., min_length=1, description="Natural language description of desired sentence")
     language: str = Field(default="spanish", description="Grammar language")
-    max_retries: int = Field(default=3, ge=1, le=10, description="Maximum generation attempts")
+    max_retries: int = Field(default=3, ge=1, le=10, description="Maximum generation rounds")
+    candidates: int = Field(default=1, ge=1, le=8, description="Sentences generated and validated in parallel per round")
+    use_cache: bool = Field(default=True, description="Reuse cached LLM replies for identical requests")
+    early_abort: bool = Field(default=False, description="Stream each sentence and stop generating at the first word the grammar can't take (judged by the in-process engine)")
 
 
 class ClaudeMessage(BaseModel):
@@ -68,11 +203,22 @@ class ClaudeMessage(BaseModel):
 
 class VerifyAttempt(BaseModel):
     attempt_number: int
+    round_number: int = 1
+    candidate_number: int = 1
     sentence: str
     result: ParseResult
     constraint_feedback: Optional[str] = None
     system_prompt: str = ""
     claude_messages: List[ClaudeMessage] = []
+    # Time spent generating this sentence, until it was complete or abandoned
+    generation_ms: float = 0.0
+    # Index of the word at which generation was cancelled (the sentence stops there)
+    aborted_at: Optional[int] = None
+    # Estimated for aborted attempts: streams report output tokens only at the end
+    output_tokens: int = 0
+    # Against the mean complete sentence so far; None until one has completed
+    tokens_saved: Optional[int] = None
+    latency_saved_ms: Optional[float] = None
 
 
 class VerifyLoopResponse(BaseModel):
@@ -82,11 +228,18 @@ class VerifyLoopResponse(BaseModel):
     final_result: ParseResult
     success: bool
     total_attempts: int
+    rounds: int = 0
+    candidates_per_round: int = 1
+    # Every generate_sentence call started, including candidates cancelled after a win
+    llm_calls: int = 0
+    elapsed_ms: float = 0.0
+    llm_usage: Optional[LLMUsage] = None
 
 
 class XRayRequest(BaseModel):
     prompt: str = Field(..., min_length=1, description="Creative prompt for paragraph generation")
     language: str = Field(default="spanish", description="Grammar language")
+    use_cache: bool = Field(default=True, description="Reuse cached LLM replies for identical requests")
 
 
 class SentenceAnalysis(BaseModel):
@@ -97,6 +250,11 @@ class SentenceAnalysis(BaseModel):
     translation: str = ""
 
 
+class XRaySentenceEvent(SentenceAnalysis):
+    """A SentenceAnalysis streamed by /xray/stream, with its position in the paragraph."""
+    index: int
+
+
 class XRayStats(BaseModel):
     total_sentences: int
     parsed_sentences: int
@@ -116,6 +274,102 @@ class XRayResponse(BaseModel):
     user_message: str = ""
     sentences: List[SentenceAnalysis]
     stats: XRayStats
+    llm_usage: Optional[LLMUsage] = None
+
+
+class RuleUsage(BaseModel):
+    number: int
+    rule: str
+    # Applications, counting repeats within a sentence
+    uses: int
+    sentences: int
+    last_used: float
+
+
+class RuleUsageReport(BaseModel):
+    language: str
+    rules: List[RuleUsage]
+    # Rules of the current grammar no stored run has used
+    unused: List[RuleApplied]
+
+
+class TagCoverage(BaseModel):
+    tag: str
+    tokens: int
+    # Distinct words seen with this tag, out of the lexicon's words for it
+    distinct_words: int
+    lexicon_words: int
+    coverage_percentage: float
+
+
+class AttemptOutcome(BaseModel):
+    """Verify-loop attempts with this number, across every stored run."""
+    attempt_number: int
+    attempts: int
+    valid: int
+    success_rate: float
+    # Runs whose first valid sentence came at this attempt
+    first_success: int
+    # Share of all verify-loop runs that had succeeded by this attempt
+    cumulative_success_rate: float
+
+
+class RunTotals(BaseModel):
+    kind: str
+    runs: int
+    successes: int
+    success_rate: Optional[float] = None
+    sentences: int
+    valid_sentences: int
+    validity_rate: float
+
+
+class RunSummary(BaseModel):
+    language: str
+    days: int
+    # Summed over the last ``days`` UTC days
+    recent: List[RunTotals]
+    all_time: List[RunTotals]
+    store: Dict[str, Union[bool, int, float]]
+
+
+class LanguagePack(BaseModel):
+    """A grammar pack in GRAMMAR_DIR and its state in the registry."""
+    language: str
+    # loaded, stale (files changed, reloaded on next use), unloaded, or error
+    state: Literal["loaded", "stale", "unloaded", "error"]
+    # Hash of the files on disk now, and of the loaded version
+    source_hash: str
+    loaded_hash: Optional[str] = None
+    loads: int = 0
+    reloads: int = 0
+    evictions: int = 0
+    failures: int = 0
+    # Unix time of the last use
+    last_used: Optional[float] = None
+    error: Optional[str] = None
+
+
+class GrammarAnalysisReport(BaseModel):
+    """Static tables for one grammar version (see grammar_analysis.py)."""
+    language: str
+    source_hash: str
+    start: str
+    nonterminals: List[str]
+    terminals: List[str]
+    # On a right-hand side but neither a tag nor defined by any rule
+    undefined: List[str] = []
+    nullable: List[str]
+    # Tags each non-terminal can start with
+    first: Dict[str, List[str]]
+    # Tags that can come right after each symbol; "$" is the end of the sentence
+    follow: Dict[str, List[str]]
+    # Symbols that derive no sentence (tags with no lexicon words included)
+    unproductive: List[str]
+    # Rule numbers whose left-hand side can't be reached from the start symbol
+    unreachable_rules: List[int]
+    left_recursive: List[str]
+    tag_words: Dict[str, List[str]]
 
 
 class GrammarStats(BaseModel):
@@ -143,3 +397,7 @@ class GrammarDetail(BaseModel):
     grammar_rules: List[GrammarRule]
     lexicon_entries: List[LexiconEntry]
     pos_tags: List[str]
+    # Totals count every match of the filters, not just this page
+    total_rules: Optional[int] = None
+    total_lexicon_entries: Optional[int] = None
+    next_cursor: Optional[str] = None
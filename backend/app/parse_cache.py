@@ -0,0 +1,178 @@
+"""Grammar-version-aware cache of ParseResults.
+
+Keys combine the language, the normalized sentence (as the parser tokenizes
+it), the engine, and a content hash of the grammar and lexicon XML, so editing
+either file invalidates old entries automatically. The JAR parses with the
+grammar bundled on its classpath, so its keys also carry the JAR's identity
+(path, size and mtime): rebuilding it invalidates its entries too. Entries live in an
+in-memory LRU bounded by count and bytes, with an optional SQLite tier that
+survives restarts.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import orjson
+
+from . import metrics
+from .lexicon_index import tokenize
+from .grammar_files import grammar_hash
+from .models import ParseResult
+
+
+class ParseCache:
+    def __init__(self, max_entries: int = 10_000, max_bytes: int = 64 * 1024 * 1024,
+                 db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._known_hashes: Dict[str, str] = {}
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache ("
+                " key TEXT PRIMARY KEY,"
+                " language TEXT NOT NULL,"
+                " grammar_hash TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def persistent(self) -> bool:
+        """Whether lookups and writes may touch SQLite (and so belong off the event loop)."""
+        return self._db is not None
+
+    def key(self, sentence: str, language: str, engine: str, engine_version: str = "") -> str:
+        """``engine_version`` identifies the parser build, for engines that don't read the XML."""
+        lang = language.lower()
+        source_hash = grammar_hash(lang)
+        self._purge_stale(lang, source_hash)
+        normalized = " ".join(tokenize(sentence))
+        raw = f"{lang}\0{engine}\0{engine_version}\0{source_hash}\0{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[ParseResult]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if value is None and self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value FROM parse_cache WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None:
+                value = row[0]
+                self._remember(key, value)
+                with self._lock:
+                    self.disk_hits += 1
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        # Each caller gets its own copy, so cached results can't be mutated.
+        # orjson + model_validate is the fastest decode (benchmarks/bench_decode.py).
+        return ParseResult.model_validate(orjson.loads(value))
+
+    def put(self, key: str, result: ParseResult, language: str) -> None:
+        value = result.model_dump_json().encode("utf-8")
+        self._remember(key, value)
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO parse_cache VALUES (?, ?, ?, ?, ?)",
+                    (key, language.lower(), grammar_hash(language), value, time.time()),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def _purge_stale(self, language: str, source_hash: str) -> None:
+        """Drop persisted entries from older grammar versions once per hash change."""
+        if self._db is None or self._known_hashes.get(language) == source_hash:
+            return
+        self._known_hashes[language] = source_hash
+        with self._db_lock:
+            self._db.execute(
+                "DELETE FROM parse_cache WHERE language = ? AND grammar_hash != ?",
+                (language, source_hash),
+            )
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM parse_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            stats = {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+        stats["disk_enabled"] = self._db is not None
+        if self._db is not None:
+            with self._db_lock:
+                stats["disk_entries"] = self._db.execute(
+                    "SELECT COUNT(*) FROM parse_cache"
+                ).fetchone()[0]
+        return stats
+
+
+cache = ParseCache(
+    max_entries=int(os.environ.get("PARSE_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.environ.get("PARSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    db_path=os.environ.get("PARSE_CACHE_DB") or None,
+)
+
+
+@metrics.collector
+def _collect_metrics():
+    return metrics.stats_samples("grammar_oracle_parse_cache", "Parse cache", [({}, cache.stats())])
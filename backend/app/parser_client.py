@@ -1,18 +1,37 @@
 from __future__ import annotations
-import json
+import asyncio
+import functools
 import os
 import shutil
 import subprocess
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
+import orjson
+
+from . import metrics
+from .earley import parse_sentence_earley
+from .lexicon_index import get_lexicon_index
 from .models import ParseResult
+from .parse_cache import cache
+from .parser_pool import WorkerError, WorkerTimeout, get_async_pool, get_pool
 
 # Resolve the JAR path relative to the project root
 _PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 _DEFAULT_JAR = _PROJECT_ROOT / "src" / "target" / "grammar-oracle-parser.jar"
 
+# Parsing engine: "jar" (Java parser) or "python" (in-process Earley chart)
+ENGINES = ("jar", "python")
+DEFAULT_ENGINE = os.environ.get("PARSER_ENGINE", "jar").lower()
+
+# Worker pool settings. PARSER_POOL_SIZE=0 falls back to one JVM per sentence.
+POOL_SIZE = int(os.environ.get("PARSER_POOL_SIZE", "2"))
+PARSE_TIMEOUT = float(os.environ.get("PARSER_TIMEOUT", "5"))
+STARTUP_TIMEOUT = float(os.environ.get("PARSER_STARTUP_TIMEOUT", "30"))
+HEALTH_INTERVAL = float(os.environ.get("PARSER_HEALTH_INTERVAL", "30"))
+
 
+@functools.lru_cache(maxsize=1)
 def _find_java() -> str:
     """Find the Java executable, checking common Homebrew paths."""
     # Check if java is on PATH
@@ -61,17 +80,180 @@ def _find_java() -> str:
 
 
 def parse_sentence(sentence: str, language: str = "spanish",
-                   jar_path: Optional[str] = None) -> ParseResult:
-    """Call the Java parser JAR and return a ParseResult."""
+                   jar_path: Optional[str] = None,
+                   engine: Optional[str] = None) -> ParseResult:
+    """Parse a sentence and return a ParseResult.
+
+    ``engine`` selects the Java JAR ("jar") or the in-process Earley parser
+    ("python"); both return the same ParseResult. Defaults to PARSER_ENGINE.
+    Sentences with words missing from the lexicon are rejected up front, and
+    results are served from the parse cache when the same sentence has been
+    parsed against the current grammar version.
+    """
+    engine, result, key = _prepare(sentence, language, jar_path, engine)
+    if result is not None:
+        return result
+    result = _parse_uncached(sentence, language, jar_path, engine)
+    _remember(key, result, language, engine)
+    return result
+
+
+async def parse_sentence_async(sentence: str, language: str = "spanish",
+                               jar_path: Optional[str] = None,
+                               engine: Optional[str] = None) -> ParseResult:
+    """Async counterpart of parse_sentence for the event loop.
+
+    The JAR is driven through asyncio subprocesses and the Earley engine runs
+    in a worker thread, so a parse never blocks other requests.
+    """
+    if cache.persistent:
+        # The SQLite tier blocks, so lookups and writes go to a thread like the parse
+        engine, result, key = await asyncio.to_thread(_prepare, sentence, language, jar_path, engine)
+    else:
+        engine, result, key = _prepare(sentence, language, jar_path, engine)
+    if result is not None:
+        return result
+    result = await _parse_uncached_async(sentence, language, jar_path, engine)
+    if cache.persistent:
+        await asyncio.to_thread(_remember, key, result, language, engine)
+    else:
+        _remember(key, result, language, engine)
+    return result
+
+
+def _prepare(sentence: str, language: str, jar_path: Optional[str],
+             engine: Optional[str]) -> Tuple[str, Optional[ParseResult], Optional[str]]:
+    """Resolve the engine and try the lexicon pre-flight and the cache.
+
+    Returns (engine, result if already answered, cache key or None if uncacheable).
+    """
+    engine = (engine or DEFAULT_ENGINE).lower()
+
+    # Out-of-lexicon and empty sentences are rejected without calling the parser
+    lexicon = get_lexicon_index(language)
+    if lexicon is not None and engine in ENGINES:
+        rejected = lexicon.preflight(sentence)
+        if rejected is not None:
+            metrics.PARSE_OUTCOMES.inc(engine, "preflight")
+            return engine, rejected, None
+
+    # A custom JAR isn't tied to the grammar sources the cache key hashes
+    if not cache.enabled or engine not in ENGINES or jar_path:
+        return engine, None, None
+
+    key = cache.key(sentence, language, engine, _jar_identity() if engine == "jar" else "")
+    result = cache.get(key)
+    if result is not None:
+        metrics.PARSE_OUTCOMES.inc(engine, "cache")
+    return engine, result, key
+
+
+def _jar_identity(jar: Path = _DEFAULT_JAR) -> str:
+    """The bundled JAR's path, size and mtime: its grammar can differ from the XML on disk."""
+    try:
+        stat = jar.stat()
+    except OSError:
+        return f"{jar}:missing"
+    return f"{jar}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _remember(key: Optional[str], result: ParseResult, language: str, engine: str) -> None:
+    if result.error is not None:
+        # Errors (missing JAR, timeouts) are transient and never cached
+        metrics.PARSE_OUTCOMES.inc(engine, "error")
+        return
+    metrics.PARSE_OUTCOMES.inc(engine, "parsed")
+    metrics.observe_parser_metrics(result, language, engine)
+    if key is not None:
+        cache.put(key, result, language)
+
+
+def _resolve_jar(sentence: str, jar_path: Optional[str],
+                 engine: str) -> Tuple[Optional[Path], Optional[ParseResult]]:
+    """Return the JAR to run, or an error result for an unknown engine or missing JAR."""
+    if engine != "jar":
+        return None, ParseResult(
+            valid=False,
+            sentence=sentence,
+            error=f"Unknown parser engine '{engine}'. Use one of: {', '.join(ENGINES)}.",
+        )
+
     jar = Path(jar_path) if jar_path else _DEFAULT_JAR
 
     if not jar.exists():
-        return ParseResult(
+        return None, ParseResult(
             valid=False,
             sentence=sentence,
             error=f"Parser JAR not found at {jar}. Run 'mvn clean package' in src/.",
         )
+    return jar, None
+
+
+def _parse_uncached(sentence: str, language: str, jar_path: Optional[str],
+                    engine: str) -> ParseResult:
+    if engine == "python":
+        with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "python", "earley"):
+            return parse_sentence_earley(sentence, language)
+    jar, error = _resolve_jar(sentence, jar_path, engine)
+    if error is not None:
+        return error
+
+    if POOL_SIZE > 0:
+        return _parse_with_pool(sentence, language, jar)
+    return _parse_with_subprocess(sentence, language, jar)
+
+
+async def _parse_uncached_async(sentence: str, language: str, jar_path: Optional[str],
+                                engine: str) -> ParseResult:
+    if engine == "python":
+        with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "python", "earley"):
+            return await asyncio.to_thread(parse_sentence_earley, sentence, language)
+    jar, error = _resolve_jar(sentence, jar_path, engine)
+    if error is not None:
+        return error
+
+    # First call may probe for Java with blocking subprocesses; cached afterwards
+    java_bin = await asyncio.to_thread(_find_java)
+    if POOL_SIZE > 0:
+        return await _parse_with_async_pool(sentence, language, jar, java_bin)
+    return await _parse_with_async_subprocess(sentence, language, jar, java_bin)
+
+
+def _to_result(data: dict, sentence: str) -> ParseResult:
+    # Error responses from the parser carry no sentence field
+    data.setdefault("sentence", sentence)
+    with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "model"):
+        # One validation pass over the orjson-decoded dict. pydantic-core builds
+        # the tree faster than model_construct can skip validating it, and JSON
+        # mode was no faster; see benchmarks/bench_decode.py
+        return ParseResult.model_validate(data)
+
+
+def _parse_with_pool(sentence: str, language: str, jar: Path) -> ParseResult:
+    java_bin = _find_java()
+    pool = get_pool(
+        java_bin, str(jar), language,
+        size=POOL_SIZE,
+        request_timeout=PARSE_TIMEOUT,
+        startup_timeout=STARTUP_TIMEOUT,
+        health_interval=HEALTH_INTERVAL,
+    )
+    try:
+        return _to_result(pool.parse(sentence), sentence)
+    except WorkerTimeout as e:
+        return ParseResult(valid=False, sentence=sentence, error=str(e))
+    except WorkerError as e:
+        return ParseResult(valid=False, sentence=sentence, error=f"Parser worker failed: {e}")
+    except FileNotFoundError:
+        return ParseResult(
+            valid=False,
+            sentence=sentence,
+            error=f"Java not found at '{java_bin}'. Ensure Java 21+ is installed.",
+        )
+
 
+def _parse_with_subprocess(sentence: str, language: str, jar: Path) -> ParseResult:
+    """Spawn a fresh JVM for a single sentence (used when the pool is disabled)."""
     java_bin = _find_java()
     cmd = [
         java_bin, "-jar", str(jar),
@@ -81,31 +263,33 @@ def parse_sentence(sentence: str, language: str = "spanish",
     ]
 
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
+        with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "spawn"):
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                timeout=PARSE_TIMEOUT,
+            )
 
         stdout = result.stdout.strip()
         if not stdout:
+            stderr = result.stderr.decode("utf-8", errors="replace")
             return ParseResult(
                 valid=False,
                 sentence=sentence,
-                error=f"Parser returned no output. stderr: {result.stderr[:500]}",
+                error=f"Parser returned no output. stderr: {stderr[:500]}",
             )
 
-        data = json.loads(stdout)
-        return ParseResult(**data)
+        with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "decode"):
+            data = orjson.loads(stdout)
+        return _to_result(data, sentence)
 
     except subprocess.TimeoutExpired:
         return ParseResult(
             valid=False,
             sentence=sentence,
-            error="Parser timed out after 5 seconds",
+            error=f"Parser timed out after {PARSE_TIMEOUT:g} seconds",
         )
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         return ParseResult(
             valid=False,
             sentence=sentence,
@@ -117,3 +301,77 @@ def parse_sentence(sentence: str, language: str = "spanish",
             sentence=sentence,
             error=f"Java not found at '{java_bin}'. Ensure Java 21+ is installed.",
         )
+
+
+async def _parse_with_async_pool(sentence: str, language: str, jar: Path,
+                                 java_bin: str) -> ParseResult:
+    pool = get_async_pool(
+        java_bin, str(jar), language,
+        size=POOL_SIZE,
+        request_timeout=PARSE_TIMEOUT,
+        startup_timeout=STARTUP_TIMEOUT,
+    )
+    try:
+        return _to_result(await pool.parse(sentence), sentence)
+    except WorkerTimeout as e:
+        return ParseResult(valid=False, sentence=sentence, error=str(e))
+    except WorkerError as e:
+        return ParseResult(valid=False, sentence=sentence, error=f"Parser worker failed: {e}")
+    except FileNotFoundError:
+        return ParseResult(
+            valid=False,
+            sentence=sentence,
+            error=f"Java not found at '{java_bin}'. Ensure Java 21+ is installed.",
+        )
+
+
+async def _parse_with_async_subprocess(sentence: str, language: str, jar: Path,
+                                       java_bin: str) -> ParseResult:
+    """Spawn a fresh JVM for a single sentence without blocking the event loop."""
+    try:
+        with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "spawn"):
+            proc = await asyncio.create_subprocess_exec(
+                java_bin, "-jar", str(jar),
+                "--json",
+                "--language", language.upper(),
+                "--sentence", sentence,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+    except FileNotFoundError:
+        return ParseResult(
+            valid=False,
+            sentence=sentence,
+            error=f"Java not found at '{java_bin}'. Ensure Java 21+ is installed.",
+        )
+
+    try:
+        with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "io"):
+            stdout_bytes, stderr_bytes = await asyncio.wait_for(proc.communicate(), timeout=PARSE_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return ParseResult(
+            valid=False,
+            sentence=sentence,
+            error=f"Parser timed out after {PARSE_TIMEOUT:g} seconds",
+        )
+
+    stdout = stdout_bytes.strip()
+    if not stdout:
+        stderr = stderr_bytes.decode("utf-8", errors="replace")
+        return ParseResult(
+            valid=False,
+            sentence=sentence,
+            error=f"Parser returned no output. stderr: {stderr[:500]}",
+        )
+    try:
+        with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "decode"):
+            data = orjson.loads(stdout)
+        return _to_result(data, sentence)
+    except orjson.JSONDecodeError as e:
+        return ParseResult(
+            valid=False,
+            sentence=sentence,
+            error=f"Invalid JSON from parser: {e}",
+        )
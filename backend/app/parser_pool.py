@@ -0,0 +1,491 @@
+"""Pool of long-lived Java parser processes speaking line-delimited JSON.
+
+Each worker runs ``java -jar grammar-oracle-parser.jar --server`` and keeps the
+grammar and lexicon loaded between requests, so a parse costs one round trip
+over stdin/stdout instead of a JVM startup.
+
+``ParserPool`` serves blocking callers from threads; ``AsyncParserPool`` drives
+the same server mode with asyncio subprocesses for the async request path.
+"""
+
+from __future__ import annotations
+import asyncio
+import itertools
+import logging
+import queue
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+
+class WorkerError(Exception):
+    """Raised when a worker process dies or produces unusable output."""
+
+
+class WorkerTimeout(WorkerError):
+    """Raised when a worker does not answer within the request timeout."""
+
+
+class ParserWorker:
+    """A single parser subprocess and the thread draining its stdout."""
+
+    def __init__(self, java_bin: str, jar: str, language: str):
+        self.language = language
+        self.requests_served = 0
+        self._ids = itertools.count(1)
+        # Bytes, not text: orjson decodes the raw UTF-8 lines directly
+        self._lines: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._proc = subprocess.Popen(
+            [java_bin, "-jar", jar, "--server", "--language", language.upper()],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._reader = threading.Thread(target=self._drain, daemon=True)
+        self._reader.start()
+
+    def _drain(self) -> None:
+        assert self._proc.stdout is not None
+        for line in self._proc.stdout:
+            self._lines.put(line)
+        self._lines.put(None)  # EOF marker
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def request(self, payload: dict, timeout: float) -> dict:
+        """Send one request and wait for the response with the same id."""
+        if not self.alive:
+            raise WorkerError(f"Parser worker exited with code {self._proc.returncode}")
+
+        request_id = next(self._ids)
+        message = dict(payload, id=request_id)
+        try:
+            assert self._proc.stdin is not None
+            self._proc.stdin.write(orjson.dumps(message) + b"\n")
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"Could not write to parser worker: {e}") from e
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerTimeout(f"Parser timed out after {timeout:g} seconds")
+            try:
+                with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "io"):
+                    line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                raise WorkerTimeout(f"Parser timed out after {timeout:g} seconds")
+            if line is None:
+                raise WorkerError("Parser worker closed its output")
+            try:
+                with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "decode"):
+                    data = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                raise WorkerError(f"Invalid JSON from parser: {e}") from e
+            # Skip stale responses left over from a previous timed-out request
+            if data.get("id") == request_id:
+                data.pop("id", None)
+                self.requests_served += 1
+                return data
+
+    def ping(self, timeout: float) -> bool:
+        try:
+            return bool(self.request({"type": "ping"}, timeout).get("pong"))
+        except WorkerError:
+            return False
+
+    def kill(self) -> None:
+        if self.alive:
+            self._proc.kill()
+        self._proc.wait()
+
+    def close(self) -> None:
+        """Close stdin so the server exits cleanly, killing it if it lingers."""
+        if self.alive:
+            try:
+                assert self._proc.stdin is not None
+                self._proc.stdin.close()
+                self._proc.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self.kill()
+
+
+class ParserPool:
+    """Fixed-size pool of parser workers for one JAR and language.
+
+    Workers are started lazily, replaced when they crash or hang, and
+    periodically pinged by a background health-check thread.
+    """
+
+    def __init__(
+        self,
+        java_bin: str,
+        jar: str,
+        language: str,
+        size: int = 2,
+        request_timeout: float = 5.0,
+        startup_timeout: float = 30.0,
+        health_interval: float = 30.0,
+    ):
+        self.java_bin = java_bin
+        self.jar = jar
+        self.language = language
+        self.size = max(1, size)
+        self.request_timeout = request_timeout
+        self.startup_timeout = startup_timeout
+        self.restarts = 0
+
+        # Idle slots hold either a running worker or None (start on demand)
+        self._idle: "queue.Queue[Optional[ParserWorker]]" = queue.Queue()
+        for _ in range(self.size):
+            self._idle.put(None)
+        self._workers: List[ParserWorker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._health_interval = health_interval
+        self._health_stop = threading.Event()
+        if health_interval > 0:
+            threading.Thread(target=self._health_loop, daemon=True).start()
+
+    def _spawn(self) -> ParserWorker:
+        with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "spawn"):
+            worker = ParserWorker(self.java_bin, self.jar, self.language)
+            # The server loads the grammar before answering its first ping
+            started = worker.ping(self.startup_timeout)
+        if not started:
+            worker.kill()
+            raise WorkerError("Parser worker failed to start")
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _discard(self, worker: ParserWorker) -> None:
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self.restarts += 1
+        worker.kill()
+
+    def parse(self, sentence: str) -> dict:
+        """Parse a sentence on the next free worker and return the raw JSON dict."""
+        if self._closed:
+            raise WorkerError("Parser pool is shut down")
+        try:
+            worker = self._idle.get(timeout=self.request_timeout)
+        except queue.Empty:
+            raise WorkerTimeout(f"No parser worker free after {self.request_timeout:g} seconds")
+
+        try:
+            if worker is not None and not worker.alive:
+                self._discard(worker)
+                worker = None
+            if worker is None:
+                worker = self._spawn()
+            data = worker.request(
+                {"sentence": sentence, "language": self.language.upper()},
+                self.request_timeout,
+            )
+        except BaseException:
+            # Crashed, hung or failed to start: drop it and free the slot for a fresh worker
+            if worker is not None:
+                self._discard(worker)
+            self._idle.put(None)
+            raise
+        self._idle.put(worker)
+        return data
+
+    def health_check(self) -> int:
+        """Ping every idle worker, replacing any that fail. Returns restarts done."""
+        replaced = 0
+        checked: List[Optional[ParserWorker]] = []
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None and not worker.ping(self.request_timeout):
+                log.warning("Parser worker for %s failed health check, restarting", self.language)
+                self._discard(worker)
+                worker = None
+                replaced += 1
+            checked.append(worker)
+        for worker in checked:
+            self._idle.put(worker)
+        return replaced
+
+    def _health_loop(self) -> None:
+        while not self._health_stop.wait(self._health_interval):
+            if self._closed:
+                return
+            self.health_check()
+
+    def stats(self) -> dict:
+        with self._lock:
+            workers = list(self._workers)
+        return {
+            "language": self.language,
+            "size": self.size,
+            "running": sum(1 for w in workers if w.alive),
+            "idle": self._idle.qsize(),
+            "restarts": self.restarts,
+            "requests_served": sum(w.requests_served for w in workers),
+        }
+
+    def close(self) -> None:
+        self._closed = True
+        self._health_stop.set()
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+
+_pools: Dict[Tuple[str, str], ParserPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(java_bin: str, jar: str, language: str, **kwargs) -> ParserPool:
+    """Return the shared pool for a JAR and language, creating it on first use."""
+    key = (jar, language.lower())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ParserPool(java_bin, jar, language.lower(), **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+def pool_stats() -> List[dict]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [p.stats() for p in pools] + [p.stats() for p in list(_async_pools.values())]
+
+
+@metrics.collector
+def _collect_metrics():
+    with _pools_lock:
+        pools = [("thread", p) for p in _pools.values()]
+    pools += [("async", p) for p in list(_async_pools.values())]
+    rows = []
+    for kind, pool in pools:
+        stats = pool.stats()
+        rows.append(({"language": stats.pop("language"), "kind": kind}, stats))
+    return metrics.stats_samples("grammar_oracle_parser_pool", "Parser worker pool", rows)
+
+
+def shutdown_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+# Parse trees for long sentences can exceed asyncio's default 64 KiB line limit
+_ASYNC_LINE_LIMIT = 16 * 1024 * 1024
+
+
+class AsyncParserWorker:
+    """A single parser subprocess driven from the event loop."""
+
+    def __init__(self, proc: asyncio.subprocess.Process, language: str):
+        self.language = language
+        self.requests_served = 0
+        self._ids = itertools.count(1)
+        self._proc = proc
+
+    @classmethod
+    async def start(cls, java_bin: str, jar: str, language: str) -> "AsyncParserWorker":
+        proc = await asyncio.create_subprocess_exec(
+            java_bin, "-jar", jar, "--server", "--language", language.upper(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=_ASYNC_LINE_LIMIT,
+        )
+        return cls(proc, language)
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.returncode is None
+
+    async def request(self, payload: dict, timeout: float) -> dict:
+        """Send one request and wait for the response with the same id."""
+        if not self.alive:
+            raise WorkerError(f"Parser worker exited with code {self._proc.returncode}")
+
+        request_id = next(self._ids)
+        message = dict(payload, id=request_id)
+        assert self._proc.stdin is not None and self._proc.stdout is not None
+        try:
+            self._proc.stdin.write(orjson.dumps(message) + b"\n")
+            await self._proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError, OSError) as e:
+            raise WorkerError(f"Could not write to parser worker: {e}") from e
+
+        try:
+            async with asyncio.timeout(timeout):
+                while True:
+                    with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "io"):
+                        line = await self._proc.stdout.readline()
+                    if not line:
+                        raise WorkerError("Parser worker closed its output")
+                    try:
+                        with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "decode"):
+                            data = orjson.loads(line)
+                    except orjson.JSONDecodeError as e:
+                        raise WorkerError(f"Invalid JSON from parser: {e}") from e
+                    if data.get("id") == request_id:
+                        data.pop("id", None)
+                        self.requests_served += 1
+                        return data
+        except TimeoutError:
+            raise WorkerTimeout(f"Parser timed out after {timeout:g} seconds")
+
+    async def ping(self, timeout: float) -> bool:
+        try:
+            return bool((await self.request({"type": "ping"}, timeout)).get("pong"))
+        except WorkerError:
+            return False
+
+    def kill(self) -> None:
+        if self.alive:
+            self._proc.kill()
+
+    async def close(self) -> None:
+        """Close stdin so the server exits cleanly, killing it if it lingers."""
+        if self.alive:
+            assert self._proc.stdin is not None
+            self._proc.stdin.close()
+            try:
+                await asyncio.wait_for(self._proc.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                pass
+        self.kill()
+        await self._proc.wait()
+
+
+class AsyncParserPool:
+    """Fixed-size pool of asyncio parser workers for one JAR and language.
+
+    Same lifecycle as ParserPool: workers start lazily and are replaced when
+    they crash, hang or are found dead when borrowed. Bound to the event loop
+    that created it.
+    """
+
+    def __init__(
+        self,
+        java_bin: str,
+        jar: str,
+        language: str,
+        size: int = 2,
+        request_timeout: float = 5.0,
+        startup_timeout: float = 30.0,
+    ):
+        self.java_bin = java_bin
+        self.jar = jar
+        self.language = language
+        self.size = max(1, size)
+        self.request_timeout = request_timeout
+        self.startup_timeout = startup_timeout
+        self.restarts = 0
+
+        self._idle: "asyncio.Queue[Optional[AsyncParserWorker]]" = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(None)
+        self._workers: List[AsyncParserWorker] = []
+        self._closed = False
+
+    async def _spawn(self) -> AsyncParserWorker:
+        with metrics.Timer(metrics.PARSE_STAGE_SECONDS, "jar", "spawn"):
+            worker = await AsyncParserWorker.start(self.java_bin, self.jar, self.language)
+            # The server loads the grammar before answering its first ping
+            started = await worker.ping(self.startup_timeout)
+        if not started:
+            worker.kill()
+            raise WorkerError("Parser worker failed to start")
+        self._workers.append(worker)
+        return worker
+
+    def _discard(self, worker: AsyncParserWorker) -> None:
+        if worker in self._workers:
+            self._workers.remove(worker)
+        self.restarts += 1
+        worker.kill()
+
+    async def parse(self, sentence: str) -> dict:
+        """Parse a sentence on the next free worker and return the raw JSON dict."""
+        if self._closed:
+            raise WorkerError("Parser pool is shut down")
+        try:
+            worker = await asyncio.wait_for(self._idle.get(), timeout=self.request_timeout)
+        except asyncio.TimeoutError:
+            raise WorkerTimeout(f"No parser worker free after {self.request_timeout:g} seconds")
+
+        try:
+            if worker is not None and not worker.alive:
+                self._discard(worker)
+                worker = None
+            if worker is None:
+                worker = await self._spawn()
+            data = await worker.request(
+                {"sentence": sentence, "language": self.language.upper()},
+                self.request_timeout,
+            )
+        except BaseException:
+            # Crashed, hung, failed to start or cancelled mid-request: the
+            # worker may still owe a response, so replace it
+            if worker is not None:
+                self._discard(worker)
+            self._idle.put_nowait(None)
+            raise
+        self._idle.put_nowait(worker)
+        return data
+
+    def stats(self) -> dict:
+        return {
+            "language": self.language,
+            "size": self.size,
+            "running": sum(1 for w in self._workers if w.alive),
+            "idle": self._idle.qsize(),
+            "restarts": self.restarts,
+            "requests_served": sum(w.requests_served for w in self._workers),
+        }
+
+    async def close(self) -> None:
+        self._closed = True
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            await worker.close()
+
+
+_async_pools: Dict[Tuple[str, str, int], AsyncParserPool] = {}
+
+
+def get_async_pool(java_bin: str, jar: str, language: str, **kwargs) -> AsyncParserPool:
+    """Return the running loop's shared async pool for a JAR and language."""
+    key = (jar, language.lower(), id(asyncio.get_running_loop()))
+    pool = _async_pools.get(key)
+    if pool is None:
+        pool = AsyncParserPool(java_bin, jar, language.lower(), **kwargs)
+        _async_pools[key] = pool
+    return pool
+
+
+async def shutdown_async_pools() -> None:
+    """Close the async pools owned by the running loop."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _async_pools if k[2] == loop_id]:
+        await _async_pools.pop(key).close()
@@ -0,0 +1,448 @@
+"""Persistent store of /xray and /verify-loop runs, with running coverage analytics.
+
+Each run is written to SQLite with its prompt, and every sentence or attempt
+with its validity, rule numbers and tokens. The same transaction updates the
+running aggregates the analytics endpoints read:
+
+- rule usage per language (keyed on the rule text, so renumbering is safe)
+- word coverage per tag: tokens seen, and distinct lexicon words seen
+- verify-loop outcomes by attempt number
+- run totals, all-time and per UTC day
+
+Reads touch only aggregate rows, never the run history. Raw runs past the
+retention age or count are deleted by periodic compaction, which also returns
+the freed pages to the filesystem; the aggregates keep counting them.
+
+Disabled unless ``RUN_STORE_DB`` is set.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from . import metrics
+from .grammar_analysis import get_analysis
+from .grammar_files import grammar_hash
+from .grammar_registry import get_snapshot
+from .models import (
+    AttemptOutcome, ParseResult, RuleApplied, RuleUsage, RuleUsageReport, RunSummary, RunTotals,
+    TagCoverage, VerifyLoopResponse, XRayResponse,
+)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS runs ("
+    " id INTEGER PRIMARY KEY,"
+    " kind TEXT NOT NULL,"
+    " language TEXT NOT NULL,"
+    " grammar_hash TEXT NOT NULL,"
+    " prompt TEXT NOT NULL,"
+    " created REAL NOT NULL,"
+    " success INTEGER,"
+    " sentences INTEGER NOT NULL,"
+    " valid_sentences INTEGER NOT NULL,"
+    " elapsed_ms REAL)",
+    "CREATE INDEX IF NOT EXISTS runs_created ON runs (created)",
+    # One row per X-ray sentence or verify-loop attempt; rules and tokens are JSON
+    "CREATE TABLE IF NOT EXISTS run_sentences ("
+    " run_id INTEGER NOT NULL,"
+    " position INTEGER NOT NULL,"
+    " attempt_number INTEGER,"
+    " sentence TEXT NOT NULL,"
+    " valid INTEGER NOT NULL,"
+    " rules TEXT NOT NULL,"
+    " tokens TEXT NOT NULL,"
+    " PRIMARY KEY (run_id, position))",
+    "CREATE TABLE IF NOT EXISTS rule_usage ("
+    " language TEXT NOT NULL,"
+    " rule TEXT NOT NULL,"
+    " number INTEGER NOT NULL,"
+    " uses INTEGER NOT NULL,"
+    " sentences INTEGER NOT NULL,"
+    " last_used REAL NOT NULL,"
+    " PRIMARY KEY (language, rule))",
+    "CREATE TABLE IF NOT EXISTS tag_coverage ("
+    " language TEXT NOT NULL,"
+    " tag TEXT NOT NULL,"
+    " tokens INTEGER NOT NULL,"
+    " distinct_words INTEGER NOT NULL,"
+    " PRIMARY KEY (language, tag))",
+    # Distinct words per tag, for tag_coverage.distinct_words; bounded by the lexicon
+    "CREATE TABLE IF NOT EXISTS seen_words ("
+    " language TEXT NOT NULL,"
+    " tag TEXT NOT NULL,"
+    " word TEXT NOT NULL,"
+    " PRIMARY KEY (language, tag, word)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS attempt_outcomes ("
+    " language TEXT NOT NULL,"
+    " attempt_number INTEGER NOT NULL,"
+    " attempts INTEGER NOT NULL,"
+    " valid INTEGER NOT NULL,"
+    # Runs whose first valid sentence came at this attempt
+    " first_success INTEGER NOT NULL,"
+    " PRIMARY KEY (language, attempt_number))",
+    "CREATE TABLE IF NOT EXISTS run_totals ("
+    " day TEXT NOT NULL,"
+    " language TEXT NOT NULL,"
+    " kind TEXT NOT NULL,"
+    " runs INTEGER NOT NULL,"
+    " successes INTEGER NOT NULL,"
+    " sentences INTEGER NOT NULL,"
+    " valid_sentences INTEGER NOT NULL,"
+    " PRIMARY KEY (day, language, kind))",
+    # Counters kept in step with the tables, so reading them never scans
+    "CREATE TABLE IF NOT EXISTS store_meta ("
+    " key TEXT PRIMARY KEY,"
+    " value INTEGER NOT NULL)",
+)
+
+# run_totals rows under this day hold all-time totals
+_ALL_TIME = "*"
+
+# (attempt number or None, sentence, result) for each stored sentence
+StoredSentence = Tuple[Optional[int], str, ParseResult]
+
+
+class RunStore:
+    def __init__(self, db_path: Optional[str] = None, retention_days: float = 30,
+                 max_runs: int = 100_000, compact_interval: float = 3600):
+        self.retention_days = retention_days
+        self.max_runs = max_runs
+        self.compact_interval = compact_interval
+        self.runs_recorded = 0
+        self.write_errors = 0
+        self.compactions = 0
+        self.runs_deleted = 0
+        self._last_compaction = 0.0
+        self._lock = threading.Lock()
+        self._db_path = db_path
+        # Mirrors the store_meta row, so stats() needs no query
+        self.stored_runs = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            # Only takes effect on a new file; lets compaction shrink it in place
+            self._db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+            # Counted once, for a file written before store_meta existed
+            self._db.execute(
+                "INSERT OR IGNORE INTO store_meta VALUES ('stored_runs', (SELECT COUNT(*) FROM runs))"
+            )
+            self._db.commit()
+            self.stored_runs = self._db.execute(
+                "SELECT value FROM store_meta WHERE key = 'stored_runs'"
+            ).fetchone()[0]
+            self.compact()
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    async def persist(self, response) -> None:
+        """Store a finished XRayResponse or VerifyLoopResponse off the event loop.
+
+        A failed write is counted and otherwise ignored: the run has already
+        been served.
+        """
+        if self._db is None:
+            return
+        record = self.record_xray if isinstance(response, XRayResponse) else self.record_verify_loop
+        try:
+            await asyncio.to_thread(record, response)
+        except sqlite3.Error:
+            with self._lock:
+                self.write_errors += 1
+
+    def record_xray(self, response: XRayResponse) -> Optional[int]:
+        sentences = [(None, a.sentence, a.result) for a in response.sentences]
+        return self._record("xray", response.language, response.prompt, None, None, sentences)
+
+    def record_verify_loop(self, response: VerifyLoopResponse) -> Optional[int]:
+        sentences = [(a.attempt_number, a.sentence, a.result) for a in response.attempts]
+        return self._record("verify-loop", response.language, response.prompt, response.success,
+                            response.elapsed_ms, sentences)
+
+    def _record(self, kind: str, language: str, prompt: str, success: Optional[bool],
+                elapsed_ms: Optional[float], sentences: List[StoredSentence]) -> Optional[int]:
+        if self._db is None:
+            return None
+        lang = language.lower()
+        now = time.time()
+        day = time.strftime("%Y-%m-%d", time.gmtime(now))
+        valid_count = sum(1 for _, _, result in sentences if result.valid)
+
+        rule_uses: Counter = Counter()
+        rule_sentences: Counter = Counter()
+        numbers: Dict[str, int] = {}
+        tag_tokens: Counter = Counter()
+        words = set()
+        for _, _, result in sentences:
+            for rule in result.rulesApplied:
+                rule_uses[rule.rule] += 1
+                numbers[rule.rule] = rule.number
+            for rule in {rule.rule for rule in result.rulesApplied}:
+                rule_sentences[rule] += 1
+            for token in result.tokens:
+                tag_tokens[token.tag] += 1
+                if token.tag != "UNKNOWN":
+                    words.add((token.tag, token.word.lower()))
+
+        with self._lock:
+            db = self._db
+            with db:
+                run_id = db.execute(
+                    "INSERT INTO runs (kind, language, grammar_hash, prompt, created, success,"
+                    " sentences, valid_sentences, elapsed_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (kind, lang, grammar_hash(lang), prompt, now,
+                     None if success is None else int(success), len(sentences), valid_count, elapsed_ms),
+                ).lastrowid
+                db.executemany(
+                    "INSERT INTO run_sentences VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (run_id, position, attempt, sentence, int(result.valid),
+                         orjson.dumps([rule.number for rule in result.rulesApplied]).decode(),
+                         orjson.dumps([[t.word, t.tag] for t in result.tokens]).decode())
+                        for position, (attempt, sentence, result) in enumerate(sentences)
+                    ],
+                )
+                db.executemany(
+                    "INSERT INTO rule_usage VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (language, rule) DO UPDATE SET"
+                    " number = excluded.number, uses = uses + excluded.uses,"
+                    " sentences = sentences + excluded.sentences, last_used = excluded.last_used",
+                    [(lang, rule, numbers[rule], uses, rule_sentences[rule], now) for rule, uses in rule_uses.items()],
+                )
+                new_words: Counter = Counter()
+                for tag, word in words:
+                    if db.execute("INSERT OR IGNORE INTO seen_words VALUES (?, ?, ?)", (lang, tag, word)).rowcount:
+                        new_words[tag] += 1
+                db.executemany(
+                    "INSERT INTO tag_coverage VALUES (?, ?, ?, ?) ON CONFLICT (language, tag) DO UPDATE SET"
+                    " tokens = tokens + excluded.tokens, distinct_words = distinct_words + excluded.distinct_words",
+                    [(lang, tag, count, new_words[tag]) for tag, count in tag_tokens.items()],
+                )
+                if kind == "verify-loop":
+                    self._record_attempts(db, lang, sentences)
+                db.executemany(
+                    "INSERT INTO run_totals VALUES (?, ?, ?, 1, ?, ?, ?) ON CONFLICT (day, language, kind) DO UPDATE SET"
+                    " runs = runs + 1, successes = successes + excluded.successes,"
+                    " sentences = sentences + excluded.sentences, valid_sentences = valid_sentences + excluded.valid_sentences",
+                    [(bucket, lang, kind, int(bool(success)), len(sentences), valid_count) for bucket in (day, _ALL_TIME)],
+                )
+                db.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'stored_runs'")
+            self.runs_recorded += 1
+            self.stored_runs += 1
+            due = now - self._last_compaction >= self.compact_interval
+        if due:
+            self.compact()
+        return run_id
+
+    @staticmethod
+    def _record_attempts(db: sqlite3.Connection, language: str, sentences: List[StoredSentence]) -> None:
+        attempts: Counter = Counter()
+        valid: Counter = Counter()
+        for attempt, _, result in sentences:
+            attempts[attempt] += 1
+            valid[attempt] += int(result.valid)
+        first = min((attempt for attempt, _, result in sentences if result.valid), default=None)
+        db.executemany(
+            "INSERT INTO attempt_outcomes VALUES (?, ?, ?, ?, ?) ON CONFLICT (language, attempt_number) DO UPDATE SET"
+            " attempts = attempts + excluded.attempts, valid = valid + excluded.valid,"
+            " first_success = first_success + excluded.first_success",
+            [(language, attempt, count, valid[attempt], int(attempt == first)) for attempt, count in attempts.items()],
+        )
+
+    def compact(self) -> int:
+        """Delete runs past the retention age or count, then shrink the file. Returns runs deleted."""
+        if self._db is None:
+            return 0
+        with self._lock:
+            db = self._db
+            with db:
+                deleted = 0
+                if self.retention_days > 0:
+                    cutoff = time.time() - self.retention_days * 86400
+                    deleted += db.execute("DELETE FROM runs WHERE created < ?", (cutoff,)).rowcount
+                excess = self.stored_runs - deleted - self.max_runs
+                if self.max_runs > 0 and excess > 0:
+                    deleted += db.execute(
+                        "DELETE FROM runs WHERE id IN (SELECT id FROM runs ORDER BY id LIMIT ?)", (excess,),
+                    ).rowcount
+                if deleted:
+                    # Runs are deleted oldest first, so their sentences are a prefix too
+                    db.execute(
+                        "DELETE FROM run_sentences WHERE run_id < (SELECT COALESCE(MIN(id), 1 << 62) FROM runs)"
+                    )
+                    db.execute("UPDATE store_meta SET value = value - ? WHERE key = 'stored_runs'", (deleted,))
+            if deleted:
+                db.execute("PRAGMA incremental_vacuum")
+                db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.compactions += 1
+            self.runs_deleted += deleted
+            self.stored_runs -= deleted
+            self._last_compaction = time.time()
+        return deleted
+
+    def rule_usage(self, language: str) -> List[dict]:
+        """Usage of every rule ever applied in this language, most used first."""
+        return self._rows(
+            "SELECT number, rule, uses, sentences, last_used FROM rule_usage"
+            " WHERE language = ? ORDER BY uses DESC, number",
+            (language.lower(),),
+        )
+
+    def tag_coverage(self, language: str) -> List[dict]:
+        return self._rows(
+            "SELECT tag, tokens, distinct_words FROM tag_coverage WHERE language = ? ORDER BY tag",
+            (language.lower(),),
+        )
+
+    def attempt_outcomes(self, language: str) -> List[dict]:
+        return self._rows(
+            "SELECT attempt_number, attempts, valid, first_success FROM attempt_outcomes"
+            " WHERE language = ? ORDER BY attempt_number",
+            (language.lower(),),
+        )
+
+    def totals(self, language: str, days: Optional[int] = None) -> List[dict]:
+        """Run totals per kind: all-time, or summed over the last ``days`` UTC days."""
+        if days is None:
+            where, params = "day = ?", (_ALL_TIME,)
+        else:
+            since = time.strftime("%Y-%m-%d", time.gmtime(time.time() - (days - 1) * 86400))
+            # '*' sorts before digits, so the all-time rows are never in range
+            where, params = "day >= ?", (since,)
+        return self._rows(
+            "SELECT kind, SUM(runs) AS runs, SUM(successes) AS successes, SUM(sentences) AS sentences,"
+            f" SUM(valid_sentences) AS valid_sentences FROM run_totals WHERE {where} AND language = ?"
+            " GROUP BY kind ORDER BY kind",
+            params + (language.lower(),),
+        )
+
+    def _rows(self, sql: str, params: tuple) -> List[dict]:
+        if self._db is None:
+            return []
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def clear(self) -> None:
+        if self._db is None:
+            return
+        with self._lock, self._db:
+            for table in ("runs", "run_sentences", "rule_usage", "tag_coverage", "seen_words",
+                          "attempt_outcomes", "run_totals"):
+                self._db.execute(f"DELETE FROM {table}")
+            self._db.execute("UPDATE store_meta SET value = 0 WHERE key = 'stored_runs'")
+            self.stored_runs = 0
+
+    def stats(self) -> dict:
+        """Counters only: never touches the database, so it can't wait on a compaction."""
+        stats = {
+            "enabled": self.enabled,
+            "runs_recorded": self.runs_recorded,
+            "write_errors": self.write_errors,
+            "compactions": self.compactions,
+            "runs_deleted": self.runs_deleted,
+            "retention_days": self.retention_days,
+            "max_runs": self.max_runs,
+        }
+        if self._db is not None:
+            stats["stored_runs"] = self.stored_runs
+            stats["db_bytes"] = sum(
+                os.path.getsize(path)
+                for path in (self._db_path, f"{self._db_path}-wal")
+                if os.path.exists(path)
+            )
+        return stats
+
+
+store = RunStore(
+    db_path=os.environ.get("RUN_STORE_DB") or None,
+    retention_days=float(os.environ.get("RUN_STORE_RETENTION_DAYS", "30")),
+    max_runs=int(os.environ.get("RUN_STORE_MAX_RUNS", "100000")),
+    compact_interval=float(os.environ.get("RUN_STORE_COMPACT_INTERVAL", "3600")),
+)
+
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole * 100, 1) if whole else 0.0
+
+
+def rule_report(language: str) -> RuleUsageReport:
+    """Usage of every rule, and the current grammar's rules that were never used."""
+    rows = store.rule_usage(language)
+    used = {row["rule"] for row in rows}
+    snapshot = get_snapshot(language)
+    unused = [
+        RuleApplied(number=number, rule=rule)
+        for number, lhs, rhs, _ in (snapshot.rules if snapshot is not None else [])
+        if (rule := f"{lhs} -> {' '.join(rhs)}") not in used
+    ]
+    return RuleUsageReport(language=language, rules=[RuleUsage(**row) for row in rows], unused=unused)
+
+
+def tag_report(language: str) -> List[TagCoverage]:
+    """Per tag: tokens seen, and how many of the lexicon's words for it have appeared."""
+    analysis = get_analysis(language)
+    lexicon = {tag: len(words) for tag, words in analysis.tag_words.items()} if analysis is not None else {}
+    rows = {row["tag"]: row for row in store.tag_coverage(language)}
+    return [
+        TagCoverage(
+            tag=tag,
+            tokens=rows.get(tag, {}).get("tokens", 0),
+            distinct_words=rows.get(tag, {}).get("distinct_words", 0),
+            lexicon_words=lexicon.get(tag, 0),
+            coverage_percentage=_rate(rows.get(tag, {}).get("distinct_words", 0), lexicon.get(tag, 0)),
+        )
+        for tag in sorted(set(rows) | set(lexicon))
+    ]
+
+
+def attempt_report(language: str) -> List[AttemptOutcome]:
+    """Verify-loop success by attempt number, and cumulatively by that attempt."""
+    runs = sum(row["runs"] for row in store.totals(language) if row["kind"] == "verify-loop")
+    outcomes = []
+    succeeded = 0
+    for row in store.attempt_outcomes(language):
+        succeeded += row["first_success"]
+        outcomes.append(AttemptOutcome(
+            **row,
+            success_rate=_rate(row["valid"], row["attempts"]),
+            cumulative_success_rate=_rate(succeeded, runs),
+        ))
+    return outcomes
+
+
+def run_summary(language: str, days: int = 7) -> RunSummary:
+    def totals(rows: List[dict]) -> List[RunTotals]:
+        return [
+            RunTotals(
+                **row,
+                success_rate=_rate(row["successes"], row["runs"]) if row["kind"] == "verify-loop" else None,
+                validity_rate=_rate(row["valid_sentences"], row["sentences"]),
+            )
+            for row in rows
+        ]
+
+    return RunSummary(
+        language=language,
+        days=days,
+        recent=totals(store.totals(language, days)),
+        all_time=totals(store.totals(language)),
+        store=store.stats(),
+    )
+
+
+@metrics.collector
+def _collect_metrics():
+    return metrics.stats_samples("grammar_oracle_run_store", "Run store", [({}, store.stats())])
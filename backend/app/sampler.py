@@ -0,0 +1,585 @@
+"""Random sentences from the grammar: corpora, coverage sets, near-misses, offline LLM.
+
+``SentenceSampler`` expands the start symbol top-down, choosing rules by
+weight among those that still fit the length budget (each symbol's shortest
+yield is precomputed), so every sentence is in the grammar and within
+``max_len`` by construction. Words are drawn uniformly from the lexicon
+entries carrying the chosen tag.
+
+``coverage()`` builds one sentence per rule and per tag not yet covered,
+reaching each from the start symbol by its cheapest context, so every
+reachable rule number and lexicon tag appears at least once. ``near_miss``
+perturbs a single token (substitute, delete, duplicate or swap) and keeps
+the result only if the Earley chart rejects it.
+
+``SamplerClient`` answers the three requests ``llm_client`` makes with
+sampled text, so ``LLM_PROVIDER=sampler`` runs the whole stack offline.
+
+    python -m app.sampler -n 1000000 --min-len 3 --max-len 12 > corpus.txt
+    python -m app.sampler --coverage --format jsonl
+    python -m app.sampler -n 1000 --near-miss 0.5 --format jsonl
+"""
+
+from __future__ import annotations
+import argparse
+import bisect
+import functools
+import hashlib
+import json
+import random
+import re
+import sys
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from .earley import Chart, _load
+from .grammar_files import available_languages
+from .grammar_registry import MAX_LOADED_PACKS, get_snapshot
+from .grammar_snapshot import GrammarSnapshot
+from .lexicon_index import LexiconIndex
+
+INF = float("inf")
+# Distinct requests whose repeat count SamplerClient remembers, least recent dropped first
+MAX_TRACKED_REQUESTS = 10_000
+# Redraws allowed for a sentence of at least min_len words before giving up
+MAX_SAMPLE_ATTEMPTS = 10_000
+NEAR_MISS_OPERATIONS = ("substitute", "delete", "duplicate", "swap")
+
+
+class Sample(NamedTuple):
+    words: List[str]
+    rules: List[int]   # rule numbers in derivation order
+    tags: List[str]    # one tag per word
+
+    @property
+    def sentence(self) -> str:
+        return " ".join(self.words)
+
+
+class NearMiss(NamedTuple):
+    sentence: str
+    source: str        # the valid sentence it was derived from
+    operation: str
+    position: int
+
+
+class CoverageReport(NamedTuple):
+    rules_covered: List[int]
+    tags_covered: List[str]
+    # Rules that can't appear in any sentence: unreachable from the start, or unproductive
+    rules_unusable: List[int]
+    # Lexicon tags the grammar never uses as a terminal
+    tags_unusable: List[str]
+
+
+class SamplerTables:
+    """Integer tables compiled once per grammar version."""
+
+    def __init__(self, snapshot: GrammarSnapshot, lexicon: LexiconIndex):
+        self.language = snapshot.language
+        self.source_hash = snapshot.source_hash
+
+        lhs_symbols = {lhs for _, lhs, _, _ in snapshot.rules}
+        by_tag: Dict[str, List[str]] = {}
+        for word in sorted(lexicon):
+            for tag in lexicon.tags(word):
+                by_tag.setdefault(tag, []).append(word)
+        self.lexicon_tags = sorted(by_tag)
+
+        names = sorted(lhs_symbols | set(by_tag) | {s for _, _, rhs, _ in snapshot.rules for s in rhs})
+        self.names = names
+        ids = {name: i for i, name in enumerate(names)}
+        self.start = ids[snapshot.start]
+        # Terminals are symbols with no rules; tags with no words can't be produced
+        self.words: List[Optional[List[str]]] = [
+            None if name in lhs_symbols else by_tag.get(name, []) for name in names
+        ]
+        self.rule_numbers = [number for number, _, _, _ in snapshot.rules]
+        self.rule_lhs = [ids[lhs] for _, lhs, _, _ in snapshot.rules]
+        self.rule_rhs = [tuple(ids[s] for s in rhs) for _, _, rhs, _ in snapshot.rules]
+
+        # Shortest yield of each symbol (INF if it derives no sentence)
+        min_len = [INF if w is None or not w else 1 for w in self.words]
+        changed = True
+        while changed:
+            changed = False
+            for lhs, rhs in zip(self.rule_lhs, self.rule_rhs):
+                length = sum(min_len[s] for s in rhs)
+                if length < min_len[lhs]:
+                    min_len[lhs] = length
+                    changed = True
+        self.min_len = min_len
+        self.rule_min = [sum(min_len[s] for s in rhs) for rhs in self.rule_rhs]
+
+        # Cheapest context for each symbol: words needed around it in a full sentence,
+        # and the (rule, position) that reaches it from its parent
+        context = [INF] * len(names)
+        context[self.start] = 0
+        parent: List[Optional[Tuple[int, int]]] = [None] * len(names)
+        changed = True
+        while changed:
+            changed = False
+            for r, (lhs, rhs) in enumerate(zip(self.rule_lhs, self.rule_rhs)):
+                if context[lhs] == INF or self.rule_min[r] == INF:
+                    continue
+                for position, symbol in enumerate(rhs):
+                    cost = context[lhs] + self.rule_min[r] - min_len[symbol]
+                    if cost < context[symbol]:
+                        context[symbol] = cost
+                        parent[symbol] = (r, position)
+                        changed = True
+        self.context = context
+        self.parent = parent
+
+
+@functools.lru_cache(maxsize=MAX_LOADED_PACKS)
+def _tables_version(language: str, source_hash: str, snapshot: GrammarSnapshot) -> SamplerTables:
+    _, lexicon = _load(language)
+    return SamplerTables(snapshot, lexicon)
+
+
+def get_tables(language: str) -> SamplerTables:
+    snapshot = get_snapshot(language)
+    if snapshot is None:
+        raise ValueError(f"Unknown language: {language.upper()}")
+    return _tables_version(snapshot.language, snapshot.source_hash, snapshot)
+
+
+class SentenceSampler:
+    """Samples sentences of one language's grammar.
+
+    ``weights`` maps rule numbers to relative weights (default 1.0 each).
+    Sentences shorter than ``min_len`` are redrawn, up to
+    ``MAX_SAMPLE_ATTEMPTS`` times; ``max_len`` is never exceeded. ``seed``
+    makes the sequence reproducible.
+    """
+
+    def __init__(self, language: str = "spanish", min_len: int = 1, max_len: int = 12,
+                 weights: Optional[Dict[int, float]] = None, seed: Optional[int] = None):
+        self.language = language.lower()
+        self.tables = t = get_tables(language)
+        if max_len < t.min_len[t.start]:
+            raise ValueError(f"max_len {max_len} is below the shortest sentence ({t.min_len[t.start]} words)")
+        if min_len > max_len:
+            raise ValueError("min_len is greater than max_len")
+        self.min_len = min_len
+        self.max_len = max_len
+        self.rng = random.Random(seed)
+        weights = weights or {}
+
+        # Per symbol: productive rules sorted by shortest yield, so the rules fitting a
+        # budget are a prefix found by bisect, with cumulative weights over that order
+        self._mins: List[List[float]] = []
+        self._cum: List[List[float]] = []
+        self._rules: List[List[int]] = []
+        for symbol in range(len(t.names)):
+            rules = sorted(
+                (r for r, lhs in enumerate(t.rule_lhs)
+                 if lhs == symbol and t.rule_min[r] < INF and weights.get(t.rule_numbers[r], 1.0) > 0),
+                key=lambda r: t.rule_min[r],
+            )
+            cum, total = [], 0.0
+            for r in rules:
+                total += weights.get(t.rule_numbers[r], 1.0)
+                cum.append(total)
+            self._mins.append([t.rule_min[r] for r in rules])
+            self._cum.append(cum)
+            self._rules.append(rules)
+        self._reversed_rhs = [tuple(reversed(rhs)) for rhs in t.rule_rhs]
+        self._grammar = None
+
+    # --- Sampling -----------------------------------------------------------------
+
+    def _expand(self, symbol: int, budget: float, words: List[str],
+                rules: Optional[List[int]], tags: Optional[List[int]]) -> None:
+        t = self.tables
+        vocabulary = t.words[symbol]
+        if vocabulary is not None:
+            words.append(vocabulary[int(self.rng.random() * len(vocabulary))])
+            if tags is not None:
+                tags.append(symbol)
+            return
+        mins = self._mins[symbol]
+        fitting = bisect.bisect_right(mins, budget)
+        cum = self._cum[symbol]
+        rule = self._rules[symbol][bisect.bisect_right(cum, self.rng.random() * cum[fitting - 1], 0, fitting - 1)]
+        self._apply(rule, budget, words, rules, tags)
+
+    def _apply(self, rule: int, budget: float, words: List[str],
+               rules: Optional[List[int]], tags: Optional[List[int]],
+               forced: Optional[Tuple[int, int, Callable[[float], None]]] = None) -> None:
+        """Expand ``rule``'s right-hand side within ``budget`` words.
+
+        ``forced`` is (position, length, expand): the child at ``position``
+        needs ``length`` words and is expanded by ``expand(budget)``.
+        """
+        t = self.tables
+        if rules is not None:
+            rules.append(t.rule_numbers[rule])
+        reserved = list(map(t.min_len.__getitem__, t.rule_rhs[rule]))
+        if forced is not None:
+            reserved[forced[0]] = forced[1]
+        rest = sum(reserved)
+        for position, symbol in enumerate(t.rule_rhs[rule]):
+            rest -= reserved[position]
+            before = len(words)
+            if forced is not None and forced[0] == position:
+                forced[2](budget - rest)
+            else:
+                self._expand(symbol, budget - rest, words, rules, tags)
+            budget -= len(words) - before
+
+    def _generate(self, rules: Optional[List[int]], tags: Optional[List[int]]) -> List[str]:
+        """One derivation from the start symbol, depth-first with an explicit stack.
+
+        ``slack`` is how many words the sentence can still grow by beyond the
+        shortest yield of everything pending, so a symbol's budget is its own
+        shortest yield plus the slack, as in ``_expand``.
+        """
+        t = self.tables
+        vocabularies, min_len, rule_min, numbers = t.words, t.min_len, t.rule_min, t.rule_numbers
+        reversed_rhs, all_mins, all_cum, all_rules = self._reversed_rhs, self._mins, self._cum, self._rules
+        rand, bisect_right = self.rng.random, bisect.bisect_right
+        words: List[str] = []
+        stack = [t.start]
+        slack = self.max_len - min_len[t.start]
+        while stack:
+            symbol = stack.pop()
+            vocabulary = vocabularies[symbol]
+            if vocabulary is not None:
+                words.append(vocabulary[int(rand() * len(vocabulary))])
+                if tags is not None:
+                    tags.append(symbol)
+                continue
+            shortest = min_len[symbol]
+            fitting = bisect_right(all_mins[symbol], shortest + slack)
+            cum = all_cum[symbol]
+            rule = all_rules[symbol][bisect_right(cum, rand() * cum[fitting - 1], 0, fitting - 1)]
+            slack -= rule_min[rule] - shortest
+            stack.extend(reversed_rhs[rule])
+            if rules is not None:
+                rules.append(numbers[rule])
+        return words
+
+    def _too_short(self) -> ValueError:
+        return ValueError(
+            f"No {self.language} sentence of at least {self.min_len} words "
+            f"in {MAX_SAMPLE_ATTEMPTS} attempts; min_len may be unreachable"
+        )
+
+    def sample(self) -> str:
+        """One sentence, as space-separated words."""
+        for _ in range(MAX_SAMPLE_ATTEMPTS):
+            words = self._generate(None, None)
+            if len(words) >= self.min_len:
+                return " ".join(words)
+        raise self._too_short()
+
+    def sample_detailed(self) -> Sample:
+        """One sentence with the rule numbers and tags used to build it."""
+        for _ in range(MAX_SAMPLE_ATTEMPTS):
+            rules: List[int] = []
+            tags: List[int] = []
+            words = self._generate(rules, tags)
+            if len(words) >= self.min_len:
+                return Sample(words, rules, [self.tables.names[t] for t in tags])
+        raise self._too_short()
+
+    def sentences(self, n: int) -> Iterator[str]:
+        sample = self.sample
+        for _ in range(n):
+            yield sample()
+
+    # --- Coverage -------------------------------------------------------------------
+
+    def _forced(self, symbol: int, length: int, finish) -> Sample:
+        """A sentence deriving ``symbol`` through its cheapest context; ``finish`` expands it.
+
+        ``length`` is the fewest words ``finish`` can produce. Along the chain
+        a symbol's subtree needs ``total - context[symbol]`` words, which is
+        reserved before its siblings are sampled.
+        """
+        t = self.tables
+        chain: List[Tuple[int, int]] = []
+        node = symbol
+        while node != t.start:
+            rule, position = t.parent[node]
+            chain.append((rule, position))
+            node = t.rule_lhs[rule]
+        chain.reverse()
+
+        words: List[str] = []
+        rules: List[int] = []
+        tags: List[int] = []
+        # Coverage wins over max_len when a rule's cheapest context is longer
+        total = t.context[symbol] + length
+        budget = max(self.max_len, total)
+
+        def descend(depth: int, budget: float) -> None:
+            if depth == len(chain):
+                finish(budget, words, rules, tags)
+                return
+            rule, position = chain[depth]
+            child = t.rule_rhs[rule][position]
+            self._apply(rule, budget, words, rules, tags,
+                        forced=(position, total - t.context[child], lambda b: descend(depth + 1, b)))
+
+        descend(0, budget)
+        return Sample(words, rules, [t.names[s] for s in tags])
+
+    def coverage(self) -> Tuple[List[Sample], CoverageReport]:
+        """Sentences that together use every usable rule number and lexicon tag."""
+        t = self.tables
+        samples: List[Sample] = []
+        rules_covered: Set[int] = set()
+        tags_covered: Set[str] = set()
+        unusable: List[int] = []
+
+        def keep(sample: Sample) -> None:
+            samples.append(sample)
+            rules_covered.update(sample.rules)
+            tags_covered.update(sample.tags)
+
+        for r, number in enumerate(t.rule_numbers):
+            if number in rules_covered:
+                continue
+            lhs = t.rule_lhs[r]
+            if t.context[lhs] == INF or t.rule_min[r] == INF:
+                unusable.append(number)
+                continue
+            keep(self._forced(lhs, t.rule_min[r], lambda budget, words, rules, tags, r=r:
+                              self._apply(r, budget, words, rules, tags)))
+
+        terminals = {t.names[s]: s for s, w in enumerate(t.words) if w}
+        for tag in t.lexicon_tags:
+            symbol = terminals.get(tag)
+            if tag in tags_covered or symbol is None or t.context[symbol] == INF:
+                continue
+            keep(self._forced(symbol, 1, lambda budget, words, rules, tags, s=symbol:
+                              self._expand(s, budget, words, rules, tags)))
+
+        report = CoverageReport(
+            rules_covered=sorted(rules_covered),
+            tags_covered=sorted(tags_covered),
+            rules_unusable=unusable,
+            tags_unusable=[tag for tag in t.lexicon_tags if tag not in tags_covered],
+        )
+        return samples, report
+
+    # --- Near-misses ----------------------------------------------------------------
+
+    def accepts(self, words: List[str]) -> bool:
+        if self._grammar is None:
+            self._grammar = _load(self.language)
+        chart = Chart(*self._grammar, lookahead=words)
+        for word in words:
+            chart.push(word)
+        return chart.accepts()
+
+    def near_miss(self, sample: Optional[Sample] = None, attempts: int = 20) -> Optional[NearMiss]:
+        """Perturb one token of a valid sentence until the grammar rejects it.
+
+        Substituted words come from the lexicon, so a near-miss fails on
+        structure rather than on an unknown word. Returns None if every
+        attempt still parsed.
+        """
+        sample = sample or self.sample_detailed()
+        words, tags = sample.words, sample.tags
+        t = self.tables
+        for _ in range(attempts):
+            operation = self.rng.choice(NEAR_MISS_OPERATIONS)
+            position = self.rng.randrange(len(words))
+            changed = list(words)
+            if operation == "substitute":
+                other = [tag for tag in t.lexicon_tags if tag != tags[position]]
+                vocabulary = t.words[t.names.index(self.rng.choice(other))] or []
+                if not vocabulary:
+                    continue
+                changed[position] = self.rng.choice(vocabulary)
+            elif operation == "delete":
+                if len(words) < 2:
+                    continue
+                del changed[position]
+            elif operation == "duplicate":
+                changed.insert(position, words[position])
+            else:
+                if len(words) < 2:
+                    continue
+                position = min(position, len(words) - 2)
+                changed[position], changed[position + 1] = changed[position + 1], changed[position]
+                if changed == words:
+                    continue
+            if not self.accepts(changed):
+                return NearMiss(" ".join(changed), sample.sentence, operation, position)
+        return None
+
+
+# --- Offline stand-in for the Anthropic client ------------------------------------
+
+_PARENTHETICAL = re.compile(r"\s*\([^)]*\)")
+
+
+class SamplerClient:
+    """Answers llm_client's requests from the grammar instead of Claude.
+
+    ``kinds`` maps each system prompt to "sentence", "paragraph" or
+    "translation". Replies are seeded by the request, so the same request
+    always gets the same reply for its nth repeat (parallel verify-loop
+    candidates send identical requests). A share of sentences
+    (``invalid_rate``) are near-misses, so the verify loop still sees
+    failures to retry on.
+    """
+
+    def __init__(self, kinds: Dict[str, str], invalid_rate: float = 0.3):
+        self.kinds = kinds
+        self.invalid_rate = invalid_rate
+        self.messages = self
+        # Request digest -> times seen, as an LRU of MAX_TRACKED_REQUESTS
+        self._repeats: "OrderedDict[bytes, int]" = OrderedDict()
+
+    def _language(self, request: dict) -> str:
+        text = request["messages"][0]["content"].lower()
+        for language in available_languages():
+            if re.search(rf"\b{language}\b", text):
+                return language
+        return "spanish"
+
+    def _sentence(self, sampler: SentenceSampler) -> str:
+        if sampler.rng.random() < self.invalid_rate:
+            miss = sampler.near_miss()
+            if miss is not None:
+                return miss.sentence
+        return sampler.sample()
+
+    def reply(self, request: dict) -> str:
+        system = request["system"]
+        if isinstance(system, list):
+            system = "".join(block["text"] for block in system)
+        kind = self.kinds.get(system, "sentence")
+        raw = json.dumps(request["messages"], sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(raw.encode("utf-8")).digest()
+        repeat = self._repeats.pop(digest, -1) + 1
+        self._repeats[digest] = repeat
+        if len(self._repeats) > MAX_TRACKED_REQUESTS:
+            self._repeats.popitem(last=False)
+        raw += f"\0{repeat}"
+        seed = int.from_bytes(hashlib.sha256(raw.encode("utf-8")).digest()[:8], "big")
+
+        if kind == "translation":
+            lexicon = _load(self._language(request))[1]
+            lines = request["messages"][-1]["content"].split("\n")[1:]
+            out = []
+            for line in lines:
+                number, _, text = line.partition(". ")
+                glosses = [_PARENTHETICAL.sub("", lexicon[w].translation) if w in lexicon else w
+                           for w in re.findall(r"\w+", text.lower())]
+                out.append(f"{number}. {' '.join(g for g in glosses if g)}")
+            return "\n".join(out)
+
+        sampler = SentenceSampler(self._language(request), min_len=3, max_len=10, seed=seed)
+        if kind == "paragraph":
+            count = sampler.rng.randint(4, 6)
+            sentences = [self._sentence(sampler) for _ in range(count)]
+            return " ".join(s[0].upper() + s[1:] + "." for s in sentences)
+        return self._sentence(sampler)
+
+    def _message(self, text: str) -> SimpleNamespace:
+        usage = SimpleNamespace(input_tokens=0, output_tokens=0,
+                                cache_creation_input_tokens=0, cache_read_input_tokens=0)
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=usage, stop_reason="end_turn")
+
+    async def create(self, **request) -> SimpleNamespace:
+        return self._message(self.reply(request))
+
+    def stream(self, **request) -> "_SamplerStream":
+        return _SamplerStream(self, request)
+
+    async def close(self) -> None:
+        pass
+
+
+class _SamplerStream:
+    def __init__(self, client: SamplerClient, request: dict):
+        self.client = client
+        self.text = client.reply(request)
+        self.text_stream = self._words()
+
+    async def _words(self):
+        for i, word in enumerate(self.text.split(" ")):
+            yield word if i == 0 else " " + word
+
+    async def __aenter__(self) -> "_SamplerStream":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    @property
+    def current_message_snapshot(self) -> SimpleNamespace:
+        return self.client._message(self.text)
+
+    async def get_final_message(self) -> SimpleNamespace:
+        return self.client._message(self.text)
+
+
+# --- CLI ----------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Sample sentences from a grammar.")
+    parser.add_argument("-n", type=int, default=10, help="Sentences to sample")
+    parser.add_argument("--language", default="spanish")
+    parser.add_argument("--min-len", type=int, default=1)
+    parser.add_argument("--max-len", type=int, default=12)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--weights", help="JSON file mapping rule numbers to weights")
+    parser.add_argument("--coverage", action="store_true", help="Emit a set covering every rule and tag")
+    parser.add_argument("--near-miss", type=float, default=0.0, metavar="RATE",
+                        help="Share of output replaced by single-token near-misses")
+    parser.add_argument("--format", choices=["text", "jsonl"], default="text")
+    args = parser.parse_args(argv)
+
+    weights = None
+    if args.weights:
+        with open(args.weights) as f:
+            weights = {int(k): float(v) for k, v in json.load(f).items()}
+    sampler = SentenceSampler(args.language, args.min_len, args.max_len, weights, args.seed)
+    out = sys.stdout
+    started = time.perf_counter()
+
+    if args.coverage:
+        samples, report = sampler.coverage()
+        for sample in samples:
+            if args.format == "jsonl":
+                out.write(json.dumps({"sentence": sample.sentence, "valid": True,
+                                      "rules": sample.rules, "tags": sample.tags}, ensure_ascii=False) + "\n")
+            else:
+                out.write(sample.sentence + "\n")
+        print(json.dumps(report._asdict()), file=sys.stderr)
+        return
+
+    if args.format == "text" and not args.near_miss:
+        # Fast path: no per-sentence bookkeeping
+        write = out.write
+        for sentence in sampler.sentences(args.n):
+            write(sentence + "\n")
+    else:
+        for _ in range(args.n):
+            sample = sampler.sample_detailed()
+            miss = sampler.near_miss(sample) if sampler.rng.random() < args.near_miss else None
+            if args.format == "text":
+                out.write((miss.sentence if miss else sample.sentence) + "\n")
+            elif miss:
+                out.write(json.dumps({"sentence": miss.sentence, "valid": False, "source": miss.source,
+                                      "operation": miss.operation, "position": miss.position},
+                                     ensure_ascii=False) + "\n")
+            else:
+                out.write(json.dumps({"sentence": sample.sentence, "valid": True,
+                                      "rules": sample.rules, "tags": sample.tags}, ensure_ascii=False) + "\n")
+    elapsed = time.perf_counter() - started
+    print(f"{args.n} sentences in {elapsed:.2f}s ({args.n / elapsed:,.0f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""Server-Sent Events framing for streaming endpoints."""
+
+import json
+from typing import Union
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stop nginx-style proxies from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_event(event: str, data: Union[str, dict]) -> str:
+    """Frame one event. ``data`` is pre-serialized JSON or a dict to serialize."""
+    if not isinstance(data, str):
+        data = json.dumps(data, ensure_ascii=False)
+    # JSON never contains raw newlines, so the payload fits on one data: line
+    return f"event: {event}\ndata: {data}\n\n"
@@ -1,68 +1,247 @@
 """Verifier loop: generate sentence via LLM, validate via CFG parser, retry on failure."""
 
-from typing import List, Dict
+import asyncio
+import math
+import re
+import time
+from typing import AsyncIterator, List, Dict, Tuple
+from . import metrics
+from .live import LiveSession
 from .models import ParseResult, VerifyAttempt, VerifyLoopResponse, ClaudeMessage
-from .parser_client import parse_sentence
-from .llm_client import generate_sentence
+from .parser_client import parse_sentence_async
+from .llm_client import GenerateResult, SentenceStream, clean_sentence, generate_sentence
+from .llm_telemetry import CallLog, track
 from .constraint_formatter import format_constraint_feedback
+from .grammar_analysis import get_analysis
+from .run_store import store as run_store
+from .sse import format_event
 
 
-def run_verify_loop(prompt: str, language: str, max_retries: int = 3) -> VerifyLoopResponse:
-    """Run the generate -> validate -> feedback loop."""
-    attempts: List[VerifyAttempt] = []
-    previous_attempts: List[Dict[str, str]] = []
+# Everything up to the last whitespace: the words Claude has finished
+_FINISHED_WORDS = re.compile(r"^.*\s", re.DOTALL)
+
+
+class _GenerationBaseline:
+    """Running means over complete, live sentence streams, used to price aborted ones."""
+
+    def __init__(self):
+        self.count = 0
+        self.tokens = 0
+        self.chars = 0
+        self.ms = 0.0
+
+    def add(self, tokens: int, chars: int, ms: float) -> None:
+        self.count += 1
+        self.tokens += tokens
+        self.chars += chars
+        self.ms += ms
+
+    def chars_per_token(self) -> float:
+        return self.chars / self.tokens if self.tokens else 4.0
+
+
+_baseline = _GenerationBaseline()
 
-    for attempt_num in range(1, max_retries + 1):
-        gen_result = generate_sentence(
-            prompt=prompt,
-            language=language,
+
+class VerifyLoop:
+    """One run of the generate -> validate -> feedback loop.
+
+    Each round asks for ``candidates`` sentences in parallel, all built from the
+    same conversation, and validates each as soon as it arrives. The first
+    valid candidate ends the loop and cancels the rest of its round. Otherwise
+    every failure in the round is fed back before the next one. With
+    ``candidates=1`` this is the original one-sentence-per-round loop.
+
+    Only the first candidate of a round may be served from the LLM cache;
+    the others would otherwise get the very same cached sentence.
+
+    With ``early_abort`` each sentence is streamed and every finished word is
+    fed to an incremental Earley chart. Generation stops at the first word
+    the grammar can't take, and that prefix is the attempt's sentence; its
+    failure is the same one the full sentence would have reported.
+    """
+
+    def __init__(self, prompt: str, language: str, max_retries: int = 3, candidates: int = 1,
+                 use_cache: bool = True, early_abort: bool = False):
+        self.prompt = prompt
+        self.language = language
+        self.max_retries = max_retries
+        self.candidates = max(1, candidates)
+        self.use_cache = use_cache
+        self.early_abort = early_abort
+        self.attempts: List[VerifyAttempt] = []
+        self.rounds = 0
+        self.llm_calls = 0
+        self.llm_log = CallLog()
+        self._started = time.perf_counter()
+
+    async def _candidate(self, previous_attempts: List[Dict[str, str]],
+                         candidate_number: int) -> Tuple[GenerateResult, ParseResult, dict]:
+        self.llm_calls += 1
+        use_cache = self.use_cache and candidate_number == 1
+        if self.early_abort:
+            return await self._streamed_candidate(previous_attempts, use_cache)
+        started = time.perf_counter()
+        gen_result = await generate_sentence(
+            prompt=self.prompt,
+            language=self.language,
             previous_attempts=previous_attempts if previous_attempts else None,
+            use_cache=use_cache,
         )
+        generation_ms = round((time.perf_counter() - started) * 1000, 2)
+        result = await parse_sentence_async(sentence=gen_result.sentence, language=self.language)
+        return gen_result, result, {"generation_ms": generation_ms}
+
+    async def _streamed_candidate(self, previous_attempts: List[Dict[str, str]],
+                                  use_cache: bool) -> Tuple[GenerateResult, ParseResult, dict]:
+        stream = SentenceStream(self.prompt, self.language, previous_attempts or None, use_cache)
+        session = LiveSession(self.language)
+        started = time.perf_counter()
+        text = ""
+        dead_end = None
+        try:
+            async for delta in stream:
+                text += delta
+                finished = _FINISHED_WORDS.match(text)
+                if stream.cached or finished is None:
+                    continue
+                update = session.update(finished.group())
+                if not update.viable:
+                    dead_end = update
+                    break
+        finally:
+            await stream.aclose()
+        generation_ms = round((time.perf_counter() - started) * 1000, 2)
 
-        result = parse_sentence(sentence=gen_result.sentence, language=language)
-
-        claude_messages = [
-            ClaudeMessage(role=m["role"], content=m["content"])
-            for m in gen_result.messages
-        ]
-
-        if result.valid:
-            attempts.append(VerifyAttempt(
-                attempt_number=attempt_num,
-                sentence=gen_result.sentence,
-                result=result,
-                constraint_feedback=None,
-                system_prompt=gen_result.system_prompt,
-                claude_messages=claude_messages,
-            ))
-            return VerifyLoopResponse(
-                prompt=prompt,
-                language=language,
-                attempts=attempts,
-                final_result=result,
-                success=True,
-                total_attempts=attempt_num,
-            )
-
-        feedback = format_constraint_feedback(result)
-        attempts.append(VerifyAttempt(
-            attempt_number=attempt_num,
+        if dead_end is None:
+            sentence = clean_sentence(text)
+            result = await parse_sentence_async(sentence=sentence, language=self.language)
+            if not stream.cached:
+                _baseline.add(stream.output_tokens, len(text), generation_ms)
+            stats = {"generation_ms": generation_ms, "output_tokens": stream.output_tokens,
+                     "tokens_saved": 0, "latency_saved_ms": 0.0}
+            return stream.result(sentence), result, stats
+
+        sentence = " ".join(dead_end.words[:dead_end.position + 1])
+        result = session.update(sentence, final=True).result
+        output_tokens = math.ceil(len(text) / _baseline.chars_per_token())
+        stats = {"generation_ms": generation_ms, "aborted_at": dead_end.position,
+                 "output_tokens": output_tokens}
+        if _baseline.count:
+            stats["tokens_saved"] = max(0, round(_baseline.tokens / _baseline.count - output_tokens))
+            stats["latency_saved_ms"] = max(0.0, round(_baseline.ms / _baseline.count - generation_ms, 2))
+            metrics.VERIFY_LOOP_TOKENS_SAVED.inc(self.language.lower(), amount=stats["tokens_saved"])
+        metrics.VERIFY_LOOP_ABORTS.inc(self.language.lower())
+        return stream.result(sentence), result, stats
+
+    async def run(self) -> AsyncIterator[VerifyAttempt]:
+        """Yield each attempt as soon as it is generated, parsed and given feedback.
+
+        Closing the iterator early (or cancelling its task) cancels in-flight
+        LLM and parser calls, and no further rounds are started.
+        """
+        rounds = self._rounds()
+        with track("verify-loop", self.llm_log):
+            try:
+                async for attempt in rounds:
+                    yield attempt
+            finally:
+                await rounds.aclose()
+        # Only loops that ran to the end; disconnects would skew the success rate
+        outcome = "success" if self.attempts and self.attempts[-1].result.valid else "failure"
+        metrics.VERIFY_LOOP_RUNS.inc(self.language.lower(), outcome)
+        metrics.VERIFY_LOOP_ATTEMPTS.observe(len(self.attempts), self.language.lower(), outcome)
+
+    async def _rounds(self) -> AsyncIterator[VerifyAttempt]:
+        previous_attempts: List[Dict[str, str]] = []
+
+        for round_number in range(1, self.max_retries + 1):
+            self.rounds = round_number
+            history = list(previous_attempts)
+            pending = {
+                asyncio.ensure_future(self._candidate(history, n)): n
+                for n in range(1, self.candidates + 1)
+            }
+            try:
+                while pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in sorted(done, key=pending.get):
+                        candidate_number = pending.pop(task)
+                        gen_result, result, stats = task.result()
+                        attempt = self._attempt(round_number, candidate_number, gen_result, result, stats)
+                        self.attempts.append(attempt)
+                        yield attempt
+                        if result.valid:
+                            return
+                        previous_attempts.append({
+                            "sentence": gen_result.sentence,
+                            "feedback": attempt.constraint_feedback,
+                        })
+            finally:
+                for task in pending:
+                    task.cancel()
+                # Let cancelled candidates settle so their LLM calls are in llm_usage
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def _attempt(self, round_number: int, candidate_number: int,
+                 gen_result: GenerateResult, result: ParseResult, stats: dict) -> VerifyAttempt:
+        return VerifyAttempt(
+            attempt_number=len(self.attempts) + 1,
+            round_number=round_number,
+            candidate_number=candidate_number,
             sentence=gen_result.sentence,
             result=result,
-            constraint_feedback=feedback,
+            constraint_feedback=None if result.valid else format_constraint_feedback(result, get_analysis(self.language)),
             system_prompt=gen_result.system_prompt,
-            claude_messages=claude_messages,
-        ))
-        previous_attempts.append({
-            "sentence": gen_result.sentence,
-            "feedback": feedback,
-        })
-
-    return VerifyLoopResponse(
-        prompt=prompt,
-        language=language,
-        attempts=attempts,
-        final_result=attempts[-1].result,
-        success=False,
-        total_attempts=len(attempts),
-    )
+            claude_messages=[
+                ClaudeMessage(role=m["role"], content=m["content"])
+                for m in gen_result.messages
+            ],
+            **stats,
+        )
+
+    def response(self) -> VerifyLoopResponse:
+        final = self.attempts[-1].result
+        return VerifyLoopResponse(
+            prompt=self.prompt,
+            language=self.language,
+            attempts=self.attempts,
+            final_result=final,
+            success=final.valid,
+            total_attempts=len(self.attempts),
+            rounds=self.rounds,
+            candidates_per_round=self.candidates,
+            llm_calls=self.llm_calls,
+            elapsed_ms=round((time.perf_counter() - self._started) * 1000, 2),
+            llm_usage=self.llm_log.usage(),
+        )
+
+
+async def run_verify_loop(prompt: str, language: str, max_retries: int = 3,
+                          candidates: int = 1, use_cache: bool = True,
+                          early_abort: bool = False) -> VerifyLoopResponse:
+    """Run the generate -> validate -> feedback loop."""
+    loop = VerifyLoop(prompt, language, max_retries, candidates, use_cache, early_abort)
+    async for _ in loop.run():
+        pass
+    response = loop.response()
+    await run_store.persist(response)
+    return response
+
+
+async def stream_verify_loop(prompt: str, language: str, max_retries: int = 3,
+                             candidates: int = 1, use_cache: bool = True,
+                             early_abort: bool = False) -> AsyncIterator[str]:
+    """Run the loop as Server-Sent Events: one ``attempt`` event per VerifyAttempt,
+    then a ``summary`` event carrying the full VerifyLoopResponse."""
+    loop = VerifyLoop(prompt, language, max_retries, candidates, use_cache, early_abort)
+    attempts = loop.run()
+    try:
+        async for attempt in attempts:
+            yield format_event("attempt", attempt.model_dump_json())
+    finally:
+        # Runs on client disconnect too, so the loop never starts another round
+        await attempts.aclose()
+    response = loop.response()
+    await run_store.persist(response)
+    yield format_event("summary", response.model_dump_json())
@@ -1,106 +1,303 @@
 """Grammar X-Ray: generate natural text, parse each sentence through CFG."""
 
+import asyncio
+import os
 import re
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional
 from .models import (
     ParseResult, Token, SentenceAnalysis, XRayStats, XRayResponse, RuleApplied,
+    XRaySentenceEvent,
 )
-from .parser_client import parse_sentence
-from .llm_client import generate_paragraph, translate_sentences
+from .lexicon_index import get_lexicon_index, tokenize
+from .parser_client import parse_sentence_async
+from .llm_client import (
+    XRAY_SYSTEM_PROMPT, generate_paragraph, paragraph_user_message, stream_paragraph, translate_sentences,
+)
+from .llm_telemetry import track
+from .run_store import store as run_store
+from .sse import format_event
+
+# Parser calls in flight per X-ray request (the JAR pool bounds it server-wide)
+PARSE_CONCURRENCY = int(os.environ.get("XRAY_PARSE_CONCURRENCY", "4"))
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
 
 
 def split_sentences(text: str) -> List[dict]:
     """Split text into sentences, preserving original punctuation."""
-    raw_sentences = re.split(r'(?<=[.!?])\s+', text.strip())
-    results = []
-    for s in raw_sentences:
-        s = s.strip()
-        if not s:
-            continue
-        original = s
-        cleaned = re.sub(r'[.!?,;:"\'\-\u00bf\u00a1]+', '', original).strip().lower()
-        if cleaned:
-            results.append({"original": original, "cleaned": cleaned})
-    return results
-
-
-def _make_unknown_tokens(sentence: str) -> List[Token]:
-    """Create UNKNOWN-tagged tokens for sentences the parser couldn't handle."""
-    return [Token(word=w, tag="UNKNOWN", translation="") for w in sentence.split()]
-
-
-def run_xray(prompt: str, language: str) -> XRayResponse:
-    """Generate paragraph, parse each sentence, compute stats."""
-    paragraph = generate_paragraph(prompt, language)
-    generated_text = paragraph.text
-    sentence_parts = split_sentences(generated_text)
-    analyses: List[SentenceAnalysis] = []
-
-    all_rules: dict[str, RuleApplied] = {}
-    all_pos_tags: set[str] = set()
-    total_words = 0
-    known_words = 0
-
-    for part in sentence_parts:
-        result = parse_sentence(sentence=part["cleaned"], language=language)
-
-        # If parser returned no tokens (e.g. unknown word error), synthesize them
-        tokens = result.tokens if result.tokens else _make_unknown_tokens(part["cleaned"])
-        if not result.tokens and tokens:
-            result = ParseResult(
-                valid=result.valid,
-                sentence=result.sentence,
-                tokens=tokens,
-                parseTree=result.parseTree,
-                rulesApplied=result.rulesApplied,
-                parses=result.parses,
-                ambiguous=result.ambiguous,
-                failure=result.failure,
-                error=result.error,
-            )
+    raw_sentences = _SENTENCE_BOUNDARY.split(text.strip())
+    return [part for part in map(_clean_part, raw_sentences) if part]
+
+
+def _clean_part(raw: str) -> Optional[dict]:
+    original = raw.strip()
+    if not original:
+        return None
+    cleaned = re.sub(r'[.!?,;:"\'\-\u00bf\u00a1]+', '', original).strip().lower()
+    if not cleaned:
+        return None
+    return {"original": original, "cleaned": cleaned}
+
+
+class SentenceSplitter:
+    """Incremental split_sentences: feed text as it arrives, get sentences as they complete.
+
+    A boundary found in a prefix of the text is a boundary in the full text, so
+    feeding every chunk and then calling flush() yields exactly
+    split_sentences(full_text). Only the unfinished last sentence is buffered.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> List[dict]:
+        pieces = _SENTENCE_BOUNDARY.split(self._buffer + chunk)
+        self._buffer = pieces.pop()
+        return [part for part in map(_clean_part, pieces) if part]
+
+    def flush(self) -> List[dict]:
+        part = _clean_part(self._buffer)
+        self._buffer = ""
+        return [part] if part else []
 
-        for token in result.tokens:
-            total_words += 1
-            all_pos_tags.add(token.tag)
-            if token.tag != "UNKNOWN":
-                known_words += 1
-
-        for rule in result.rulesApplied:
-            all_rules[rule.rule] = rule
-
-        analyses.append(SentenceAnalysis(
-            sentence=part["cleaned"],
-            original=part["original"],
-            result=result,
-            in_grammar_scope=result.valid,
-        ))
-
-    # Translate all original sentences in a single Claude call
-    originals = [a.original for a in analyses]
-    translations = translate_sentences(originals)
-    for analysis, translation in zip(analyses, translations):
-        analysis.translation = translation
 
-    total = len(analyses)
-    parsed = sum(1 for a in analyses if a.in_grammar_scope)
-
-    stats = XRayStats(
-        total_sentences=total,
-        parsed_sentences=parsed,
-        coverage_percentage=round((parsed / total * 100) if total > 0 else 0, 1),
-        total_words=total_words,
-        known_words=known_words,
-        word_coverage_percentage=round((known_words / total_words * 100) if total_words > 0 else 0, 1),
-        rules_used=list(all_rules.values()),
-        unique_pos_tags=sorted(all_pos_tags),
+def _make_fallback_tokens(sentence: str, language: str) -> List[Token]:
+    """Tag tokens from the lexicon for sentences the parser couldn't handle."""
+    lexicon = get_lexicon_index(language)
+    if lexicon is None:
+        return [Token(word=w, tag="UNKNOWN", translation="") for w in sentence.split()]
+    return lexicon.tokens(tokenize(sentence))
+
+
+def _analyze(part: dict, result: ParseResult, language: str) -> SentenceAnalysis:
+    # If the parser errored out without tokens, tag them from the lexicon
+    tokens = result.tokens if result.tokens else _make_fallback_tokens(part["cleaned"], language)
+    if not result.tokens and tokens:
+        # Every parse_sentence caller gets its own result, so fill it in place
+        result.tokens = tokens
+    return SentenceAnalysis(
+        sentence=part["cleaned"],
+        original=part["original"],
+        result=result,
+        in_grammar_scope=result.valid,
     )
 
-    return XRayResponse(
+
+class CoverageCounter:
+    """Running XRayStats totals, without keeping the analyses themselves.
+
+    Counters can be merged, and round-trip through ``state()`` /
+    ``from_state()`` as plain JSON, so ``bulk`` can aggregate across worker
+    processes and checkpoints.
+    """
+
+    def __init__(self):
+        self._sentences = 0
+        self._parsed = 0
+        self._rules: Dict[str, RuleApplied] = {}
+        self._pos_tags: set[str] = set()
+        self._total_words = 0
+        self._known_words = 0
+
+    def add(self, analysis: SentenceAnalysis) -> None:
+        self._sentences += 1
+        if analysis.in_grammar_scope:
+            self._parsed += 1
+        for token in analysis.result.tokens:
+            self._total_words += 1
+            self._pos_tags.add(token.tag)
+            if token.tag != "UNKNOWN":
+                self._known_words += 1
+        for rule in analysis.result.rulesApplied:
+            self._rules[rule.rule] = rule
+
+    def merge(self, other: "CoverageCounter") -> None:
+        self._sentences += other._sentences
+        self._parsed += other._parsed
+        self._total_words += other._total_words
+        self._known_words += other._known_words
+        self._pos_tags |= other._pos_tags
+        for key, rule in other._rules.items():
+            self._rules.setdefault(key, rule)
+
+    def state(self) -> dict:
+        return {
+            "sentences": self._sentences,
+            "parsed": self._parsed,
+            "total_words": self._total_words,
+            "known_words": self._known_words,
+            "pos_tags": sorted(self._pos_tags),
+            "rules": [[rule.number, rule.rule] for rule in self._rules.values()],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "CoverageCounter":
+        counter = cls()
+        counter._sentences = state["sentences"]
+        counter._parsed = state["parsed"]
+        counter._total_words = state["total_words"]
+        counter._known_words = state["known_words"]
+        counter._pos_tags = set(state["pos_tags"])
+        counter._rules = {rule: RuleApplied(number=number, rule=rule) for number, rule in state["rules"]}
+        return counter
+
+    def stats(self) -> XRayStats:
+        total, parsed = self._sentences, self._parsed
+        total_words, known_words = self._total_words, self._known_words
+        return XRayStats(
+            total_sentences=total,
+            parsed_sentences=parsed,
+            coverage_percentage=round((parsed / total * 100) if total > 0 else 0, 1),
+            total_words=total_words,
+            known_words=known_words,
+            word_coverage_percentage=round((known_words / total_words * 100) if total_words > 0 else 0, 1),
+            rules_used=list(self._rules.values()),
+            unique_pos_tags=sorted(self._pos_tags),
+        )
+
+
+class XRayAccumulator(CoverageCounter):
+    """Running XRayStats over the sentences analyzed so far, keeping each analysis."""
+
+    def __init__(self):
+        super().__init__()
+        self.analyses: List[SentenceAnalysis] = []
+
+    def add(self, analysis: SentenceAnalysis) -> None:
+        self.analyses.append(analysis)
+        super().add(analysis)
+
+
+async def run_xray(prompt: str, language: str, use_cache: bool = True) -> XRayResponse:
+    """Generate paragraph, parse each sentence, compute stats.
+
+    Sentences are parsed concurrently, at most XRAY_PARSE_CONCURRENCY at a
+    time, while the translation call runs alongside them, so latency is
+    roughly the slower of the two rather than their sum. Results keep
+    paragraph order.
+    """
+    with track("xray") as llm_log:
+        paragraph = await generate_paragraph(prompt, language, use_cache=use_cache)
+        generated_text = paragraph.text
+        sentence_parts = split_sentences(generated_text)
+
+        # Translate all original sentences in a single Claude call, overlapped with parsing
+        translation_task = asyncio.ensure_future(
+            translate_sentences([part["original"] for part in sentence_parts], language, use_cache=use_cache)
+        )
+        limit = asyncio.Semaphore(max(1, PARSE_CONCURRENCY))
+
+        async def parse(sentence: str) -> ParseResult:
+            async with limit:
+                return await parse_sentence_async(sentence=sentence, language=language)
+
+        parse_tasks = [asyncio.ensure_future(parse(part["cleaned"])) for part in sentence_parts]
+        accumulator = XRayAccumulator()
+
+        try:
+            for part, task in zip(sentence_parts, parse_tasks):
+                accumulator.add(_analyze(part, await task, language))
+            translations = await translation_task
+        finally:
+            # On failure or disconnect, don't leave parses or the translation running
+            for task in parse_tasks + [translation_task]:
+                task.cancel()
+
+    for analysis, translation in zip(accumulator.analyses, translations):
+        analysis.translation = translation
+
+    response = XRayResponse(
         prompt=prompt,
         language=language,
         generated_text=generated_text,
         system_prompt=paragraph.system_prompt,
         user_message=paragraph.user_message,
-        sentences=analyses,
-        stats=stats,
+        sentences=accumulator.analyses,
+        stats=accumulator.stats(),
+        llm_usage=llm_log.usage(),
+    )
+    await run_store.persist(response)
+    return response
+
+
+async def stream_xray(prompt: str, language: str, use_cache: bool = True) -> AsyncIterator[str]:
+    """Run X-ray as the paragraph is written, yielding Server-Sent Events.
+
+    Events, in order of arrival:
+      token         {"text": ...} for each chunk of generated text
+      sentence      XRaySentenceEvent as soon as a completed sentence is parsed
+      stats         XRayStats after each sentence
+      translations  {"translations": [...]} once the paragraph is translated
+      summary       the full XRayResponse, identical in shape to POST /xray
+
+    Each sentence is parsed the moment its boundary arrives, so the first
+    analysis lands roughly when the first sentence has been generated.
+    Sentence events keep paragraph order.
+    """
+    splitter = SentenceSplitter()
+    parts: List[dict] = []
+    tasks: List[asyncio.Task] = []
+    accumulator = XRayAccumulator()
+    text_chunks: List[str] = []
+    translation_task: Optional[asyncio.Task] = None
+    limit = asyncio.Semaphore(max(1, PARSE_CONCURRENCY))
+
+    async def parse(sentence: str) -> ParseResult:
+        async with limit:
+            return await parse_sentence_async(sentence=sentence, language=language)
+
+    def start(new_parts: List[dict]) -> None:
+        for part in new_parts:
+            parts.append(part)
+            tasks.append(asyncio.ensure_future(parse(part["cleaned"])))
+
+    def emit(result: ParseResult) -> List[str]:
+        index = len(accumulator.analyses)
+        analysis = _analyze(parts[index], result, language)
+        accumulator.add(analysis)
+        event = XRaySentenceEvent(index=index, **analysis.model_dump())
+        return [
+            format_event("sentence", event.model_dump_json()),
+            format_event("stats", accumulator.stats().model_dump_json()),
+        ]
+
+    with track("xray") as llm_log:
+        try:
+            async for text in stream_paragraph(prompt, language, use_cache=use_cache):
+                text_chunks.append(text)
+                yield format_event("token", {"text": text})
+                start(splitter.feed(text))
+                # Emit finished parses in order without waiting on the rest
+                while len(accumulator.analyses) < len(tasks) and tasks[len(accumulator.analyses)].done():
+                    for event in emit(tasks[len(accumulator.analyses)].result()):
+                        yield event
+
+            start(splitter.flush())
+            translation_task = asyncio.ensure_future(
+                translate_sentences([part["original"] for part in parts], language, use_cache=use_cache)
+            )
+            while len(accumulator.analyses) < len(tasks):
+                for event in emit(await tasks[len(accumulator.analyses)]):
+                    yield event
+
+            translations = await translation_task
+            yield format_event("translations", {"translations": translations})
+        finally:
+            # Client disconnected or the LLM failed: stop outstanding work
+            for task in tasks + ([translation_task] if translation_task else []):
+                task.cancel()
+
+    for analysis, translation in zip(accumulator.analyses, translations):
+        analysis.translation = translation
+    summary = XRayResponse(
+        prompt=prompt,
+        language=language,
+        generated_text="".join(text_chunks).strip(),
+        system_prompt=XRAY_SYSTEM_PROMPT,
+        user_message=paragraph_user_message(prompt, language),
+        sentences=accumulator.analyses,
+        stats=accumulator.stats(),
+        llm_usage=llm_log.usage(),
     )
+    await run_store.persist(summary)
+    yield format_event("summary", summary.model_dump_json())
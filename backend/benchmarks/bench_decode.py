@@ -0,0 +1,104 @@
+"""Decoding parser output into a ParseResult, and encoding it back out, on large trees.
+
+    python benchmarks/bench_decode.py [language] [--lengths 10 25 40] [--repeat N]
+
+Parser output is simulated with Earley parses of sampled sentences of each
+length, serialized the way the JAR prints them.
+
+decode:
+  json+kwargs      json.loads on decoded text, then ParseResult(**data) (the old path)
+  orjson+validate  orjson.loads on the raw bytes, then one model_validate (the app's path)
+  orjson+construct orjson.loads, then model_construct down the tree, skipping validation
+  json-mode        ParseResult.model_validate_json on the raw bytes, for reference
+encode:
+  json-response    fastapi JSONResponse
+  orjson-response  fastapi ORJSONResponse (the app's default response class)
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.earley import parse_sentence_earley  # noqa: E402
+from app.models import (  # noqa: E402
+    FailureInfo, ParseMetrics, ParseResult, ParseTreeNode, RuleApplied, Token,
+)
+from app.sampler import SentenceSampler  # noqa: E402
+
+
+def timed(fn, repeat: int) -> float:
+    """Median microseconds per call."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def construct_tree(node: dict) -> ParseTreeNode:
+    return ParseTreeNode.model_construct(
+        symbol=node["symbol"],
+        children=[construct_tree(child) for child in node.get("children", ())],
+        word=node.get("word", False),
+    )
+
+
+def construct(data: dict) -> ParseResult:
+    """A ParseResult built without validation, as a trusted decode path would."""
+    tree, failure, metrics = data.get("parseTree"), data.get("failure"), data.get("metrics")
+    return ParseResult.model_construct(
+        valid=data["valid"],
+        sentence=data["sentence"],
+        tokens=[Token.model_construct(**token) for token in data.get("tokens", ())],
+        parseTree=construct_tree(tree) if tree else None,
+        rulesApplied=[RuleApplied.model_construct(**rule) for rule in data.get("rulesApplied", ())],
+        parses=data.get("parses", 0),
+        ambiguous=data.get("ambiguous", False),
+        failure=FailureInfo.model_construct(**failure) if failure else None,
+        error=data.get("error"),
+        metrics=ParseMetrics.model_construct(**metrics) if metrics else None,
+    )
+
+
+def tree_size(node) -> int:
+    return 1 + sum(tree_size(child) for child in node.children)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("language", nargs="?", default="spanish")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 25, 40])
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    for length in args.lengths:
+        sampler = SentenceSampler(args.language, min_len=length, max_len=length, seed=length)
+        result = parse_sentence_earley(sampler.sample(), args.language)
+        raw = result.model_dump_json().encode("utf-8")
+        content = result.model_dump(mode="json")
+
+        results = {
+            "json+kwargs": timed(lambda: ParseResult(**json.loads(raw.decode("utf-8"))), args.repeat),
+            "orjson+validate": timed(lambda: ParseResult.model_validate(orjson.loads(raw)), args.repeat),
+            "orjson+construct": timed(lambda: construct(orjson.loads(raw)), args.repeat),
+            "json-mode": timed(lambda: ParseResult.model_validate_json(raw), args.repeat),
+            "json-response": timed(lambda: JSONResponse(content), args.repeat),
+            "orjson-response": timed(lambda: ORJSONResponse(content), args.repeat),
+        }
+        nodes = tree_size(result.parseTree) if result.parseTree else 0
+        print(f"{length} words: {nodes} tree nodes, {len(raw)} bytes, median of {args.repeat} runs")
+        for name, us in results.items():
+            print(f"  {name:<16} {us:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
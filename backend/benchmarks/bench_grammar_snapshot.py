@@ -0,0 +1,60 @@
+"""Cold vs warm cost of loading grammar data for /stats and /grammar-detail.
+
+    python benchmarks/bench_grammar_snapshot.py [language] [--repeat N]
+
+cold-xml       compile the payload straight from the XML (the old per-request cost)
+snapshot-file  decode the binary snapshot from disk (process startup)
+warm           /stats and /grammar-detail once the snapshot is in memory
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import grammar_snapshot  # noqa: E402
+from app.grammar_stats import get_grammar_detail, get_grammar_stats  # noqa: E402
+
+
+def timed(fn, repeat: int) -> float:
+    """Median milliseconds per call."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("language", nargs="?", default="spanish")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    grammar_snapshot.write_snapshot(args.language)
+
+    def snapshot_file():
+        grammar_snapshot.GrammarSnapshot(grammar_snapshot.read_snapshot(args.language))
+
+    def warm():
+        get_grammar_stats(args.language)
+        get_grammar_detail(args.language)
+
+    warm()
+    results = {
+        "cold-xml": timed(lambda: grammar_snapshot.compile_payload(args.language), args.repeat),
+        "snapshot-file": timed(snapshot_file, args.repeat),
+        "warm": timed(warm, args.repeat),
+    }
+    size = grammar_snapshot.snapshot_path(args.language).stat().st_size
+    print(f"{args.language}: snapshot {size} bytes, median of {args.repeat} runs")
+    for name, ms in results.items():
+        print(f"  {name:<14} {ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
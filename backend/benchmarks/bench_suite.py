@@ -0,0 +1,355 @@
+"""Offline benchmark suite for parse_sentence, run_verify_loop and run_xray.
+
+    python benchmarks/bench_suite.py run [--out results.json] [--quick] [--concurrency 1 4 16]
+    python benchmarks/bench_suite.py compare baseline.json results.json [--threshold 0.10]
+    python benchmarks/bench_suite.py run --baseline baseline.json   # run, then compare
+
+Every scenario draws from the versioned corpus in benchmarks/corpus/ and
+runs with the parse and LLM response caches off, so it measures real work.
+The Anthropic client is replaced by a deterministic fake: the same
+arguments always produce the same replies and the same number of retries.
+Each scenario reports throughput, p50/p95/p99 latency and peak RSS, from the
+median of --repeat runs. Use full (not --quick) runs for comparisons.
+``compare`` exits 1 when throughput drops or p95 or peak RSS grows by more
+than --threshold.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+SUITE_VERSION = 1
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def load_corpus(version: int) -> dict:
+    path = CORPUS_DIR / f"v{version}.json"
+    raw = path.read_bytes()
+    corpus = json.loads(raw)
+    corpus["sha256"] = hashlib.sha256(raw).hexdigest()
+    corpus["all"] = [s for group in corpus["sentences"].values() for s in group]
+    return corpus
+
+
+# --- Deterministic fake Anthropic client ------------------------------------
+
+def _seed(*parts: str) -> int:
+    return int.from_bytes(hashlib.sha256("\0".join(parts).encode("utf-8")).digest()[:8], "big")
+
+
+class FakeAnthropic:
+    """Stands in for AsyncAnthropic: ``messages.create`` and ``messages.stream``.
+
+    Sentence requests fail a prompt-dependent number of times (0-2) with
+    invalid corpus sentences before answering with a valid one. Paragraphs
+    mix five corpus sentences, and translations echo their input.
+    """
+
+    def __init__(self, corpus: dict, latency: float):
+        self.corpus = corpus["sentences"]
+        self.mixed = corpus["all"]
+        self.latency = latency
+        self.messages = self
+
+    def reply(self, request: dict) -> str:
+        system = "".join(b["text"] for b in request["system"]) if isinstance(request["system"], list) else request["system"]
+        messages = request["messages"]
+        user = messages[-1]["content"]
+        if "translator" in system:
+            lines = user.split("\n")[1:]
+            return "\n".join(f"{line.split('. ', 1)[0]}. [en] {line.split('. ', 1)[-1]}" for line in lines)
+        if "paragraph" in system:
+            seed = _seed(user)
+            picks = [self.mixed[(seed >> (8 * i)) % len(self.mixed)] for i in range(5)]
+            return " ".join(p[0].upper() + p[1:] + "." for p in picks)
+        prompt = messages[0]["content"]
+        attempt = sum(1 for m in messages if m["role"] == "assistant")
+        seed = _seed(prompt, str(attempt))
+        pool = self.corpus["invalid"] if attempt < _seed(prompt) % 3 else self.corpus["valid"]
+        return pool[seed % len(pool)]
+
+    def _message(self, request: dict, text: str) -> SimpleNamespace:
+        usage = SimpleNamespace(
+            input_tokens=len(json.dumps(request["messages"])) // 4,
+            output_tokens=len(text) // 4,
+            cache_creation_input_tokens=0,
+            cache_read_input_tokens=0,
+        )
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=usage, stop_reason="end_turn")
+
+    async def create(self, **request) -> SimpleNamespace:
+        await asyncio.sleep(self.latency)
+        return self._message(request, self.reply(request))
+
+    def stream(self, **request) -> "_FakeStream":
+        return _FakeStream(self, request)
+
+
+class _FakeStream:
+    def __init__(self, fake: FakeAnthropic, request: dict):
+        self.fake = fake
+        self.request = request
+        self.text = fake.reply(request)
+        self.sent = ""
+        self.text_stream = self._chunks()
+
+    async def _chunks(self):
+        words = self.text.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.fake.latency / len(words))
+            chunk = word if i == 0 else " " + word
+            self.sent += chunk
+            yield chunk
+
+    async def __aenter__(self) -> "_FakeStream":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    @property
+    def current_message_snapshot(self) -> SimpleNamespace:
+        # Like the SDK's, before message_delta: output tokens aren't known yet
+        message = self.fake._message(self.request, self.sent)
+        message.usage.output_tokens = 1
+        return message
+
+    async def get_final_message(self) -> SimpleNamespace:
+        return self.fake._message(self.request, self.text)
+
+
+# --- Scenarios ----------------------------------------------------------------
+
+def percentile(ordered: List[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS; children covers JAR workers
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round((own + children) / scale, 1)
+
+
+async def measure(name: str, op, items: List, concurrency: int) -> dict:
+    """Run ``op(item)`` for every item with ``concurrency`` workers; report latencies."""
+    latencies: List[float] = []
+    queue = iter(items)
+
+    async def worker() -> None:
+        for item in queue:
+            started = time.perf_counter()
+            await op(item)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "name": name,
+        "concurrency": concurrency,
+        "ops": len(latencies),
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(latencies) / wall, 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def check_corpus(corpus: dict) -> Dict[str, dict]:
+    """How each corpus group parses now; a drift here means results aren't comparable."""
+    from app.parser_client import parse_sentence
+
+    report = {}
+    for group, sentences in corpus["sentences"].items():
+        results = [parse_sentence(s, corpus["language"]) for s in sentences]
+        report[group] = {
+            "sentences": len(sentences),
+            "valid": sum(r.valid for r in results),
+            "ambiguous": sum(r.ambiguous for r in results),
+            "errors": sum(r.error is not None for r in results),
+        }
+    return report
+
+
+async def run_suite(args: argparse.Namespace, corpus: dict) -> List[dict]:
+    from app import llm_client
+    from app.parser_client import parse_sentence_async
+    from app.verifier_loop import run_verify_loop
+    from app.xray import run_xray
+
+    fake = FakeAnthropic(corpus, args.llm_latency)
+    llm_client._get_client = lambda: fake
+    language = corpus["language"]
+    scale = 10 if args.quick else 1
+
+    def repeat(items: List, n: int) -> List:
+        return [items[i % len(items)] for i in range(n)]
+
+    scenarios = []
+    if "parse" in args.only:
+        async def parse(sentence: str):
+            await parse_sentence_async(sentence, language)
+        scenarios.append(("parse_sentence", parse, repeat(corpus["all"], max(1, 2000 // scale))))
+    if "verify" in args.only:
+        async def verify(n: int):
+            await run_verify_loop(f"benchmark prompt {n}", language, max_retries=3)
+        scenarios.append(("run_verify_loop", verify, list(range(max(1, 200 // scale)))))
+    if "xray" in args.only:
+        async def xray(n: int):
+            await run_xray(f"benchmark story {n}", language)
+        scenarios.append(("run_xray", xray, list(range(max(1, 100 // scale)))))
+
+    results = []
+    for name, op, items in scenarios:
+        # Warm up grammar snapshots, lexicon indexes and pools outside the measurement
+        await measure(name, op, items[:min(len(items), 20)], 1)
+        for concurrency in args.concurrency:
+            # The median of a few repeats by throughput damps scheduler and GC noise
+            runs = sorted(
+                [await measure(name, op, items, concurrency) for _ in range(args.repeat)],
+                key=lambda r: r["throughput_per_s"],
+            )
+            result = dict(runs[len(runs) // 2], repeats=len(runs))
+            results.append(result)
+            print(f"  {name:<16} c={concurrency:<3} {result['throughput_per_s']:>9.1f}/s  "
+                  f"p50={result['p50_ms']:8.2f}  p95={result['p95_ms']:8.2f}  "
+                  f"p99={result['p99_ms']:8.2f} ms  rss={result['peak_rss_mb']} MB")
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> int:
+    corpus = load_corpus(args.corpus)
+    print(f"corpus v{corpus['version']} ({len(corpus['all'])} sentences), engine={args.engine}, "
+          f"fake LLM latency {args.llm_latency * 1000:g} ms")
+    report = {
+        "suite_version": SUITE_VERSION,
+        "corpus_version": corpus["version"],
+        "corpus_sha256": corpus["sha256"],
+        "engine": args.engine,
+        "llm_latency_s": args.llm_latency,
+        "quick": args.quick,
+        "repeat": args.repeat,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "corpus_check": check_corpus(corpus),
+        "results": asyncio.run(run_suite(args, corpus)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"wrote {args.out}")
+    if args.baseline:
+        return compare_reports(json.loads(Path(args.baseline).read_text()), report, args.threshold)
+    return 0
+
+
+# --- Comparison -----------------------------------------------------------------
+
+# (field, True if higher is better)
+COMPARED = (("throughput_per_s", True), ("p95_ms", False), ("peak_rss_mb", False))
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float) -> int:
+    for field in ("suite_version", "corpus_sha256", "engine", "llm_latency_s", "quick", "repeat"):
+        if baseline.get(field) != current.get(field):
+            print(f"warning: {field} differs ({baseline.get(field)} vs {current.get(field)}); "
+                  f"results may not be comparable")
+    if baseline.get("corpus_check") != current.get("corpus_check"):
+        print("warning: the corpus parses differently now (grammar changed?)")
+
+    before = {(r["name"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"{'scenario':<22} {'metric':<17} {'baseline':>10} {'current':>10} {'change':>8}")
+    for result in current["results"]:
+        key = (result["name"], result["concurrency"])
+        old = before.get(key)
+        if old is None:
+            continue
+        for field, higher_is_better in COMPARED:
+            a, b = old[field], result[field]
+            if not a:
+                continue
+            change = (b - a) / a
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                regressions += 1
+                flag = "  REGRESSION"
+            print(f"{key[0] + ' c=' + str(key[1]):<22} {field:<17} {a:>10.2f} {b:>10.2f} {change:>+7.1%}{flag}")
+    if regressions:
+        print(f"{regressions} metric(s) regressed by more than {threshold:.0%}")
+        return 1
+    print(f"no regressions beyond {threshold:.0%}")
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    baseline = json.loads(Path(args.baseline_file).read_text())
+    current = json.loads(Path(args.current_file).read_text())
+    return compare_reports(baseline, current, args.threshold)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the suite")
+    run_parser.add_argument("--out", help="Write results JSON here")
+    run_parser.add_argument("--baseline", help="Compare against this results JSON afterwards")
+    run_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed regression (fraction)")
+    run_parser.add_argument("--corpus", type=int, default=1, help="Corpus version in benchmarks/corpus/")
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    run_parser.add_argument("--only", nargs="+", choices=["parse", "verify", "xray"],
+                            default=["parse", "verify", "xray"])
+    run_parser.add_argument("--engine", choices=["python", "jar"], default="python")
+    run_parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per fake LLM call")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the median is kept")
+    run_parser.add_argument("--quick", action="store_true", help="A tenth of the operations")
+
+    compare_parser = sub.add_parser("compare", help="Compare two results files")
+    compare_parser.add_argument("baseline_file")
+    compare_parser.add_argument("current_file")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed regression (fraction)")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        # Module-level settings are read at import, so set them before app is imported
+        os.environ["PARSER_ENGINE"] = args.engine
+        os.environ["PARSE_CACHE_MAX_ENTRIES"] = "0"
+        os.environ["LLM_CACHE_MODE"] = "off"
+        sys.exit(run(args))
+    sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Sequential vs speculative verify loop: wall-clock time against LLM calls.
+
+    python benchmarks/bench_verify_candidates.py [--runs 200] [--p-valid 0.3] [--latency 0.8]
+
+Replaces generate_sentence with a simulated LLM whose replies are valid with
+probability --p-valid and take about --latency seconds, then runs the real
+loop (Earley engine, no JAR) for each candidate count. All runs for one
+candidate count execute concurrently, so each row takes about
+max_retries * latency seconds.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("PARSER_ENGINE", "python")
+
+from app import verifier_loop  # noqa: E402
+from app.llm_client import SYSTEM_PROMPT, GenerateResult  # noqa: E402
+
+VALID = ["el perro es grande", "el niño corre", "hay un gato en la casa", "la mujer come la manzana"]
+INVALID = ["perro el grande", "el perro grande", "corre niño el", "hay gato"]
+
+
+def simulated_llm(p_valid: float, latency: float):
+    async def generate_sentence(prompt, language, previous_attempts=None):
+        await asyncio.sleep(latency * random.uniform(0.7, 1.3))
+        sentence = random.choice(VALID if random.random() < p_valid else INVALID)
+        return GenerateResult(sentence, SYSTEM_PROMPT, [{"role": "assistant", "content": sentence}])
+    return generate_sentence
+
+
+async def measure(candidates: int, runs: int, max_retries: int) -> dict:
+    results = await asyncio.gather(*(
+        verifier_loop.run_verify_loop("a dog", "spanish", max_retries, candidates)
+        for _ in range(runs)
+    ))
+    return {
+        "success": sum(r.success for r in results) / runs,
+        "elapsed_ms": statistics.mean(r.elapsed_ms for r in results),
+        "p95_ms": sorted(r.elapsed_ms for r in results)[int(runs * 0.95) - 1],
+        "llm_calls": statistics.mean(r.llm_calls for r in results),
+        "rounds": statistics.mean(r.rounds for r in results),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--p-valid", type=float, default=0.3, help="Chance a reply parses")
+    parser.add_argument("--latency", type=float, default=0.8, help="Seconds per LLM call")
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    verifier_loop.generate_sentence = simulated_llm(args.p_valid, args.latency)
+
+    print(f"p_valid={args.p_valid} latency={args.latency}s max_retries={args.max_retries} runs={args.runs}")
+    print(f"{'N':>3} {'success':>8} {'mean ms':>9} {'p95 ms':>9} {'rounds':>7} {'LLM calls':>10}")
+    for n in args.candidates:
+        row = asyncio.run(measure(n, args.runs, args.max_retries))
+        print(f"{n:>3} {row['success']:>8.0%} {row['elapsed_ms']:>9.0f} "
+              f"{row['p95_ms']:>9.0f} {row['rounds']:>7.2f} {row['llm_calls']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Load test: /health and /validate latency while slow LLM calls are in flight.
+
+    python benchmarks/load_test.py [--llm-delay 10] [--llm-requests 32] [--duration 5]
+
+Starts a fake Anthropic API that answers after --llm-delay seconds and a real
+uvicorn backend pointed at it (Earley engine, so no JAR is needed). Measures
+/health and /validate p50/p99 first on an idle server, then while
+--llm-requests concurrent /verify-loop calls are waiting on the fake LLM.
+On the async request path both phases should look the same.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def fake_anthropic_app(delay: float) -> Starlette:
+    async def messages(request: Request) -> JSONResponse:
+        body = await request.json()
+        await asyncio.sleep(delay)
+        return JSONResponse({
+            "id": "msg_loadtest",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "fake"),
+            "content": [{"type": "text", "text": "el perro es grande"}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 100, "output_tokens": 5},
+        })
+
+    return Starlette(routes=[Route("/v1/messages", messages, methods=["POST"])])
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(proc: subprocess.Popen, url: str) -> None:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{url} did not come up")
+
+
+def start_fake_llm(delay: float) -> "tuple[subprocess.Popen, int]":
+    # Its own process, so serving it doesn't compete with the measuring client
+    port = free_port()
+    proc = subprocess.Popen([
+        sys.executable, __file__, "--serve-fake-llm", str(port), "--llm-delay", str(delay),
+    ])
+    wait_until_up(proc, f"http://127.0.0.1:{port}/")
+    return proc, port
+
+
+def start_backend(llm_port: int) -> "tuple[subprocess.Popen, int]":
+    port = free_port()
+    env = dict(
+        os.environ,
+        ANTHROPIC_BASE_URL=f"http://127.0.0.1:{llm_port}",
+        ANTHROPIC_API_KEY="loadtest",
+        PARSER_ENGINE="python",
+        PARSE_CACHE_MAX_ENTRIES="0",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    wait_until_up(proc, f"http://127.0.0.1:{port}/health")
+    return proc, port
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def probe(client: httpx.AsyncClient, duration: float) -> Dict[str, List[float]]:
+    """Alternate /health and /validate calls from a few clients for `duration` seconds."""
+    latencies: Dict[str, List[float]] = {"/health": [], "/validate": []}
+    deadline = time.monotonic() + duration
+
+    async def worker() -> None:
+        while time.monotonic() < deadline:
+            for path in latencies:
+                started = time.perf_counter()
+                if path == "/health":
+                    r = await client.get(path)
+                else:
+                    r = await client.post(path, json={"sentence": "el perro grande come la manzana"})
+                r.raise_for_status()
+                latencies[path].append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(4)))
+    return latencies
+
+
+def report(phase: str, latencies: Dict[str, List[float]]) -> None:
+    for path, samples in latencies.items():
+        print(f"  {phase:<8} {path:<10} n={len(samples):<6} "
+              f"p50={percentile(samples, 50):7.2f} ms  p99={percentile(samples, 99):7.2f} ms")
+
+
+async def run(port: int, llm_requests: int, duration: float) -> None:
+    limits = httpx.Limits(max_connections=llm_requests + 16)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+        await probe(client, 1)  # warm up
+        report("idle", await probe(client, duration))
+
+        slow = [
+            asyncio.ensure_future(client.post("/verify-loop", json={"prompt": "a dog", "max_retries": 3}))
+            for _ in range(llm_requests)
+        ]
+        await asyncio.sleep(0.5)
+        report("loaded", await probe(client, duration))
+        in_flight = sum(1 for task in slow if not task.done())
+        print(f"  {in_flight}/{llm_requests} /verify-loop calls still waiting on the LLM at the end")
+        for task in slow:
+            task.cancel()
+        await asyncio.gather(*slow, return_exceptions=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm-delay", type=float, default=10.0, help="Seconds per fake LLM call (keep above 0.5 + duration)")
+    parser.add_argument("--llm-requests", type=int, default=32, help="Concurrent /verify-loop calls")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per measurement phase")
+    parser.add_argument("--serve-fake-llm", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_fake_llm:
+        uvicorn.run(fake_anthropic_app(args.llm_delay), host="127.0.0.1",
+                    port=args.serve_fake_llm, log_level="warning")
+        return
+
+    llm_proc, llm_port = start_fake_llm(args.llm_delay)
+    backend_proc, port = start_backend(llm_port)
+    try:
+        print(f"backend :{port}, fake LLM :{llm_port} ({args.llm_delay:g}s per call)")
+        asyncio.run(run(port, args.llm_requests, args.duration))
+    finally:
+        for proc in (backend_proc, llm_proc):
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Shared fixtures: throwaway grammar packs in a temporary GRAMMAR_DIR."""
+
+import pytest
+
+from app import grammar_files, grammar_snapshot
+
+
+def write_pack(directory, language, rules, lexicon, start="S"):
+    """Write ``<language>_grammar.xml`` and ``<language>_lexicon.xml``.
+
+    ``rules`` is a list of (number, lhs, rhs symbols); ``lexicon`` a list of
+    (word, tag, English gloss).
+    """
+    grammar = [f'<?xml version="1.0" encoding="UTF-8"?>\n<grammar start="{start}">']
+    for number, lhs, rhs in rules:
+        grammar.append(f'    <rule number="{number}">\n        <lhs>{lhs}</lhs>')
+        grammar.extend(f"        <rhs>{symbol}</rhs>" for symbol in rhs)
+        grammar.append("    </rule>")
+    grammar.append("</grammar>\n")
+    entries = [
+        f"    <entry>\n        <kw>{word}</kw>\n        <posTag>{tag}</posTag>\n        <en>{gloss}</en>\n    </entry>"
+        for word, tag, gloss in lexicon
+    ]
+    (directory / f"{language}_grammar.xml").write_text("\n".join(grammar), encoding="utf-8")
+    (directory / f"{language}_lexicon.xml").write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n<lexicon>\n' + "\n".join(entries) + "\n</lexicon>\n",
+        encoding="utf-8",
+    )
+
+
+@pytest.fixture
+def grammar_dir(tmp_path, monkeypatch):
+    """An empty GRAMMAR_DIR (and snapshot dir) for the test to write packs into."""
+    packs = tmp_path / "grammars"
+    packs.mkdir()
+    monkeypatch.setattr(grammar_files, "GRAMMAR_DIR", packs)
+    monkeypatch.setattr(grammar_files, "_hash_cache", {})
+    monkeypatch.setattr(grammar_snapshot, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    return packs
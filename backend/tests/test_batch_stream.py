@@ -0,0 +1,77 @@
+"""/validate/batch streams one NDJSON line per sentence, then a summary trailer."""
+
+import json
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.main import app
+
+
+def _lines(response):
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_json_body_streams_every_item_then_summary():
+    sentences = ["el perro corre", "perro el corre", "   ", "hay un gato en la casa"]
+    with TestClient(app) as client:
+        lines = _lines(client.post("/validate/batch", json={
+            "sentences": sentences, "engine": "python", "concurrency": 2,
+        }))
+
+    *items, summary = lines
+    assert all(item["type"] == "result" for item in items)
+    by_index = {item["index"]: item for item in items}
+    assert sorted(by_index) == [0, 1, 2, 3]
+    assert by_index[0]["result"]["valid"] is True
+    assert by_index[1]["result"]["valid"] is False
+    assert by_index[2]["error"] == "Sentence is empty"
+    assert by_index[3]["sentence"] == sentences[3]
+
+    assert summary["type"] == "summary"
+    assert (summary["total"], summary["valid"], summary["invalid"], summary["errors"]) == (4, 2, 1, 1)
+
+
+def test_ndjson_body_reads_strings_objects_and_reports_bad_lines():
+    body = "\n".join([
+        json.dumps("el perro corre"),
+        "",
+        json.dumps({"sentence": "el niño lee un libro"}),
+        "{not json",
+        json.dumps({"text": "no sentence field"}),
+    ]) + "\n"
+    with TestClient(app) as client:
+        lines = _lines(client.post(
+            "/validate/batch?engine=python&concurrency=1",
+            content=body.encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+        ))
+
+    *items, summary = lines
+    by_index = {item["index"]: item for item in items}
+    # Blank lines are skipped, so indices count non-blank lines only
+    assert sorted(by_index) == [0, 1, 2, 3]
+    assert by_index[0]["result"]["valid"] is True
+    assert by_index[1]["sentence"] == "el niño lee un libro"
+    assert by_index[2]["error"].startswith("Invalid JSON line")
+    assert "sentence" in by_index[3]["error"]
+    assert (summary["total"], summary["valid"], summary["errors"]) == (4, 2, 2)
+
+
+def test_ndjson_body_with_unknown_language_is_rejected_before_spooling(monkeypatch):
+    spooled = []
+
+    async def spool_body(chunks):
+        spooled.append(True)
+
+    monkeypatch.setattr(main, "spool_body", spool_body)
+    with TestClient(app) as client:
+        response = client.post(
+            "/validate/batch?language=klingon",
+            content=b'"el perro corre"\n',
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+    assert response.status_code == 404
+    assert not spooled
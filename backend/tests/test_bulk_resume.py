@@ -0,0 +1,87 @@
+"""An interrupted bulk run resumes from its checkpoint to the same output as an uninterrupted one."""
+
+import json
+
+import pytest
+
+from app import bulk
+from app.sampler import SentenceSampler
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    sampler = SentenceSampler("spanish", min_len=3, max_len=8, seed=3)
+    lines = []
+    for i in range(60):
+        sentence = sampler.sample()
+        # Every fourth sentence is reversed, so the output mixes valid and invalid parses
+        if i % 4 == 0:
+            sentence = " ".join(reversed(sentence.split()))
+        lines.append(sentence[0].upper() + sentence[1:] + ".")
+    path = tmp_path / "corpus.txt"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def _run(corpus, output, **kwargs):
+    return bulk.run([str(corpus)], engine="python", output=str(output), workers=1,
+                    chunk_size=5, checkpoint_interval=0, progress=False, **kwargs)
+
+
+def _rows(path):
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    for row in rows:
+        # Timing differs between runs; everything else must match
+        if row["result"].get("metrics"):
+            row["result"]["metrics"].pop("parseTimeMs")
+    return rows
+
+
+def test_resume_after_interrupt_matches_uninterrupted_run(corpus, tmp_path, monkeypatch):
+    expected_stats = _run(corpus, tmp_path / "full.jsonl")
+    expected = _rows(tmp_path / "full.jsonl")
+    assert len(expected) == 60
+    assert 0 < expected_stats.parsed_sentences < 60
+
+    output = tmp_path / "resumed.jsonl"
+    checkpoint = tmp_path / "resumed.jsonl.checkpoint"
+    update = bulk.Progress.update
+    calls = []
+
+    def interrupt_on_third_chunk(self, done, counter, final=False):
+        calls.append(done)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        update(self, done, counter, final)
+
+    monkeypatch.setattr(bulk.Progress, "update", interrupt_on_third_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        _run(corpus, output)
+    monkeypatch.setattr(bulk.Progress, "update", update)
+
+    state = json.loads(checkpoint.read_text(encoding="utf-8"))
+    assert state["sentences"] == 15
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 15
+
+    stats = _run(corpus, output)
+    assert not checkpoint.exists()
+    assert _rows(output) == expected
+    assert stats == expected_stats
+
+
+def test_checkpoint_from_another_input_is_rejected(corpus, tmp_path, monkeypatch):
+    output = tmp_path / "out.jsonl"
+    def interrupt(self, done, counter, final=False):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(bulk.Progress, "update", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        _run(corpus, output)
+    monkeypatch.undo()
+
+    corpus.write_text("El perro corre.\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        _run(corpus, output)
+    # --restart discards the stale checkpoint
+    stats = _run(corpus, output, restart=True)
+    assert stats.total_sentences == 1
@@ -0,0 +1,105 @@
+"""CompressionMiddleware compresses large buffered bodies and leaves streams alone."""
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app import compression
+from app.compression import CompressionMiddleware, negotiate
+from app.main import app
+
+BIG = "el perro corre " * 200
+
+
+def _app():
+    async def big(request):
+        return PlainTextResponse(BIG)
+
+    async def small(request):
+        return PlainTextResponse("ok")
+
+    async def stream(request):
+        async def chunks():
+            for _ in range(3):
+                yield BIG
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    app = Starlette(routes=[Route("/big", big), Route("/small", small), Route("/stream", stream)])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return app
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("", None),
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("*", "br" if compression.brotli is not None else "gzip"),
+    ("deflate, gzip;q=0.5", "gzip"),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+def test_negotiate_prefers_the_higher_q_value(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert negotiate("br;q=0.4, gzip;q=0.9") == "gzip"
+    assert negotiate("br, gzip;q=0.9") == "br"
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate("br") is None
+
+
+def test_large_buffered_body_is_gzipped():
+    with TestClient(_app()) as client:
+        response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(BIG)
+    # httpx decodes the body; the length header is the compressed size
+    assert response.text == BIG
+
+
+def test_small_and_unrequested_bodies_pass_through():
+    with TestClient(_app()) as client:
+        small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        plain = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in small.headers and small.text == "ok"
+    assert "content-encoding" not in plain.headers and plain.text == BIG
+
+
+def test_streamed_body_is_not_compressed():
+    with TestClient(_app()) as client:
+        response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.text == BIG * 3
+
+
+def test_compressed_grammar_responses_get_their_own_etag():
+    with TestClient(app) as client:
+        plain = client.get("/grammar-analysis", headers={"Accept-Encoding": "identity"})
+        zipped = client.get("/grammar-analysis", headers={"Accept-Encoding": "gzip"})
+        etag = plain.headers["etag"]
+        assert "content-encoding" not in plain.headers
+        assert zipped.headers["content-encoding"] == "gzip"
+        assert zipped.headers["etag"] == etag[:-1] + '-gzip"'
+
+        # Each representation revalidates with its own validator, and either form matches
+        cached = client.get("/grammar-analysis", headers={
+            "Accept-Encoding": "gzip", "If-None-Match": zipped.headers["etag"],
+        })
+        assert cached.status_code == 304 and cached.headers["etag"] == zipped.headers["etag"]
+        cached = client.get("/grammar-detail", headers={
+            "Accept-Encoding": "gzip", "If-None-Match": f"W/{etag}",
+        })
+        assert cached.status_code == 304 and cached.headers["etag"] == f"W/{etag}"
+        stale = client.get("/grammar-analysis", headers={
+            "Accept-Encoding": "gzip", "If-None-Match": '"0-gzip"',
+        })
+        assert stale.status_code == 200
+
+
+def test_weak_etags_are_not_suffixed():
+    assert compression.encoded_etag('W/"abc"', "gzip") == 'W/"abc"'
+    assert compression.encoded_etag('"abc"', "br") == '"abc-br"'
@@ -0,0 +1,56 @@
+"""The in-process Earley engine must agree with the Java JAR on a shared corpus."""
+
+from pathlib import Path
+
+import pytest
+
+from app import parser_client
+from app.parser_client import parse_sentence
+
+CORPUS = Path(__file__).parent / "conformance_corpus.txt"
+
+
+def _load_corpus():
+    cases = []
+    for line in CORPUS.read_text(encoding="utf-8").splitlines():
+        if not line or line.startswith("#"):
+            continue
+        cases.append((line[0], line[1:].strip()))
+    return cases
+
+
+CASES = _load_corpus()
+JAR_AVAILABLE = parser_client._DEFAULT_JAR.exists()
+
+
+def _comparable(result):
+    data = result.model_dump(exclude={"metrics"})
+    if data["failure"]:
+        # The chart reports the same categories, but not always in BFS discovery order
+        data["failure"]["expectedCategories"] = sorted(data["failure"]["expectedCategories"])
+        data["failure"].pop("message")
+    return data
+
+
+@pytest.mark.parametrize("expectation,sentence", CASES)
+def test_python_engine_matches_expectation(expectation, sentence):
+    result = parse_sentence(sentence, engine="python")
+    assert result.error is None
+    assert result.metrics is not None
+    if expectation == "+":
+        assert result.valid, result.failure
+        assert result.parseTree is not None
+        assert len(result.tokens) == len(result.sentence.split())
+    elif expectation == "-":
+        assert not result.valid
+        assert result.failure is not None
+
+
+@pytest.mark.skipif(not JAR_AVAILABLE, reason="parser JAR not built (run 'mvn clean package' in src/)")
+@pytest.mark.parametrize("expectation,sentence", CASES)
+def test_engines_agree(expectation, sentence):
+    jar_result = parse_sentence(sentence, engine="jar")
+    if jar_result.error:
+        pytest.skip(f"JAR unavailable: {jar_result.error}")
+    py_result = parse_sentence(sentence, engine="python")
+    assert _comparable(py_result) == _comparable(jar_result)
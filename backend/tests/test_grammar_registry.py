@@ -0,0 +1,80 @@
+"""The registry evicts the least recently used pack and reloads packs whose files change."""
+
+import os
+
+import pytest
+
+from app.grammar_registry import GrammarRegistry, UnknownLanguage
+
+from conftest import write_pack
+
+RULES = [(1, "S", ["DET", "N", "V"])]
+LEXICON = [("el", "DET", "the"), ("lobo", "N", "wolf"), ("aúlla", "V", "howls")]
+
+
+@pytest.fixture
+def packs(grammar_dir):
+    for language in ("alpha", "beta", "gamma"):
+        write_pack(grammar_dir, language, RULES, LEXICON)
+    return grammar_dir
+
+
+def test_least_recently_used_pack_is_evicted(packs):
+    registry = GrammarRegistry(max_loaded=2)
+    alpha = registry.snapshot("alpha")
+    registry.snapshot("beta")
+    registry.snapshot("alpha")  # beta is now the least recently used
+    registry.snapshot("gamma")
+
+    loaded = {row["language"]: row for row in registry.stats()}
+    assert loaded["beta"]["loaded"] == 0 and loaded["beta"]["evictions"] == 1
+    assert loaded["alpha"]["loaded"] == 1 and loaded["gamma"]["loaded"] == 1
+
+    # Using an evicted pack loads it again, evicting the next least recent
+    registry.snapshot("beta")
+    loaded = {row["language"]: row for row in registry.stats()}
+    assert loaded["beta"]["loads"] == 2
+    assert loaded["alpha"]["loaded"] == 0
+    # Unchanged files reload to the same content
+    assert registry.snapshot("alpha").source_hash == alpha.source_hash
+
+
+def test_changed_files_are_reloaded(packs):
+    registry = GrammarRegistry()
+    before = registry.snapshot("alpha")
+    assert registry.snapshot("alpha") is before
+
+    lexicon = packs / "alpha_lexicon.xml"
+    write_pack(packs, "alpha", RULES, LEXICON + [("zorro", "N", "fox")])
+    stat = lexicon.stat()
+    os.utime(lexicon, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    after = registry.snapshot("alpha")
+    assert after is not before
+    assert after.source_hash != before.source_hash
+    assert "zorro" in {kw for kw, _, _ in after.lexicon}
+    row = next(row for row in registry.listing() if row["language"] == "alpha")
+    assert (row["state"], row["loads"], row["reloads"]) == ("loaded", 2, 1)
+
+
+def test_broken_edit_keeps_serving_the_previous_version(packs):
+    registry = GrammarRegistry()
+    before = registry.snapshot("alpha")
+    (packs / "alpha_grammar.xml").write_text("<grammar", encoding="utf-8")
+
+    assert registry.snapshot("alpha") is before
+    row = next(row for row in registry.listing() if row["language"] == "alpha")
+    assert row["state"] == "error" and row["failures"] == 1
+
+
+def test_new_and_removed_packs_are_discovered(packs):
+    registry = GrammarRegistry()
+    with pytest.raises(UnknownLanguage):
+        registry.snapshot("delta")
+    write_pack(packs, "delta", RULES, LEXICON)
+    assert registry.snapshot("delta").language == "delta"
+
+    (packs / "delta_grammar.xml").unlink()
+    with pytest.raises(UnknownLanguage):
+        registry.snapshot("delta")
+    assert "delta" not in registry.languages()
@@ -0,0 +1,75 @@
+"""LiveSession reuses chart sets across edits and agrees with a full parse."""
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.live import LiveSession
+from app.main import app
+from app.parser_client import parse_sentence
+
+
+def test_typing_word_by_word_reuses_the_chart():
+    session = LiveSession("spanish")
+    update = session.update("el ")
+    assert update.viable and not update.complete
+    assert update.position == 1
+    assert "N" in update.expected_categories
+
+    update = session.update("el perro ")
+    assert update.reused_words == 1
+    assert not update.complete
+
+    update = session.update("el perro corre ")
+    assert update.reused_words == 2
+    assert update.complete
+    full = parse_sentence("el perro corre", engine="python")
+    assert update.result.valid
+    assert update.result.parseTree == full.parseTree
+    assert update.result.rulesApplied == full.rulesApplied
+
+
+def test_deleting_the_last_word_pops_only_its_set():
+    session = LiveSession("spanish")
+    session.update("el perro corre ")
+    update = session.update("el perro ")
+    assert update.reused_words == 2
+    assert not update.complete and update.result is None
+
+
+def test_partial_word_stays_viable_while_a_completion_fits():
+    session = LiveSession("spanish")
+    update = session.update("el per")
+    assert update.partial == "per"
+    assert update.viable
+
+    update = session.update("el perro perro ")
+    assert update.partial is None
+    assert not update.viable
+    assert update.position == 2
+
+
+def test_final_edit_returns_the_failure():
+    update = LiveSession("spanish").update("perro el", final=True)
+    assert not update.complete
+    assert update.result is not None and not update.result.valid
+
+
+def test_websocket_rejects_unknown_language():
+    with TestClient(app) as client:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect("/validate/live?language=klingon") as ws:
+                ws.receive_text()
+    assert closed.value.code == 1008
+
+
+def test_websocket_sends_an_update_per_edit():
+    with TestClient(app) as client:
+        with client.websocket_connect("/validate/live?language=spanish") as ws:
+            ws.send_json({"text": "el perro "})
+            first = ws.receive_json()
+            ws.send_json({"text": "el perro corre", "final": True})
+            second = ws.receive_json()
+    assert first["words"] == ["el", "perro"] and not first["complete"]
+    assert second["complete"] and second["reused_words"] == 2
+    assert second["result"]["valid"]
@@ -0,0 +1,55 @@
+"""The LLM cache's SQLite tier is pruned by age and row count."""
+
+import asyncio
+import sqlite3
+
+from app.llm_cache import LLMCache
+
+
+def _disk_keys(db_path):
+    db = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in db.execute("SELECT key FROM llm_cache ORDER BY created")]
+    finally:
+        db.close()
+
+
+def test_prune_drops_expired_rows(tmp_path):
+    db_path = str(tmp_path / "llm.db")
+    cache = LLMCache(ttl=60, db_path=db_path, prune_interval=3600)
+    cache.put("old", "una respuesta")
+    cache.put("new", "otra respuesta")
+    with cache._db:
+        cache._db.execute("UPDATE llm_cache SET created = created - 120 WHERE key = 'old'")
+
+    assert cache.prune() == 1
+    assert _disk_keys(db_path) == ["new"]
+    assert cache.stats()["disk_evictions"] == 1
+
+
+def test_disk_tier_keeps_the_newest_rows(tmp_path):
+    db_path = str(tmp_path / "llm.db")
+    # Prune on every put
+    cache = LLMCache(ttl=0, db_path=db_path, disk_max_entries=3, prune_interval=0)
+    for i in range(5):
+        cache.put(f"k{i}", f"respuesta {i}")
+    assert _disk_keys(db_path) == ["k2", "k3", "k4"]
+
+    # A fresh process prunes on open, and still serves what is left from disk
+    reopened = LLMCache(ttl=0, db_path=db_path, disk_max_entries=2)
+    assert _disk_keys(db_path) == ["k3", "k4"]
+    assert reopened.get("k4") == "respuesta 4"
+    assert reopened.get("k2") is None
+
+
+def test_async_access_goes_through_the_disk_tier(tmp_path):
+    db_path = str(tmp_path / "llm.db")
+    cache = LLMCache(db_path=db_path)
+    assert cache.persistent
+
+    async def roundtrip():
+        await cache.aput("k", "hola")
+        return await cache.aget("k")
+
+    assert asyncio.run(roundtrip()) == "hola"
+    assert LLMCache(db_path=db_path).get("k") == "hola"
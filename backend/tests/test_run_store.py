@@ -0,0 +1,126 @@
+"""Run-store aggregates keep counting runs that compaction has deleted."""
+
+import sqlite3
+
+import pytest
+
+from app import run_store
+from app.models import SentenceAnalysis, VerifyAttempt, VerifyLoopResponse, XRayResponse, XRayStats
+from app.parser_client import parse_sentence
+from app.run_store import RunStore
+
+
+def _verify_loop(sentences):
+    attempts = [
+        VerifyAttempt(attempt_number=i, sentence=s, result=parse_sentence(s, engine="python"))
+        for i, s in enumerate(sentences, 1)
+    ]
+    success = attempts[-1].result.valid
+    return VerifyLoopResponse(prompt="a dog", language="spanish", attempts=attempts,
+                              final_result=attempts[-1].result, success=success,
+                              total_attempts=len(attempts))
+
+
+def _xray(sentences):
+    analyses = [
+        SentenceAnalysis(sentence=s, original=s, result=parse_sentence(s, engine="python"), in_grammar_scope=True)
+        for s in sentences
+    ]
+    stats = XRayStats(total_sentences=len(analyses), parsed_sentences=0, coverage_percentage=0.0,
+                      total_words=0, known_words=0, word_coverage_percentage=0.0,
+                      rules_used=[], unique_pos_tags=[])
+    return XRayResponse(prompt="a park", language="spanish", generated_text=" ".join(sentences),
+                        sentences=analyses, stats=stats)
+
+
+RUNS = [
+    _verify_loop(["perro el corre", "el perro corre"]),
+    _verify_loop(["el gato duerme"]),
+    _verify_loop(["corre perro", "el perro", "hay un perro"]),
+    _xray(["el niño lee un libro", "libro un lee"]),
+    _verify_loop(["el perro es grande"]),
+]
+
+
+def _aggregates(store):
+    return (store.rule_usage("spanish"), store.tag_coverage("spanish"),
+            store.attempt_outcomes("spanish"), store.totals("spanish"))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "runs.db")
+
+
+def test_compaction_keeps_aggregates(db_path):
+    store = RunStore(db_path, retention_days=0, max_runs=2, compact_interval=3600)
+    for response in RUNS:
+        if isinstance(response, XRayResponse):
+            store.record_xray(response)
+        else:
+            store.record_verify_loop(response)
+    before = _aggregates(store)
+    assert store.stored_runs == 5
+
+    assert store.compact() == 3
+    assert _aggregates(store) == before
+    assert store.stored_runs == 2
+    assert store.stats()["runs_deleted"] == 3
+
+    db = sqlite3.connect(db_path)
+    assert db.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 2
+    # Only the two newest runs keep their sentences
+    assert db.execute("SELECT COUNT(*) FROM run_sentences").fetchone()[0] == 3
+    db.close()
+
+    totals = {row["kind"]: row for row in store.totals("spanish")}
+    assert totals["verify-loop"]["runs"] == 4 and totals["verify-loop"]["successes"] == 4
+    assert totals["xray"]["runs"] == 1 and totals["xray"]["valid_sentences"] == 1
+
+    outcomes = {row["attempt_number"]: row for row in store.attempt_outcomes("spanish")}
+    assert outcomes[1] == {"attempt_number": 1, "attempts": 4, "valid": 2, "first_success": 2}
+    assert outcomes[2]["first_success"] == 1 and outcomes[3]["first_success"] == 1
+
+    # Reopening reads the stored-run counter back, and compacting again deletes nothing
+    reopened = RunStore(db_path, retention_days=0, max_runs=2, compact_interval=3600)
+    assert reopened.stored_runs == 2
+    assert _aggregates(reopened) == before
+    assert reopened.compact() == 0
+
+
+def test_retention_deletes_old_runs_only(db_path):
+    store = RunStore(db_path, retention_days=1, max_runs=0, compact_interval=3600)
+    for response in RUNS[:3]:
+        store.record_verify_loop(response)
+    before = _aggregates(store)
+    with store._lock, store._db:
+        store._db.execute("UPDATE runs SET created = created - 2 * 86400 WHERE id = 1")
+
+    assert store.compact() == 1
+    assert store.stored_runs == 2
+    assert _aggregates(store) == before
+
+
+def test_reports_read_the_aggregates(db_path, monkeypatch):
+    store = RunStore(db_path, retention_days=0, max_runs=1, compact_interval=3600)
+    monkeypatch.setattr(run_store, "store", store)
+    for response in RUNS:
+        if isinstance(response, VerifyLoopResponse):
+            store.record_verify_loop(response)
+    store.compact()
+
+    attempts = run_store.attempt_report("spanish")
+    assert [a.attempt_number for a in attempts] == [1, 2, 3]
+    # Every stored verify-loop run succeeded by its last attempt
+    assert attempts[-1].cumulative_success_rate == 100.0
+
+    report = run_store.rule_report("spanish")
+    used = {rule.rule for rule in report.rules}
+    assert used and not used & {rule.rule for rule in report.unused}
+
+    tags = {tag.tag: tag for tag in run_store.tag_report("spanish")}
+    assert tags["N"].tokens > 0 and 0 < tags["N"].distinct_words <= tags["N"].lexicon_words
+
+    summary = run_store.run_summary("spanish")
+    assert summary.all_time[0].runs == 4
+    assert summary.store["stored_runs"] == 1
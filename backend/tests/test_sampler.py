@@ -0,0 +1,58 @@
+"""Sampled sentences are in the grammar, and the offline client stays in its language."""
+
+import asyncio
+
+import pytest
+
+from app import llm_client, sampler
+from app.parser_client import parse_sentence
+from app.sampler import SamplerClient, SentenceSampler
+
+from conftest import write_pack
+
+TOY_RULES = [(1, "S", ["DET", "N", "V"])]
+TOY_LEXICON = [("el", "DET", "the"), ("lobo", "N", "wolf"), ("aúlla", "V", "howls")]
+
+
+def test_samples_parse_and_respect_length_bounds():
+    sampler = SentenceSampler("spanish", min_len=3, max_len=8, seed=7)
+    for _ in range(40):
+        sentence = sampler.sample()
+        assert 3 <= len(sentence.split()) <= 8
+        result = parse_sentence(sentence, engine="python")
+        assert result.valid, (sentence, result.failure)
+
+
+def test_same_seed_gives_same_sentences():
+    first = list(SentenceSampler("spanish", seed=11).sentences(20))
+    second = list(SentenceSampler("spanish", seed=11).sentences(20))
+    assert first == second
+
+
+def test_unreachable_min_len_raises_instead_of_looping(grammar_dir, monkeypatch):
+    write_pack(grammar_dir, "toy", TOY_RULES, TOY_LEXICON)
+    monkeypatch.setattr("app.sampler.MAX_SAMPLE_ATTEMPTS", 50)
+    sampler = SentenceSampler("toy", min_len=4, max_len=6, seed=1)
+    with pytest.raises(ValueError, match="at least 4 words"):
+        sampler.sample()
+    with pytest.raises(ValueError, match="at least 4 words"):
+        sampler.sample_detailed()
+
+
+def test_translation_glosses_with_the_requested_language(grammar_dir, monkeypatch):
+    write_pack(grammar_dir, "toy", TOY_RULES, TOY_LEXICON)
+    monkeypatch.setattr(llm_client, "_client", SamplerClient({llm_client.TRANSLATE_SYSTEM_PROMPT: "translation"}))
+    translations = asyncio.run(llm_client.translate_sentences(["el lobo aúlla"], "toy", use_cache=False))
+    assert translations == ["the wolf howls"]
+
+
+def test_repeat_counts_are_bounded(monkeypatch):
+    monkeypatch.setattr(sampler, "MAX_TRACKED_REQUESTS", 3)
+    client = SamplerClient({"s": "sentence"}, invalid_rate=0.0)
+    requests = [{"system": "s", "messages": [{"role": "user", "content": f"spanish {i}"}]} for i in range(4)]
+    first = client.reply(requests[0])
+    for request in requests[1:]:
+        client.reply(request)
+    assert len(client._repeats) == 3
+    # The oldest request was forgotten, so it starts again from its first reply
+    assert client.reply(requests[0]) == first
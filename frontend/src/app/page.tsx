@@ -7,9 +7,10 @@ import {
   XRayResponse,
   GrammarStats,
   GrammarDetail,
+  fetchLanguages,
   validateSentence,
   generateSentence,
-  xrayText,
+  xrayTextStream,
   fetchGrammarStats,
   fetchGrammarDetail,
 } from "@/lib/api";
@@ -91,6 +92,7 @@ export default function Home() {
   const [mode, setMode] = useState<"validate" | "generate" | "xray" | "grammar">("validate");
   const [sentence, setSentence] = useState("");
   const [language, setLanguage] = useState("spanish");
+  const [languages, setLanguages] = useState<string[]>(["spanish"]);
   const [result, setResult] = useState<ParseResult | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -111,8 +113,17 @@ export default function Home() {
   const [grammarDetail, setGrammarDetail] = useState<GrammarDetail | null>(null);
   const [grammarDetailLoading, setGrammarDetailLoading] = useState(false);
 
+  useEffect(() => {
+    fetchLanguages()
+      .then((packs) => {
+        if (packs.length) setLanguages(packs.map((p) => p.language));
+      })
+      .catch(() => {});
+  }, []);
+
   useEffect(() => {
     fetchGrammarStats(language).then(setGrammarStats).catch(() => {});
+    setGrammarDetail(null);
   }, [language]);
 
   useEffect(() => {
@@ -185,8 +196,41 @@ export default function Home() {
     setError(null);
     setXrayResult(null);
 
+    // Show text and sentence analyses as they stream in, then the full result
+    const partial: XRayResponse = {
+      prompt: xrayPrompt,
+      language,
+      generated_text: "",
+      system_prompt: "",
+      user_message: "",
+      sentences: [],
+      stats: {
+        total_sentences: 0,
+        parsed_sentences: 0,
+        coverage_percentage: 0,
+        total_words: 0,
+        known_words: 0,
+        word_coverage_percentage: 0,
+        rules_used: [],
+        unique_pos_tags: [],
+      },
+    };
+
     try {
-      const data = await xrayText(xrayPrompt, language);
+      const data = await xrayTextStream(xrayPrompt, language, {
+        onToken: (text) => {
+          partial.generated_text += text;
+          setXrayResult({ ...partial });
+        },
+        onSentence: (sentence) => {
+          partial.sentences = [...partial.sentences, sentence];
+          setXrayResult({ ...partial });
+        },
+        onStats: (stats) => {
+          partial.stats = stats;
+          setXrayResult({ ...partial });
+        },
+      });
       setXrayResult(data);
     } catch (err) {
       setError(err instanceof Error ? err.message : "Request failed");
@@ -296,7 +340,11 @@ export default function Home() {
                   onChange={(e) => setLanguage(e.target.value)}
                   className="px-3 py-2.5 border border-gray-300 rounded-lg text-sm bg-white focus:outline-none focus:ring-2 focus:ring-blue-500"
                 >
-                  <option value="spanish">Spanish</option>
+                  {languages.map((name) => (
+                    <option key={name} value={name}>
+                      {name.charAt(0).toUpperCase() + name.slice(1)}
+                    </option>
+                  ))}
                 </select>
                 <button
                   type="submit"
@@ -455,7 +503,11 @@ export default function Home() {
                   onChange={(e) => setLanguage(e.target.value)}
                   className="px-3 py-2.5 border border-gray-300 rounded-lg text-sm bg-white focus:outline-none focus:ring-2 focus:ring-purple-500"
                 >
-                  <option value="spanish">Spanish</option>
+                  {languages.map((name) => (
+                    <option key={name} value={name}>
+                      {name.charAt(0).toUpperCase() + name.slice(1)}
+                    </option>
+                  ))}
                 </select>
                 <button
                   type="submit"
@@ -522,7 +574,11 @@ export default function Home() {
                   onChange={(e) => setLanguage(e.target.value)}
                   className="px-3 py-2.5 border border-gray-300 rounded-lg text-sm bg-white focus:outline-none focus:ring-2 focus:ring-emerald-500"
                 >
-                  <option value="spanish">Spanish</option>
+                  {languages.map((name) => (
+                    <option key={name} value={name}>
+                      {name.charAt(0).toUpperCase() + name.slice(1)}
+                    </option>
+                  ))}
                 </select>
                 <button
                   type="submit"
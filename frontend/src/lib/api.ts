@@ -45,6 +45,24 @@ export interface ParseResult {
   metrics: ParseMetrics | null;
 }
 
+export interface LiveUpdate {
+  words: string[];
+  partial: string | null;
+  viable: boolean;
+  position: number;
+  expected_categories: string[];
+  complete: boolean;
+  result: ParseResult | null;
+  reused_words: number;
+  elapsed_ms: number;
+}
+
+export interface LiveValidation {
+  /** Send the input's full current text; final=true returns a ParseResult even if invalid. */
+  send: (text: string, final?: boolean) => void;
+  close: () => void;
+}
+
 export interface ClaudeMessage {
   role: string;
   content: string;
@@ -52,11 +70,43 @@ export interface ClaudeMessage {
 
 export interface VerifyAttempt {
   attempt_number: number;
+  round_number: number;
+  candidate_number: number;
   sentence: string;
   result: ParseResult;
   constraint_feedback: string | null;
   system_prompt: string;
   claude_messages: ClaudeMessage[];
+  generation_ms: number;
+  aborted_at: number | null;
+  output_tokens: number;
+  tokens_saved: number | null;
+  latency_saved_ms: number | null;
+}
+
+export interface LLMCall {
+  endpoint: string;
+  model: string;
+  purpose: string;
+  latency_ms: number;
+  first_token_ms: number | null;
+  input_tokens: number;
+  output_tokens: number;
+  cache_creation_input_tokens: number;
+  cache_read_input_tokens: number;
+  stop_reason: string | null;
+  response_cached: boolean;
+  error: string | null;
+}
+
+export interface LLMUsage {
+  calls: LLMCall[];
+  latency_ms: number;
+  input_tokens: number;
+  output_tokens: number;
+  cache_creation_input_tokens: number;
+  cache_read_input_tokens: number;
+  response_cache_hits: number;
 }
 
 export interface VerifyLoopResponse {
@@ -66,6 +116,11 @@ export interface VerifyLoopResponse {
   final_result: ParseResult;
   success: boolean;
   total_attempts: number;
+  rounds: number;
+  candidates_per_round: number;
+  llm_calls: number;
+  elapsed_ms: number;
+  llm_usage?: LLMUsage | null;
 }
 
 export interface SentenceAnalysis {
@@ -87,6 +142,17 @@ export interface XRayStats {
   unique_pos_tags: string[];
 }
 
+export interface XRaySentenceEvent extends SentenceAnalysis {
+  index: number;
+}
+
+export interface XRayStreamHandlers {
+  onToken?: (text: string) => void;
+  onSentence?: (sentence: XRaySentenceEvent) => void;
+  onStats?: (stats: XRayStats) => void;
+  onTranslations?: (translations: string[]) => void;
+}
+
 export interface XRayResponse {
   prompt: string;
   language: string;
@@ -95,6 +161,7 @@ export interface XRayResponse {
   user_message: string;
   sentences: SentenceAnalysis[];
   stats: XRayStats;
+  llm_usage?: LLMUsage | null;
 }
 
 export interface GrammarStats {
@@ -122,15 +189,173 @@ export interface GrammarDetail {
   grammar_rules: GrammarRule[];
   lexicon_entries: LexiconEntry[];
   pos_tags: string[];
+  total_rules: number | null;
+  total_lexicon_entries: number | null;
+  next_cursor: string | null;
+}
+
+export interface GrammarAnalysis {
+  language: string;
+  source_hash: string;
+  start: string;
+  nonterminals: string[];
+  terminals: string[];
+  undefined: string[];
+  nullable: string[];
+  first: Record<string, string[]>;
+  /** "$" is the end of the sentence */
+  follow: Record<string, string[]>;
+  unproductive: string[];
+  unreachable_rules: number[];
+  left_recursive: string[];
+  tag_words: Record<string, string[]>;
+}
+
+export interface GrammarDetailQuery {
+  tag?: string;
+  prefix?: string;
+  translation?: string;
+  lhs?: string;
+  rhs?: string;
+  cursor?: string;
+  limit?: number;
 }
 
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
+/** A response sent with ?format=compact (see backend/app/compact.py). */
+interface CompactPayload {
+  format: "compact-1";
+  symbols: string[];
+  translations: Record<string, string>;
+  rules: Record<string, string>;
+  prompts: string[];
+  data: unknown;
+}
+
+interface CompactTree {
+  symbol: number[];
+  parent: number[];
+  word: number[];
+}
+
+/** Replace a field with a getter that builds the value on first access. */
+function lazyField<T>(target: object, key: string, build: () => T): void {
+  Object.defineProperty(target, key, {
+    configurable: true,
+    enumerable: true,
+    get() {
+      const value = build();
+      Object.defineProperty(target, key, { value, enumerable: true, writable: true });
+      return value;
+    },
+  });
+}
+
+function expandTree(tree: CompactTree, symbols: string[]): ParseTreeNode {
+  const nodes: ParseTreeNode[] = tree.symbol.map((symbol, i) => ({
+    symbol: symbols[symbol],
+    children: [],
+    word: tree.word[i] === 1,
+  }));
+  // Preorder, so appending keeps each node's children in order
+  tree.parent.forEach((parent, i) => {
+    if (parent >= 0) nodes[parent].children!.push(nodes[i]);
+  });
+  return nodes[0];
+}
+
+/**
+ * Turn a compact payload back into the verbose response shape. Parse trees,
+ * tokens and rule lists are rebuilt lazily, when a component first reads them.
+ */
+function expandCompact<T>(payload: CompactPayload): T {
+  const { symbols, translations, rules, prompts } = payload;
+  const expandResult = (raw: Record<string, unknown>): ParseResult => {
+    const result = { ...raw } as Record<string, unknown>;
+    const tokens = raw.tokens as (number | string)[][];
+    const tree = raw.parseTree as CompactTree | null;
+    const numbers = raw.rulesApplied as number[];
+    lazyField(result, "tokens", () =>
+      tokens.map(([word, tag, translation]) => ({
+        word: symbols[word as number],
+        tag: symbols[tag as number],
+        translation: (translation as string | undefined) ?? translations[String(word)],
+      }))
+    );
+    lazyField(result, "parseTree", () => (tree ? expandTree(tree, symbols) : null));
+    lazyField(result, "rulesApplied", () =>
+      numbers.map((number) => ({ number, rule: rules[String(number)] }))
+    );
+    return result as unknown as ParseResult;
+  };
+  const walk = (value: unknown): unknown => {
+    if (Array.isArray(value)) return value.map(walk);
+    if (value === null || typeof value !== "object") return value;
+    const object = value as Record<string, unknown>;
+    if ("valid" in object && "parseTree" in object) return expandResult(object);
+    const out: Record<string, unknown> = {};
+    for (const [key, field] of Object.entries(object)) {
+      out[key] = key === "system_prompt" ? prompts[field as number] : walk(field);
+    }
+    return out;
+  };
+  return walk(payload.data) as T;
+}
+
+async function readResponse<T>(response: Response, compact: boolean): Promise<T> {
+  const body = await response.json();
+  return compact ? expandCompact<T>(body) : body;
+}
+
+export interface LanguagePack {
+  language: string;
+  state: "loaded" | "stale" | "unloaded" | "error";
+  source_hash: string;
+  loaded_hash: string | null;
+  loads: number;
+  reloads: number;
+  evictions: number;
+  failures: number;
+  last_used: number | null;
+  error: string | null;
+}
+
+export async function fetchLanguages(): Promise<LanguagePack[]> {
+  const response = await fetch(`${API_BASE}/languages`);
+
+  if (!response.ok) {
+    throw new Error(`API error: ${response.status}`);
+  }
+
+  return response.json();
+}
+
 export async function fetchGrammarDetail(
-  language: string = "spanish"
+  language: string = "spanish",
+  query: GrammarDetailQuery = {}
 ): Promise<GrammarDetail> {
+  const params = new URLSearchParams({ language });
+  for (const [key, value] of Object.entries(query)) {
+    if (value !== undefined && value !== "") {
+      params.set(key, String(value));
+    }
+  }
+  // The server sends a strong ETag, so the browser cache revalidates with a 304
+  const response = await fetch(`${API_BASE}/grammar-detail?${params}`);
+
+  if (!response.ok) {
+    throw new Error(`API error: ${response.status}`);
+  }
+
+  return response.json();
+}
+
+export async function fetchGrammarAnalysis(
+  language: string = "spanish"
+): Promise<GrammarAnalysis> {
   const response = await fetch(
-    `${API_BASE}/grammar-detail?language=${encodeURIComponent(language)}`
+    `${API_BASE}/grammar-analysis?language=${encodeURIComponent(language)}`
   );
 
   if (!response.ok) {
@@ -156,9 +381,11 @@ export async function fetchGrammarStats(
 
 export async function validateSentence(
   sentence: string,
-  language: string = "spanish"
+  language: string = "spanish",
+  compact: boolean = false
 ): Promise<ParseResult> {
-  const response = await fetch(`${API_BASE}/validate`, {
+  const format = compact ? "?format=compact" : "";
+  const response = await fetch(`${API_BASE}/validate${format}`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ sentence, language }),
@@ -168,18 +395,60 @@ export async function validateSentence(
     throw new Error(`API error: ${response.status}`);
   }
 
-  return response.json();
+  return readResponse<ParseResult>(response, compact);
+}
+
+/**
+ * Keystroke validation over a WebSocket. The server keeps the parse for the
+ * words so far, so send the whole text on every edit.
+ */
+export function openLiveValidation(
+  language: string = "spanish",
+  onUpdate: (update: LiveUpdate) => void,
+  onError: (message: string) => void = () => {}
+): LiveValidation {
+  const url = `${API_BASE.replace(/^http/, "ws")}/validate/live?language=${encodeURIComponent(language)}`;
+  const socket = new WebSocket(url);
+  let pending: string | null = null;
+
+  socket.onopen = () => {
+    if (pending !== null) socket.send(pending);
+    pending = null;
+  };
+  socket.onmessage = (event) => {
+    const payload = JSON.parse(event.data);
+    if (payload.error) onError(JSON.stringify(payload.error));
+    else onUpdate(payload);
+  };
+  socket.onclose = (event) => {
+    if (event.code === 1008) onError(event.reason || "Live validation unavailable");
+  };
+
+  return {
+    send(text: string, final: boolean = false) {
+      const message = JSON.stringify({ text, final });
+      // Only the latest text matters before the socket opens
+      if (socket.readyState === WebSocket.OPEN) socket.send(message);
+      else pending = message;
+    },
+    close() {
+      socket.close();
+    },
+  };
 }
 
 export async function generateSentence(
   prompt: string,
   language: string = "spanish",
-  max_retries: number = 3
+  max_retries: number = 3,
+  candidates: number = 1,
+  compact: boolean = false
 ): Promise<VerifyLoopResponse> {
-  const response = await fetch(`${API_BASE}/verify-loop`, {
+  const format = compact ? "?format=compact" : "";
+  const response = await fetch(`${API_BASE}/verify-loop${format}`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ prompt, language, max_retries }),
+    body: JSON.stringify({ prompt, language, max_retries, candidates }),
   });
 
   if (!response.ok) {
@@ -187,14 +456,120 @@ export async function generateSentence(
     throw new Error(body || `API error: ${response.status}`);
   }
 
-  return response.json();
+  return readResponse<VerifyLoopResponse>(response, compact);
+}
+
+async function readServerSentEvents(
+  response: Response,
+  onEvent: (event: string, data: string) => void
+): Promise<void> {
+  const reader = response.body!.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    let boundary: number;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = "message";
+      const data: string[] = [];
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+      }
+      onEvent(event, data.join("\n"));
+    }
+  }
+}
+
+/** Streaming verify loop: onAttempt fires as each attempt is validated. */
+export async function generateSentenceStream(
+  prompt: string,
+  language: string = "spanish",
+  max_retries: number = 3,
+  onAttempt: (attempt: VerifyAttempt) => void = () => {}
+): Promise<VerifyLoopResponse> {
+  const response = await fetch(`${API_BASE}/verify-loop/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ prompt, language, max_retries }),
+  });
+
+  if (!response.ok || !response.body) {
+    const body = await response.text();
+    throw new Error(body || `API error: ${response.status}`);
+  }
+
+  let summary = null as VerifyLoopResponse | null;
+  await readServerSentEvents(response, (event, data) => {
+    const payload = JSON.parse(data);
+    if (event === "attempt") onAttempt(payload);
+    else if (event === "summary") summary = payload;
+    else if (event === "error") throw new Error(payload.detail || `API error: ${payload.status}`);
+  });
+
+  if (!summary) {
+    throw new Error("Verify loop stream ended without a summary");
+  }
+  return summary;
+}
+
+/** Streaming X-ray: handlers fire as text and per-sentence analyses arrive. */
+export async function xrayTextStream(
+  prompt: string,
+  language: string = "spanish",
+  handlers: XRayStreamHandlers = {}
+): Promise<XRayResponse> {
+  const response = await fetch(`${API_BASE}/xray/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ prompt, language }),
+  });
+
+  if (!response.ok || !response.body) {
+    const body = await response.text();
+    throw new Error(body || `API error: ${response.status}`);
+  }
+
+  let summary = null as XRayResponse | null;
+  await readServerSentEvents(response, (event, data) => {
+    const payload = JSON.parse(data);
+    switch (event) {
+      case "token":
+        handlers.onToken?.(payload.text);
+        break;
+      case "sentence":
+        handlers.onSentence?.(payload);
+        break;
+      case "stats":
+        handlers.onStats?.(payload);
+        break;
+      case "translations":
+        handlers.onTranslations?.(payload.translations);
+        break;
+      case "summary":
+        summary = payload;
+        break;
+      case "error":
+        throw new Error(payload.detail || `API error: ${payload.status}`);
+    }
+  });
+
+  if (!summary) {
+    throw new Error("X-ray stream ended without a summary");
+  }
+  return summary;
 }
 
 export async function xrayText(
   prompt: string,
-  language: string = "spanish"
+  language: string = "spanish",
+  compact: boolean = false
 ): Promise<XRayResponse> {
-  const response = await fetch(`${API_BASE}/xray`, {
+  const format = compact ? "?format=compact" : "";
+  const response = await fetch(`${API_BASE}/xray${format}`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ prompt, language }),
@@ -205,5 +580,86 @@ export async function xrayText(
     throw new Error(body || `API error: ${response.status}`);
   }
 
+  return readResponse<XRayResponse>(response, compact);
+}
+
+export interface RuleUsage {
+  number: number;
+  rule: string;
+  uses: number;
+  sentences: number;
+  last_used: number;
+}
+
+export interface RuleUsageReport {
+  language: string;
+  rules: RuleUsage[];
+  unused: RuleApplied[];
+}
+
+export interface TagCoverage {
+  tag: string;
+  tokens: number;
+  distinct_words: number;
+  lexicon_words: number;
+  coverage_percentage: number;
+}
+
+export interface AttemptOutcome {
+  attempt_number: number;
+  attempts: number;
+  valid: number;
+  success_rate: number;
+  first_success: number;
+  cumulative_success_rate: number;
+}
+
+export interface RunTotals {
+  kind: "xray" | "verify-loop";
+  runs: number;
+  successes: number;
+  success_rate: number | null;
+  sentences: number;
+  valid_sentences: number;
+  validity_rate: number;
+}
+
+export interface RunSummary {
+  language: string;
+  days: number;
+  recent: RunTotals[];
+  all_time: RunTotals[];
+  store: Record<string, number | boolean>;
+}
+
+/** Analytics over stored runs; the server answers 503 unless RUN_STORE_DB is set. */
+async function fetchAnalytics<T>(
+  path: string,
+  language: string,
+  params: Record<string, string> = {}
+): Promise<T> {
+  const query = new URLSearchParams({ language, ...params });
+  const response = await fetch(`${API_BASE}/analytics/${path}?${query}`);
+
+  if (!response.ok) {
+    throw new Error(`API error: ${response.status}`);
+  }
+
   return response.json();
 }
+
+export function fetchRunSummary(language: string = "spanish", days: number = 7): Promise<RunSummary> {
+  return fetchAnalytics("summary", language, { days: String(days) });
+}
+
+export function fetchRuleUsage(language: string = "spanish"): Promise<RuleUsageReport> {
+  return fetchAnalytics("rules", language);
+}
+
+export function fetchTagCoverage(language: string = "spanish"): Promise<TagCoverage[]> {
+  return fetchAnalytics("tags", language);
+}
+
+export function fetchAttemptOutcomes(language: string = "spanish"): Promise<AttemptOutcome[]> {
+  return fetchAnalytics("attempts", language);
+}
@@ -1,7 +1,5 @@
 package com.grammaroracle.parser;
 
-import org.json.JSONObject;
-
 import java.util.List;
 
 public class ParserMain {
@@ -10,6 +8,7 @@ public class ParserMain {
         String sentence = null;
         String languageStr = "SPANISH";
         boolean jsonOutput = false;
+        boolean serverMode = false;
 
         for (int i = 0; i < args.length; i++) {
             switch (args[i]) {
@@ -22,12 +21,20 @@ public class ParserMain {
                 case "--json":
                     jsonOutput = true;
                     break;
+                case "--server":
+                    serverMode = true;
+                    break;
                 case "--help":
                     printUsage();
                     return;
             }
         }
 
+        if (serverMode) {
+            runServer(languageStr);
+            return;
+        }
+
         if (sentence == null) {
             if (jsonOutput) {
                 System.out.println(errorJson("No sentence provided. Use --sentence \"text\""));
@@ -45,15 +52,7 @@ public class ParserMain {
             Sentence sent = new Sentence(sentence);
 
             if (jsonOutput) {
-                JsonSerializer serializer = new JsonSerializer(parser.getLexicon());
-                try {
-                    List<ParseMemory> parses = parser.parse(sent);
-                    JSONObject result = serializer.serializeValidParse(sent, parses, parser.getLastMetrics());
-                    System.out.println(result.toString(2));
-                } catch (BadSentenceException e) {
-                    JSONObject result = serializer.serializeInvalidParse(sent, e, parser.getLastMetrics());
-                    System.out.println(result.toString(2));
-                }
+                System.out.println(ParserServer.parseToJson(parser, sent).toString(2));
             } else {
                 try {
                     List<ParseMemory> parses = parser.parse(sent);
@@ -90,11 +89,21 @@ public class ParserMain {
         }
     }
 
+    private static void runServer(String languageStr) {
+        try {
+            Language language = Language.fromString(languageStr);
+            new ParserServer(language).run(System.in, System.out);
+        } catch (IllegalArgumentException e) {
+            System.out.println(ParserServer.errorJson("Unknown language: " + languageStr));
+            System.exit(1);
+        } catch (Exception e) {
+            System.out.println(ParserServer.errorJson("Parser initialization failed: " + e.getMessage()));
+            System.exit(1);
+        }
+    }
+
     private static String errorJson(String message) {
-        JSONObject error = new JSONObject();
-        error.put("valid", false);
-        error.put("error", message);
-        return error.toString(2);
+        return ParserServer.errorJson(message).toString(2);
     }
 
     private static void printUsage() {
@@ -102,9 +111,10 @@ public class ParserMain {
         System.out.println("Usage: java -jar grammar-oracle-parser.jar [options]");
         System.out.println();
         System.out.println("Options:");
-        System.out.println("  --sentence \"text\"   Sentence to parse (required)");
+        System.out.println("  --sentence \"text\"   Sentence to parse (required unless --server)");
         System.out.println("  --language LANG      Language: SPANISH (default)");
         System.out.println("  --json               Output as JSON");
+        System.out.println("  --server             Serve line-delimited JSON requests on stdin/stdout");
         System.out.println("  --help               Show this help");
     }
 }
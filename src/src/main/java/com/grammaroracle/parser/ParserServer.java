@@ -0,0 +1,117 @@
+package com.grammaroracle.parser;
+
+import org.json.JSONException;
+import org.json.JSONObject;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+
+import java.io.BufferedReader;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.nio.charset.StandardCharsets;
+import java.util.EnumMap;
+import java.util.List;
+import java.util.Map;
+
+/**
+ * Long-lived parser process speaking line-delimited JSON over stdin/stdout.
+ *
+ * Each request is a single JSON object on one line:
+ *   {"id": 1, "sentence": "el perro es grande", "language": "SPANISH"}
+ *   {"id": 2, "type": "ping"}
+ *
+ * Each response is a single JSON object on one line carrying the same "id".
+ * Parse responses have exactly the shape produced by {@code --json} mode.
+ * Grammars and lexicons are loaded once per language and reused.
+ */
+public class ParserServer {
+
+    private static final Logger log = LoggerFactory.getLogger(ParserServer.class);
+
+    private final Language defaultLanguage;
+    private final Map<Language, Parser> parsers = new EnumMap<>(Language.class);
+
+    public ParserServer(Language defaultLanguage) throws Exception {
+        this.defaultLanguage = defaultLanguage;
+        // Load the default grammar up front so the first request is fast
+        getParser(defaultLanguage);
+    }
+
+    public void run(InputStream in, OutputStream out) throws IOException {
+        BufferedReader reader = new BufferedReader(new InputStreamReader(in, StandardCharsets.UTF_8));
+        PrintStream writer = new PrintStream(out, false, StandardCharsets.UTF_8);
+
+        String line;
+        while ((line = reader.readLine()) != null) {
+            if (line.isBlank()) {
+                continue;
+            }
+            writer.println(handle(line).toString());
+            writer.flush();
+        }
+        log.info("Input closed, parser server exiting");
+    }
+
+    public JSONObject handle(String line) {
+        JSONObject request;
+        try {
+            request = new JSONObject(line);
+        } catch (JSONException e) {
+            JSONObject error = errorJson("Invalid request: " + e.getMessage());
+            error.put("id", JSONObject.NULL);
+            return error;
+        }
+
+        Object id = request.opt("id");
+        JSONObject response;
+
+        if ("ping".equals(request.optString("type"))) {
+            response = new JSONObject();
+            response.put("pong", true);
+        } else if (!request.has("sentence")) {
+            response = errorJson("No sentence provided");
+        } else {
+            String languageStr = request.optString("language", defaultLanguage.name());
+            try {
+                Parser parser = getParser(Language.fromString(languageStr));
+                response = parseToJson(parser, new Sentence(request.optString("sentence")));
+            } catch (IllegalArgumentException e) {
+                response = errorJson("Unknown language: " + languageStr);
+            } catch (Exception e) {
+                response = errorJson("Parser initialization failed: " + e.getMessage());
+            }
+        }
+
+        response.put("id", id != null ? id : JSONObject.NULL);
+        return response;
+    }
+
+    static JSONObject parseToJson(Parser parser, Sentence sentence) {
+        JsonSerializer serializer = new JsonSerializer(parser.getLexicon());
+        try {
+            List<ParseMemory> parses = parser.parse(sentence);
+            return serializer.serializeValidParse(sentence, parses, parser.getLastMetrics());
+        } catch (BadSentenceException e) {
+            return serializer.serializeInvalidParse(sentence, e, parser.getLastMetrics());
+        }
+    }
+
+    static JSONObject errorJson(String message) {
+        JSONObject error = new JSONObject();
+        error.put("valid", false);
+        error.put("error", message);
+        return error;
+    }
+
+    private Parser getParser(Language language) throws Exception {
+        Parser parser = parsers.get(language);
+        if (parser == null) {
+            parser = new Parser(language);
+            parsers.put(language, parser);
+        }
+        return parser;
+    }
+}
@@ -0,0 +1,73 @@
+package com.grammaroracle.parser;
+
+import org.json.JSONObject;
+import org.junit.jupiter.api.BeforeAll;
+import org.junit.jupiter.api.Test;
+
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.nio.charset.StandardCharsets;
+
+import static org.junit.jupiter.api.Assertions.*;
+
+class ParserServerTest {
+
+    private static ParserServer server;
+
+    @BeforeAll
+    static void setUp() throws Exception {
+        server = new ParserServer(Language.SPANISH);
+    }
+
+    @Test
+    void pingReturnsPong() {
+        JSONObject response = server.handle("{\"id\": 1, \"type\": \"ping\"}");
+        assertTrue(response.getBoolean("pong"));
+        assertEquals(1, response.getInt("id"));
+    }
+
+    @Test
+    void validSentenceEchoesId() {
+        JSONObject response = server.handle("{\"id\": 7, \"sentence\": \"el perro es grande\"}");
+        assertEquals(7, response.getInt("id"));
+        assertTrue(response.getBoolean("valid"));
+        assertTrue(response.has("parseTree"));
+        assertTrue(response.has("metrics"));
+    }
+
+    @Test
+    void invalidSentenceReportsFailure() {
+        JSONObject response = server.handle("{\"id\": 8, \"sentence\": \"grande perro\"}");
+        assertFalse(response.getBoolean("valid"));
+        assertTrue(response.has("failure"));
+    }
+
+    @Test
+    void unknownLanguageReturnsError() {
+        JSONObject response = server.handle("{\"id\": 9, \"sentence\": \"el perro\", \"language\": \"KLINGON\"}");
+        assertFalse(response.getBoolean("valid"));
+        assertTrue(response.getString("error").contains("Unknown language"));
+    }
+
+    @Test
+    void malformedRequestReturnsError() {
+        JSONObject response = server.handle("not json");
+        assertFalse(response.getBoolean("valid"));
+        assertTrue(response.has("error"));
+        assertTrue(response.isNull("id"));
+    }
+
+    @Test
+    void runWritesOneLinePerRequest() throws Exception {
+        String input = "{\"id\": 1, \"sentence\": \"el perro corre\"}\n"
+                + "\n"
+                + "{\"id\": 2, \"sentence\": \"perro corre\"}\n";
+        ByteArrayOutputStream out = new ByteArrayOutputStream();
+        server.run(new ByteArrayInputStream(input.getBytes(StandardCharsets.UTF_8)), out);
+
+        String[] lines = out.toString(StandardCharsets.UTF_8).trim().split("\n");
+        assertEquals(2, lines.length);
+        assertTrue(new JSONObject(lines[0]).getBoolean("valid"));
+        assertFalse(new JSONObject(lines[1]).getBoolean("valid"));
+    }
+}